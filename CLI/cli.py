@@ -71,6 +71,33 @@ class ITSDCopilotCLI:
             click.echo(f"Error sending query: {e}")
             return None
 
+    def stream_copilot(self, query):
+        """Send query to the streaming API and yield (event, data) pairs as they arrive"""
+        if not self.token:
+            click.echo("Not authenticated. Please login first.")
+            return
+
+        try:
+            headers = {"Authorization": f"Bearer {self.token}"}
+            response = requests.post(
+                f"{self.base_url}/chat/query-stream",
+                json={"query": query, "format": "ndjson"},
+                headers=headers,
+                stream=True
+            )
+            
+            if response.status_code != 200:
+                click.echo(f"Error: {response.json().get('error', 'Unknown error')}")
+                return
+
+            with response:
+                for line in response.iter_lines():
+                    if line:
+                        message = json.loads(line)
+                        yield message['event'], message['data']
+        except Exception as e:
+            click.echo(f"Error sending query: {e}")
+
 @click.group()
 @click.pass_context
 def cli(ctx):
@@ -90,9 +117,14 @@ def login(copilot, username, password):
 
 @cli.command()
 @click.argument('query')
+@click.option('--stream', is_flag=True, help='Print each part of the answer as soon as it is ready')
 @click.pass_obj
-def ask(copilot, query):
+def ask(copilot, query, stream):
     """Ask a question to the copilot"""
+    if stream:
+        stream_answer(copilot, query)
+        return
+
     result = copilot.query_copilot(query)
     if result:
         click.echo("\n🤖 Copilot Response:")
@@ -107,6 +139,25 @@ def ask(copilot, query):
         
         click.echo("─" * 50)
 
+def stream_answer(copilot, query):
+    """Print a streamed answer section by section"""
+    printed = False
+    click.echo("\n🤖 Copilot Response:")
+    click.echo("─" * 50)
+    for event, data in copilot.stream_copilot(query):
+        if event == 'analysis':
+            click.echo(f"Intent: {data['intent']}")
+        elif event == 'error':
+            click.echo(f"Error: {data.get('error', 'Unknown error')}")
+        elif event == 'done':
+            # Cached answers and fallbacks arrive in one piece
+            if not printed:
+                click.echo(data.get('response', 'No response'))
+        elif data.get('text'):
+            click.echo(data['text'])
+            printed = True
+    click.echo("─" * 50)
+
 @cli.command()
 @click.pass_obj
 def status(copilot):
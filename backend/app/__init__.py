@@ -2,7 +2,13 @@ from flask import Flask
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 
+from .config import Config
+from .logging_setup import configure_logging
+from .services.metrics import stage_metrics
+
 def create_app():
+    # JSON log lines, written off the request path by a background thread
+    logger = configure_logging()
     app = Flask(__name__)
     
     # Basic configuration
@@ -12,13 +18,15 @@ def create_app():
     # Initialize extensions
     CORS(app)
     JWTManager(app)
+    stage_metrics.configure(Config.METRICS_DIR)
     
     # Import and register blueprints with error handling
     blueprints = [
         ('auth', '/auth'),
         ('chat', '/chat'),
         ('feedback', '/feedback'),
-        ('kb_admin', '/kb-admin')
+        ('kb_admin', '/kb-admin'),
+        ('metrics', '')
     ]
     
     for bp_name, url_prefix in blueprints:
@@ -27,11 +35,11 @@ def create_app():
             module = __import__(f'app.routes.{bp_name}', fromlist=[f'{bp_name}_bp'])
             blueprint = getattr(module, f'{bp_name}_bp')
             app.register_blueprint(blueprint, url_prefix=url_prefix)
-            print(f"✓ Registered blueprint: {bp_name} at {url_prefix}")
+            logger.info(f"Registered blueprint: {bp_name} at {url_prefix}")
         except ImportError as e:
-            print(f"⚠️  Warning: Could not import {bp_name} blueprint: {e}")
+            logger.warning(f"Could not import {bp_name} blueprint: {e}")
         except AttributeError as e:
-            print(f"⚠️  Warning: Could not find blueprint for {bp_name}: {e}")
+            logger.warning(f"Could not find blueprint for {bp_name}: {e}")
     
     # Add a default route for testing
     @app.route('/')
@@ -42,7 +50,8 @@ def create_app():
                 "auth": "/auth/*",
                 "chat": "/chat/*", 
                 "feedback": "/feedback/*",
-                "kb_admin": "/kb-admin/*"
+                "kb_admin": "/kb-admin/*",
+                "metrics": "/metrics"
             }
         }
     
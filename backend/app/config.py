@@ -5,4 +5,83 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key'
     MONGODB_URI = os.environ.get('MONGODB_URI') or 'mongodb://localhost:27017/itsd_copilot'
     KNOWLEDGE_BASE_FILE = os.environ.get('KNOWLEDGE_BASE_FILE') or '../knowledge_base/unix_kb.json'
-    FEEDBACK_FILE = os.environ.get('FEEDBACK_FILE') or '../knowledge_base/feedback_log.json'
\ No newline at end of file
+    FEEDBACK_FILE = os.environ.get('FEEDBACK_FILE') or '../knowledge_base/feedback_log.jsonl'
+    # Seconds between KB file change checks; 0 disables the watcher
+    KB_WATCH_INTERVAL = float(os.environ.get('KB_WATCH_INTERVAL') or 5)
+    # Precompiled KB snapshot (see knowledge_base/compile_kb.py); defaults to
+    # the KB file name with a .kbsnap extension
+    KB_SNAPSHOT_FILE = os.environ.get('KB_SNAPSHOT_FILE')
+    # Full /chat/query response cache; a size of 0 disables it
+    QUERY_CACHE_SIZE = int(os.environ.get('QUERY_CACHE_SIZE') or 1024)
+    QUERY_CACHE_TTL = float(os.environ.get('QUERY_CACHE_TTL') or 300)
+    # Build the optional NumPy TF-IDF article engine (selectable per request)
+    TFIDF_ENABLED = (os.environ.get('TFIDF_ENABLED') or 'false').lower() in ('1', 'true', 'yes')
+    # Where the KB lives: 'json' (KNOWLEDGE_BASE_FILE) or 'mongo' (MONGODB_URI,
+    # filled with knowledge_base/import_kb_mongo.py)
+    KB_BACKEND = (os.environ.get('KB_BACKEND') or 'json').lower()
+    MONGO_POOL_SIZE = int(os.environ.get('MONGO_POOL_SIZE') or 50)
+    # Largest number of queries accepted by /chat/query-batch
+    BATCH_MAX_QUERIES = int(os.environ.get('BATCH_MAX_QUERIES') or 20000)
+    # Worker processes for the NLP and KB search stage; 0 runs it in the web
+    # process. Pair with threaded gunicorn workers (GUNICORN_CMD_ARGS="--threads 16")
+    QUERY_WORKERS = int(os.environ.get('QUERY_WORKERS') or 0)
+    QUERY_WORKER_TIMEOUT = float(os.environ.get('QUERY_WORKER_TIMEOUT') or 30)
+    # Per-process stage histogram files, summed by /metrics across gunicorn
+    # and query workers; unset keeps them in process memory. Start each
+    # deployment with an empty directory
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # Structured JSON log lines on stdout, written by a background thread
+    LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'
+    # Share of queries whose analysis and KB matches are logged (0 to 1)
+    LOG_QUERY_SAMPLE_RATE = float(os.environ.get('LOG_QUERY_SAMPLE_RATE') or 0.01)
+    # Records waiting for the writer thread; further records are dropped
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE') or 10000)
+    # Feedback is appended to FEEDBACK_FILE (JSON lines) by a background
+    # writer, in batches of up to FEEDBACK_BATCH_SIZE entries or every
+    # FEEDBACK_FLUSH_INTERVAL seconds. FEEDBACK_FSYNC is always (every
+    # batch), interval (at most once a second) or never
+    FEEDBACK_BATCH_SIZE = int(os.environ.get('FEEDBACK_BATCH_SIZE') or 500)
+    FEEDBACK_FLUSH_INTERVAL = float(os.environ.get('FEEDBACK_FLUSH_INTERVAL') or 1.0)
+    FEEDBACK_FSYNC = (os.environ.get('FEEDBACK_FSYNC') or 'interval').lower()
+    # Rotate to FEEDBACK_FILE.1 ... .N past this size; 0 never rotates
+    FEEDBACK_MAX_BYTES = int(os.environ.get('FEEDBACK_MAX_BYTES') or 50 * 1024 * 1024)
+    FEEDBACK_BACKUPS = int(os.environ.get('FEEDBACK_BACKUPS') or 5)
+    # Entries waiting for the writer before submissions get 503
+    FEEDBACK_MAX_PENDING = int(os.environ.get('FEEDBACK_MAX_PENDING') or 100000)
+    # Helpfulness aggregates read from FEEDBACK_FILE reorder article results:
+    # well-rated articles gain up to FEEDBACK_PRIOR_WEIGHT of their score and
+    # poorly rated ones lose as much. Admins can switch the prior at runtime
+    # (POST /kb-admin/ranking-prior)
+    FEEDBACK_RANKING_PRIOR = (os.environ.get('FEEDBACK_RANKING_PRIOR') or 'true').lower() in ('1', 'true', 'yes')
+    FEEDBACK_PRIOR_WEIGHT = float(os.environ.get('FEEDBACK_PRIOR_WEIGHT') or 0.2)
+    # Verified JWT claims cached per worker, keyed by token digest
+    TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE') or 10000)
+    # Logged-out and revoked tokens, shared by all workers
+    REVOKED_TOKENS_FILE = os.environ.get('REVOKED_TOKENS_FILE') or '../knowledge_base/revoked_tokens.jsonl'
+    # Admission control for /chat/query, /query-stream and /query-batch, per
+    # gunicorn worker: each user may send USER_QUERY_RATE queries a second
+    # (bursts of USER_QUERY_BURST; a batch costs one per 500-query chunk)
+    # and at most MAX_CONCURRENT_QUERIES run at once; the rest get 429/503
+    # with Retry-After right away. 0 disables a limit
+    USER_QUERY_RATE = float(os.environ.get('USER_QUERY_RATE') or 2)
+    USER_QUERY_BURST = float(os.environ.get('USER_QUERY_BURST') or 10)
+    MAX_CONCURRENT_QUERIES = int(os.environ.get('MAX_CONCURRENT_QUERIES') or 8)
+    # Safe automation commands run on this host (POST /chat/command): at most
+    # COMMAND_MAX_CONCURRENT at once per worker, killed after COMMAND_TIMEOUT
+    # seconds, output cut at COMMAND_MAX_OUTPUT bytes; results are shared
+    # for COMMAND_CACHE_TTL seconds (0 disables the cache)
+    COMMAND_MAX_CONCURRENT = int(os.environ.get('COMMAND_MAX_CONCURRENT') or 4)
+    COMMAND_TIMEOUT = float(os.environ.get('COMMAND_TIMEOUT') or 5)
+    COMMAND_MAX_OUTPUT = int(os.environ.get('COMMAND_MAX_OUTPUT') or 256 * 1024)
+    COMMAND_CACHE_TTL = float(os.environ.get('COMMAND_CACHE_TTL') or 2)
+    # Safe commands on remote hosts (POST /chat/command-fanout) over FANOUT_TRANSPORT:
+    # ssh, or local to run them on this machine for every host (testing).
+    # Patterns such as prod- or server-web-* expand against HOST_INVENTORY_FILE
+    # (one host per line)
+    FANOUT_TRANSPORT = (os.environ.get('FANOUT_TRANSPORT') or 'ssh').lower()
+    HOST_INVENTORY_FILE = os.environ.get('HOST_INVENTORY_FILE') or '../knowledge_base/hosts.txt'
+    FANOUT_MAX_CONCURRENT = int(os.environ.get('FANOUT_MAX_CONCURRENT') or 50)
+    FANOUT_TIMEOUT = float(os.environ.get('FANOUT_TIMEOUT') or 10)
+    FANOUT_MAX_HOSTS = int(os.environ.get('FANOUT_MAX_HOSTS') or 1000)
@@ -0,0 +1,150 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from .config import Config
+
+# Per-query debug output (analysis, KB matches), written by log_query() for
+# a sample of queries only, see LOG_QUERY_SAMPLE_RATE
+QUERY = 15
+logging.addLevelName(QUERY, 'QUERY')
+
+# Every module logs under the app package logger
+APP_LOGGER = 'app'
+_RECORD_FIELDS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "pid": record.process,
+            "msg": record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks the caller.
+
+    Records are queued as they are, with their arguments unformatted, and
+    the listener thread does all formatting and writing. When the queue is
+    full the record is dropped and counted instead of waiting for the
+    output to catch up.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _AsyncLogging:
+    """The queue, handler and writer thread of the current process"""
+
+    def __init__(self, stream, max_queue: int):
+        self.stream = stream
+        self.max_queue = max_queue
+        self.handler = DroppingQueueHandler(queue.Queue(max_queue))
+        output = logging.StreamHandler(stream)
+        output.setFormatter(JsonFormatter())
+        self.listener = QueueListener(self.handler.queue, output)
+        self.listener.start()
+
+    def restart_after_fork(self):
+        # The writer thread does not survive fork and the queue's locks
+        # may have been held by it; a child starts with fresh ones
+        self.handler.queue = queue.Queue(self.max_queue)
+        self.listener.queue = self.handler.queue
+        self.listener._thread = None
+        self.listener.start()
+
+    def stop(self):
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+
+_current: Optional[_AsyncLogging] = None
+_query_sample_rate = 0.0
+_lock = threading.Lock()
+
+
+def _after_fork_in_child():
+    if _current is not None:
+        _current.restart_after_fork()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def configure_logging(level: Optional[str] = None, sample_rate: Optional[float] = None,
+                      stream=None, max_queue: Optional[int] = None) -> logging.Logger:
+    """Send the app logger's records as JSON lines through a background thread.
+
+    Settings default to LOG_LEVEL, LOG_QUERY_SAMPLE_RATE and LOG_QUEUE_SIZE
+    from Config. Calling it again replaces the previous setup, flushing
+    what was queued.
+    """
+    global _current, _query_sample_rate
+    level = level or Config.LOG_LEVEL
+    sample_rate = Config.LOG_QUERY_SAMPLE_RATE if sample_rate is None else sample_rate
+    max_queue = max_queue or Config.LOG_QUEUE_SIZE
+
+    logger = logging.getLogger(APP_LOGGER)
+    with _lock:
+        if _current is not None:
+            logger.removeHandler(_current.handler)
+            _current.stop()
+        _current = _AsyncLogging(stream or sys.stdout, max_queue)
+        _query_sample_rate = sample_rate
+        logger.addHandler(_current.handler)
+        logger.setLevel(level.upper())
+        logger.propagate = False
+    return logger
+
+
+def log_query(logger: logging.Logger, msg: str, **fields):
+    """Write a QUERY record for a sample of calls, whatever the log level.
+
+    The sampling decision comes first, so unsampled queries cost one
+    random() call and no record is built for them.
+    """
+    if _query_sample_rate <= 0 or random.random() >= _query_sample_rate:
+        return
+    logger.handle(logger.makeRecord(logger.name, QUERY, '', 0, msg, (), None, extra=fields))
+
+
+def dropped_records() -> int:
+    """Records dropped because the log queue was full"""
+    return _current.handler.dropped if _current is not None else 0
+
+
+@atexit.register
+def _flush_at_exit():
+    if _current is not None:
+        _current.stop()
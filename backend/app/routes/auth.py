@@ -1,13 +1,89 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask import Blueprint, current_app, g, request, jsonify
+from flask_jwt_extended import create_access_token, verify_jwt_in_request
+from functools import wraps
+from time import perf_counter
 import datetime
+from typing import Dict, Optional
 
+from ..config import Config
 # Import our new auth service
 from ..services.auth_service import AuthService
+from ..services.metrics import stage_metrics
+from ..services.token_cache import RevocationList, TokenCache
 
 auth_bp = Blueprint('auth', __name__)
 auth_service = AuthService()
 
+ACCESS_TOKEN_LIFETIME = datetime.timedelta(hours=24)
+# Claims of tokens verified in this worker, and tokens revoked in any worker
+token_cache = TokenCache(Config.TOKEN_CACHE_SIZE)
+revocations = RevocationList(Config.REVOKED_TOKENS_FILE)
+
+@auth_bp.record_once
+def register_revocation_check(state):
+    # Tokens that miss the cache are checked by flask-jwt-extended itself
+    state.app.extensions['flask-jwt-extended'].token_in_blocklist_loader(
+        lambda jwt_header, jwt_data: revocations.is_revoked(jwt_data)
+    )
+
+def verify_token():
+    """verify_jwt_in_request() that reuses the claims of tokens verified before.
+
+    Either way the claims are left in g.token_claims for current_claims();
+    a cache hit never touches flask-jwt-extended, so its get_jwt() is only
+    valid on a miss and routes must not use it.
+    """
+    authorization = request.headers.get('Authorization', '')
+    token = authorization[7:] if authorization.startswith('Bearer ') else None
+    if token:
+        cached = token_cache.get(token)
+        if cached is not None and not revocations.is_revoked(cached[1]):
+            g.token_claims = cached[1]
+            return cached
+    verified = verify_jwt_in_request()
+    if verified is not None:
+        g.token_claims = verified[1]
+        if token:
+            token_cache.put(token, *verified)
+    return verified
+
+def current_claims() -> Dict:
+    """Claims of the token verified for this request by token_required()"""
+    return g.token_claims
+
+def current_identity() -> Optional[str]:
+    """Identity (username) of the token verified for this request"""
+    return current_claims().get(current_app.config.get('JWT_IDENTITY_CLAIM', 'sub'))
+
+def token_required(fn):
+    """jwt_required() backed by the claims cache; records the check as the jwt stage"""
+    @wraps(fn)
+    def decorator(*args, **kwargs):
+        started = perf_counter()
+        try:
+            verify_token()
+        finally:
+            stage_metrics.observe('jwt', perf_counter() - started)
+        return current_app.ensure_sync(fn)(*args, **kwargs)
+    return decorator
+
+def current_role():
+    """Role claim of the current token; tokens issued before roles were embedded fall back to a lookup"""
+    claims = current_claims()
+    if 'role' in claims:
+        return claims['role']
+    user = auth_service.get_user(current_identity())
+    return user['role'] if user else None
+
+def admin_required(fn):
+    """token_required() that also requires the admin role"""
+    @wraps(fn)
+    def decorator(*args, **kwargs):
+        if current_role() != 'admin':
+            return jsonify({"error": "Admin access required"}), 403
+        return current_app.ensure_sync(fn)(*args, **kwargs)
+    return token_required(decorator)
+
 @auth_bp.route('/login', methods=['POST'])
 def login():
     try:
@@ -25,10 +101,11 @@ def login():
         # Use our auth service
         user = auth_service.authenticate(username, password)
         if user:
-            # Create access token
+            # Create access token; the role travels in its claims
             access_token = create_access_token(
                 identity=username,
-                expires_delta=datetime.timedelta(hours=24)
+                additional_claims=auth_service.token_claims(user),
+                expires_delta=ACCESS_TOKEN_LIFETIME
             )
             
             return jsonify({
@@ -41,11 +118,47 @@ def login():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@auth_bp.route('/logout', methods=['POST'])
+@token_required
+def logout():
+    # Rejected by every worker from its next revocation poll on
+    claims = current_claims()
+    revocations.revoke_token(claims['jti'], claims.get('exp', 0))
+    token_cache.discard(request.headers['Authorization'][7:])
+    return jsonify({"message": "Logged out"}), 200
+
+@auth_bp.route('/revoke', methods=['POST'])
+@admin_required
+def revoke():
+    data = request.get_json(silent=True) or {}
+    
+    exp = data.get('exp')
+    if exp is not None and (isinstance(exp, bool) or not isinstance(exp, (int, float))):
+        return jsonify({"error": "exp must be a number (seconds since the epoch)"}), 400
+    if not all(isinstance(data.get(key), (str, type(None))) for key in ('jti', 'username')):
+        return jsonify({"error": "jti and username must be strings"}), 400
+    
+    if data.get('jti'):
+        # Without the token's expiry, keep the entry for the longest lifetime
+        expires_at = exp or datetime.datetime.now().timestamp() + ACCESS_TOKEN_LIFETIME.total_seconds()
+        revocations.revoke_token(data['jti'], expires_at)
+    elif data.get('username'):
+        revocations.revoke_user(data['username'], ACCESS_TOKEN_LIFETIME.total_seconds())
+    else:
+        return jsonify({"error": "jti or username is required"}), 400
+    
+    return jsonify({"message": "Revoked", "revoked": {key: data[key] for key in ('jti', 'username') if key in data}}), 200
+
+@auth_bp.route('/token-cache', methods=['GET'])
+@admin_required
+def token_cache_stats():
+    return jsonify(token_cache.stats()), 200
+
 @auth_bp.route('/profile', methods=['GET'])
-@jwt_required()
+@token_required
 def profile():
     try:
-        current_user = get_jwt_identity()
+        current_user = current_identity()
         user_data = auth_service.get_user(current_user)
         
         if user_data:
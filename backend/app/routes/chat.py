@@ -1,16 +1,33 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, Response, make_response, request, jsonify
+import json
+import logging
+import math
 import os
+from functools import wraps
+from time import perf_counter
+
+from ..config import Config
+from ..logging_setup import log_query
 
 # Import our services
+from ..services.admission import AdmissionController
 from ..services.nlp_engine import NlpEngine
-from ..services.knowledge_service import KnowledgeService
+from ..services.knowledge_service import DEFAULT_ARTICLE_ENGINE, create_knowledge_service
 from ..services.automation_service import AutomationService
+from ..services.command_runner import BackgroundLoop, CommandRunner
+from ..services.fanout import FanOut, create_transport, read_inventory
+from ..services.query_cache import QueryCache
+from ..services.query_pipeline import BATCH_CHUNK_SIZE, QueryPipeline, query_cache_key
+from ..services.worker_pool import QueryWorkerPool
+from ..services.metrics import stage_metrics
+from .auth import admin_required, current_identity, token_required
 
 # Create blueprint
 chat_bp = Blueprint('chat', __name__)
+logger = logging.getLogger(__name__)
 
-# Initialize services
+# Initialize services. Under gunicorn with preload (gunicorn.conf.py) this
+# runs once in the master and workers share the result copy-on-write
 nlp_engine = NlpEngine()
 
 # Get the knowledge base file path - FIXED PATH
@@ -19,19 +36,89 @@ backend_dir = os.path.dirname(os.path.dirname(current_dir))
 project_root = os.path.dirname(backend_dir)
 kb_file = os.path.join(project_root, 'knowledge_base', 'ford_kb.json')
 
-print(f"Looking for KB file at: {kb_file}")
+logger.info(f"Looking for KB file at: {kb_file}")
 
 # Check if file exists, if not use unix_kb.json as fallback
 if not os.path.exists(kb_file):
     kb_file = os.path.join(project_root, 'knowledge_base', 'unix_kb.json')
-    print(f"Ford KB not found, using fallback: {kb_file}")
+    logger.info(f"Ford KB not found, using fallback: {kb_file}")
+
+kb_settings = {
+    "kb_file": kb_file,
+    "snapshot_file": Config.KB_SNAPSHOT_FILE or os.path.splitext(kb_file)[0] + '.kbsnap',
+    "enable_tfidf": Config.TFIDF_ENABLED,
+    "kb_backend": Config.KB_BACKEND,
+    "mongodb_uri": Config.MONGODB_URI,
+    "mongo_pool_size": Config.MONGO_POOL_SIZE,
+    "watch_interval": Config.KB_WATCH_INTERVAL,
+    "feedback_file": Config.FEEDBACK_FILE,
+    "ranking_prior": Config.FEEDBACK_RANKING_PRIOR,
+    "prior_weight": Config.FEEDBACK_PRIOR_WEIGHT
+}
+knowledge_service = create_knowledge_service(**kb_settings)
+# Local and remote safe commands share one event loop thread
+command_loop = BackgroundLoop()
+command_runner = CommandRunner(Config.COMMAND_MAX_CONCURRENT, Config.COMMAND_TIMEOUT,
+                               Config.COMMAND_MAX_OUTPUT, Config.COMMAND_CACHE_TTL, command_loop)
+fan_out = FanOut(create_transport(Config.FANOUT_TRANSPORT), Config.FANOUT_MAX_CONCURRENT, Config.FANOUT_TIMEOUT,
+                 Config.COMMAND_MAX_OUTPUT, command_loop)
+automation_service = AutomationService(command_runner, fan_out, read_inventory(Config.HOST_INVENTORY_FILE))
+# A slim image without procps has no ps, free or uptime
+missing_commands = automation_service.missing_commands()
+if missing_commands:
+    logger.warning(f"Safe commands unavailable on this host: {', '.join(missing_commands)}")
+query_cache = QueryCache(Config.QUERY_CACHE_SIZE, Config.QUERY_CACHE_TTL)
+query_pipeline = QueryPipeline(nlp_engine, knowledge_service, automation_service, query_cache)
+# Optional process pool for the CPU-bound stage; its workers start on first use
+query_workers = QueryWorkerPool(Config.QUERY_WORKERS, kb_settings, Config.QUERY_WORKER_TIMEOUT,
+                                metrics_dir=Config.METRICS_DIR) if Config.QUERY_WORKERS > 0 else None
+
+# Per-user rate and concurrency limits for the query routes, checked before any work
+admission = AdmissionController(Config.USER_QUERY_RATE, Config.USER_QUERY_BURST, Config.MAX_CONCURRENT_QUERIES)
+
+def admission_required(fn=None, cost=None):
+    """Refuse the request right away with 429/503 and Retry-After when over capacity.
+
+    cost, a function of the request's JSON body, gives the number of
+    tokens the request takes from the user's bucket (default 1). A
+    streamed response keeps its concurrency slot until it is closed.
+    """
+    if fn is None:
+        return lambda fn: admission_required(fn, cost)
+
+    @wraps(fn)
+    def decorator(*args, **kwargs):
+        tokens = cost(request.get_json(silent=True)) if cost is not None else 1
+        refused = admission.try_admit(current_identity(), tokens)
+        if refused is not None:
+            status, retry_after = refused
+            error = "Too many queries, please slow down" if status == 429 else "Service busy, please retry shortly"
+            return jsonify({"error": error}), status, {"Retry-After": str(retry_after)}
+        try:
+            response = make_response(fn(*args, **kwargs))
+        except BaseException:
+            admission.release()
+            raise
+        if response.is_streamed:
+            response.call_on_close(admission.release)
+        else:
+            admission.release()
+        return response
+    return decorator
 
-knowledge_service = KnowledgeService(kb_file)
-automation_service = AutomationService()
+def batch_cost(data) -> int:
+    """One token per chunk of a batch (the unit the pipeline answers at once);
+    malformed or oversized batches, refused by the view, cost one"""
+    queries = data.get('queries') if isinstance(data, dict) else None
+    if not isinstance(queries, list) or not queries or len(queries) > Config.BATCH_MAX_QUERIES:
+        return 1
+    return math.ceil(len(queries) / BATCH_CHUNK_SIZE)
 
 @chat_bp.route('/query', methods=['POST'])
-@jwt_required()
+@token_required
+@admission_required
 def chat_query():
+    started = perf_counter()
     try:
         # Get JSON data from request
         data = request.get_json()
@@ -44,37 +131,253 @@ def chat_query():
         if not user_query:
             return jsonify({"error": "Query is required"}), 400
         
-        print(f"Processing query: {user_query}")
+        # Optional article ranking engine: bm25 (default), keyword or tfidf
+        engine = data.get('engine') or DEFAULT_ARTICLE_ENGINE
+        try:
+            knowledge_service.check_engine(engine)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        # Process query with NLP
-        intent, entities = nlp_engine.process_query(user_query)
-        print(f"Intent: {intent}, Entities: {entities}")
+        # Repeated queries are served from cache until the KB version or
+        # the ranking prior switch changes
+        cache_key = query_cache_key(user_query, engine)
+        kb_version = knowledge_service.version
+        cache_version = knowledge_service.cache_version()
+        cached_response = query_cache.get(cache_key, cache_version)
+        if cached_response is not None:
+            stage_metrics.observe('query', perf_counter() - started)
+            log_query(logger, "Answered query from cache", query=user_query, engine=engine,
+                      kb_matches=cached_response['kb_matches'])
+            return jsonify(cached_response), 200
         
-        # Search knowledge base with user query for better matching
-        kb_results = knowledge_service.search_knowledge(intent, entities, user_query)
-        print(f"KB Results: {kb_results}")
+        # NLP, KB search, automation suggestions and formatting
+        if query_workers is not None:
+            response, answered_version = query_workers.answer(user_query, engine)
+        else:
+            response, answered_version = query_pipeline.answer(user_query, engine), kb_version
+        log_query(logger, "Answered query", query=user_query, engine=engine, intent=response['intent'],
+                  entities=response['entities'], kb_matches=response['kb_matches'])
         
-        # Generate automation suggestions
-        automation_suggestions = automation_service.generate_command_sequence(intent, entities)
+        # A worker may still be on the previous KB version mid-reload
+        if answered_version == kb_version:
+            query_cache.put(cache_key, cache_version, response)
+        stage_metrics.observe('query', perf_counter() - started)
+        return jsonify(response), 200
         
-        # Format response
-        response_text = knowledge_service.format_response(kb_results, automation_suggestions)
+    except Exception as e:
+        logger.exception(f"Error in chat_query: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+def stream_events(events, stream_format: str):
+    """Encode (event, data) pairs as Server-Sent Events or NDJSON lines"""
+    for event, data in events:
+        if stream_format == 'ndjson':
+            yield json.dumps({"event": event, "data": data}) + "\n"
+        else:
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@chat_bp.route('/query-stream', methods=['POST'])
+@token_required
+@admission_required
+def chat_query_stream():
+    try:
+        data = request.get_json()
         
-        # Prepare final response
-        response = {
-            "intent": intent,
-            "entities": entities,
-            "response": response_text,
-            "automation_suggestions": automation_suggestions,
-            "kb_matches": list(kb_results.keys()) if kb_results else []
-        }
+        if not data:
+            return jsonify({"error": "No JSON data provided"}), 400
+            
+        user_query = data.get('query', '')
         
-        return jsonify(response), 200
+        if not user_query:
+            return jsonify({"error": "Query is required"}), 400
+        
+        engine = data.get('engine') or DEFAULT_ARTICLE_ENGINE
+        try:
+            knowledge_service.check_engine(engine)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        # Server-Sent Events by default; NDJSON for clients that ask for it
+        stream_format = data.get('format') or \
+            ('ndjson' if 'application/x-ndjson' in request.headers.get('Accept', '') else 'sse')
+        if stream_format not in ('sse', 'ndjson'):
+            return jsonify({"error": "format must be sse or ndjson"}), 400
+        
+        # Streams always run in this process, even when QUERY_WORKERS is set
+        cache_key = query_cache_key(user_query, engine)
+        snapshot = knowledge_service.snapshot
+        cache_version = knowledge_service.cache_version(snapshot)
+        cached_response = query_cache.get(cache_key, cache_version)
+        
+        def events():
+            if cached_response is not None:
+                yield 'analysis', {"intent": cached_response['intent'], "entities": cached_response['entities']}
+                yield 'done', cached_response
+                return
+            try:
+                for event, payload in query_pipeline.answer_stream(user_query, engine, snapshot):
+                    if event == 'done':
+                        query_cache.put(cache_key, cache_version, payload)
+                        log_query(logger, "Streamed query", query=user_query, engine=engine,
+                                  intent=payload['intent'], kb_matches=payload['kb_matches'])
+                    yield event, payload
+            except Exception as e:
+                logger.exception(f"Error in chat_query_stream: {str(e)}")
+                yield 'error', {"error": "Internal server error"}
+        
+        mimetype = 'application/x-ndjson' if stream_format == 'ndjson' else 'text/event-stream'
+        return Response(stream_events(events(), stream_format), mimetype=mimetype, headers={
+            "Cache-Control": "no-cache",
+            # Stop nginx from buffering the stream
+            "X-Accel-Buffering": "no"
+        })
+        
+    except Exception as e:
+        logger.exception(f"Error in chat_query_stream: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+@chat_bp.route('/query-batch', methods=['POST'])
+@token_required
+@admission_required(cost=batch_cost)
+def chat_query_batch():
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({"error": "No JSON data provided"}), 400
+        
+        queries = data.get('queries')
+        
+        if not isinstance(queries, list) or not queries:
+            return jsonify({"error": "queries must be a non-empty list"}), 400
+        
+        if len(queries) > Config.BATCH_MAX_QUERIES:
+            return jsonify({"error": f"At most {Config.BATCH_MAX_QUERIES} queries per batch"}), 413
+        
+        engine = data.get('engine') or DEFAULT_ARTICLE_ENGINE
+        try:
+            knowledge_service.check_engine(engine)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        # Every query in the batch is answered from the same KB snapshot
+        # (or, with query workers, from each worker's current one)
+        snapshot = knowledge_service.snapshot
+        logger.info(f"Processing batch of {len(queries)} queries (KB {snapshot.version})")
+        
+        def generate():
+            # Results are streamed chunk by chunk instead of being held
+            # in memory as one document
+            yield json.dumps({"kb_version": snapshot.version, "engine": engine})[:-1] + ', "results": ['
+            errors = 0
+            answered = 0
+            if query_workers is not None:
+                results = query_workers.answer_batch(queries, engine)
+            else:
+                results = query_pipeline.answer_batch(queries, engine, snapshot)
+            try:
+                for result in results:
+                    if 'error' in result:
+                        errors += 1
+                    yield (', ' if result['index'] else '') + json.dumps(result)
+                    answered = result['index'] + 1
+            except Exception as e:
+                # The 200 is already sent: fail the remaining items, keep the document valid
+                logger.exception(f"Error in chat_query_batch after {answered} results: {str(e)}")
+                for index in range(answered, len(queries)):
+                    errors += 1
+                    yield (', ' if index else '') + json.dumps({"index": index, "error": "Failed to process query"})
+            yield f'], "count": {len(queries)}, "errors": {errors}}}'
+        
+        return Response(generate(), mimetype='application/json')
         
     except Exception as e:
-        print(f"Error in chat_query: {str(e)}")
+        logger.exception(f"Error in chat_query_batch: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
+@chat_bp.route('/command', methods=['POST'])
+@admin_required
+def run_safe_command():
+    data = request.get_json(silent=True) or {}
+    command_key = data.get('command')
+    
+    if command_key not in automation_service.safe_commands:
+        return jsonify({
+            "error": "command must be one of the safe commands",
+            "safe_commands": sorted(automation_service.safe_commands)
+        }), 400
+    
+    # Optional structured output: true, or parser options such as
+    # {"top": 10, "sort": "mem"} for process_list or {"min_use": 90} for disk_space
+    parse = data.get('parse')
+    if parse is True:
+        parse = {}
+    elif parse is False:
+        parse = None
+    elif parse is not None and not isinstance(parse, dict):
+        return jsonify({"error": "parse must be true or an object of parser options"}), 400
+    
+    try:
+        result = automation_service.execute_safe_command(command_key, parse)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if result.get('timed_out'):
+        return jsonify(result), 504
+    if 'error' in result:
+        return jsonify(result), 500
+    return jsonify(result), 200
+
+@chat_bp.route('/command-fanout', methods=['POST'])
+@admin_required
+def run_safe_command_on_hosts():
+    data = request.get_json(silent=True) or {}
+    command_key = data.get('command')
+    
+    if command_key not in automation_service.safe_commands:
+        return jsonify({
+            "error": "command must be one of the safe commands",
+            "safe_commands": sorted(automation_service.safe_commands)
+        }), 400
+    
+    # Hosts or patterns given explicitly, or the server names in a query
+    names = data.get('hosts')
+    if names is None and data.get('query'):
+        names = nlp_engine.extract_entities(data['query']).get('server_name', [])
+    if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+        return jsonify({"error": "hosts must be a list of host names or patterns, or give a query"}), 400
+    
+    try:
+        hosts = automation_service.target_hosts(names)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not hosts:
+        return jsonify({"error": "No hosts matched", "hosts": names}), 400
+    if len(hosts) > Config.FANOUT_MAX_HOSTS:
+        return jsonify({"error": f"At most {Config.FANOUT_MAX_HOSTS} hosts per command"}), 413
+    
+    stream_format = data.get('format') or \
+        ('ndjson' if 'application/x-ndjson' in request.headers.get('Accept', '') else 'sse')
+    if stream_format not in ('sse', 'ndjson'):
+        return jsonify({"error": "format must be sse or ndjson"}), 400
+    
+    logger.info(f"Running {command_key} on {len(hosts)} hosts for {current_identity()}")
+    
+    def events():
+        failed = 0
+        yield 'hosts', {"command": automation_service.safe_commands[command_key], "hosts": hosts}
+        # One event per host as soon as it answers, fastest first
+        for result in automation_service.execute_on_hosts(command_key, hosts):
+            if 'error' in result or result.get('exit_code'):
+                failed += 1
+            yield 'host', result
+        yield 'done', {"hosts": len(hosts), "failed": failed}
+    
+    mimetype = 'application/x-ndjson' if stream_format == 'ndjson' else 'text/event-stream'
+    return Response(stream_events(events(), stream_format), mimetype=mimetype, headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
 @chat_bp.route('/test', methods=['GET'])
 def test():
     return jsonify({"message": "Chat route is working!"}), 200
\ No newline at end of file
@@ -1,11 +1,42 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required
 from datetime import datetime
+import logging
+from typing import List, Optional, Tuple
+
+from ..config import Config
+from ..services.feedback_log import FeedbackBacklogFull, FeedbackLog
+from ..services.knowledge_service import DEFAULT_ARTICLE_ENGINE
+from ..services.query_pipeline import query_cache_key
+from .auth import token_required
+from .chat import knowledge_service, nlp_engine, query_cache
 
 feedback_bp = Blueprint('feedback', __name__)
+logger = logging.getLogger(__name__)
+
+# Entries are written to disk in batches off the request path
+feedback_log = FeedbackLog(
+    Config.FEEDBACK_FILE,
+    batch_size=Config.FEEDBACK_BATCH_SIZE,
+    flush_interval=Config.FEEDBACK_FLUSH_INTERVAL,
+    fsync=Config.FEEDBACK_FSYNC,
+    max_bytes=Config.FEEDBACK_MAX_BYTES,
+    backups=Config.FEEDBACK_BACKUPS,
+    max_pending=Config.FEEDBACK_MAX_PENDING
+)
+
+def known_matches(intent: Optional[str], article_ids: List[str]) -> Tuple[Optional[str], List[str]]:
+    """The intent and (at most 10) article ids of an answer, minus any this service does not know
+
+    Keeps arbitrary client strings out of the per-worker aggregates and the
+    ranking prior built from them.
+    """
+    if intent not in nlp_engine.intent_patterns and intent != 'general_query':
+        intent = None
+    articles = knowledge_service.knowledge_base.get('articles', {})
+    return intent, [article_id for article_id in dict.fromkeys(article_ids) if article_id in articles][:10]
 
 @feedback_bp.route('/submit', methods=['POST'])
-@jwt_required()
+@token_required
 def submit_feedback():
     try:
         data = request.get_json()
@@ -15,17 +46,37 @@ def submit_feedback():
         was_helpful = data.get('was_helpful', False)
         user_feedback = data.get('user_feedback', '')
         
+        # What the answer matched, for the helpfulness analytics: as echoed
+        # by the client, else from the cached response to the same query
+        intent = data.get('intent') if isinstance(data.get('intent'), str) else None
+        article_ids = data.get('article_ids')
+        if not isinstance(article_ids, list) or not all(isinstance(a, str) for a in article_ids):
+            article_ids = None
+        if isinstance(query, str) and query and (not intent or article_ids is None):
+            engine = data.get('engine') if isinstance(data.get('engine'), str) else DEFAULT_ARTICLE_ENGINE
+            answered = query_cache.get(query_cache_key(query, engine), knowledge_service.cache_version())
+            if answered is not None:
+                intent = intent or answered['intent']
+                if article_ids is None:
+                    article_ids = answered.get('article_ids', [])
+        intent, article_ids = known_matches(intent, article_ids or [])
+        
         # Create feedback entry
         feedback_entry = {
             "query": query,
             "response": response,
             "was_helpful": was_helpful,
             "user_feedback": user_feedback,
+            "intent": intent,
+            "article_ids": article_ids,
             "timestamp": datetime.now().isoformat()
         }
         
-        # For now, just print the feedback (in real app, save to database)
-        print(f"📝 Feedback received: {feedback_entry}")
+        try:
+            feedback_log.append(feedback_entry)
+        except FeedbackBacklogFull as e:
+            logger.warning(f"Rejected feedback: {e}")
+            return jsonify({"error": "Feedback is temporarily unavailable, please retry"}), 503, {"Retry-After": "1"}
         
         return jsonify({
             "message": "Feedback submitted successfully", 
@@ -33,7 +84,7 @@ def submit_feedback():
         }), 200
         
     except Exception as e:
-        print(f"Error in submit_feedback: {str(e)}")
+        logger.exception(f"Error in submit_feedback: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 @feedback_bp.route('/test', methods=['GET'])
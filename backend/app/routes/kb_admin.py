@@ -1,24 +1,83 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from .auth import admin_required, current_identity
+from .chat import admission, command_runner, knowledge_service, query_cache
 
 kb_admin_bp = Blueprint('kb_admin', __name__)
 
 @kb_admin_bp.route('/articles', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_articles():
-    # Check if user has admin role
-    current_user = get_jwt_identity()
+    current_user = current_identity()
     
-    # Simple role check
-    if current_user != 'admin':
-        return jsonify({"error": "Admin access required"}), 403
+    tag = request.args.get('tag')
+    limit = request.args.get('limit', 100, type=int)
     
     return jsonify({
         "message": "KB admin articles endpoint", 
         "user": current_user,
-        "articles": ["KB001", "KB002"]
+        "articles": knowledge_service.list_articles(tag, limit)
     }), 200
 
+@kb_admin_bp.route('/status', methods=['GET'])
+@admin_required
+def kb_status():
+    return jsonify(knowledge_service.status()), 200
+
+@kb_admin_bp.route('/reload', methods=['POST'])
+@admin_required
+def kb_reload():
+    # Build the new snapshot in the background; queries keep using the
+    # current one until it is swapped in
+    started = knowledge_service.reload_in_background(force=True)
+    
+    return jsonify({
+        "message": "KB reload started" if started else "KB reload already in progress",
+        "status": knowledge_service.status()
+    }), 202
+
+@kb_admin_bp.route('/cache-stats', methods=['GET'])
+@admin_required
+def cache_stats():
+    return jsonify(query_cache.stats()), 200
+
+@kb_admin_bp.route('/admission-stats', methods=['GET'])
+@admin_required
+def admission_stats():
+    return jsonify(admission.stats()), 200
+
+@kb_admin_bp.route('/command-stats', methods=['GET'])
+@admin_required
+def command_stats():
+    return jsonify(command_runner.stats()), 200
+
+@kb_admin_bp.route('/feedback-analytics', methods=['GET'])
+@admin_required
+def feedback_analytics():
+    analytics = knowledge_service.feedback_analytics
+    if analytics is None:
+        return jsonify({"error": "Feedback analytics are not enabled"}), 404
+    
+    return jsonify(analytics.summary(request.args.get('limit', 20, type=int))), 200
+
+@kb_admin_bp.route('/ranking-prior', methods=['POST'])
+@admin_required
+def ranking_prior():
+    analytics = knowledge_service.feedback_analytics
+    if analytics is None:
+        return jsonify({"error": "Feedback analytics are not enabled"}), 404
+    
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data.get('enabled'), bool):
+        return jsonify({"error": "enabled must be true or false"}), 400
+    
+    # Other workers pick the switch up on their next feedback poll; cached
+    # responses are keyed on it (cache_version), so each worker drops its
+    # own as it does
+    analytics.set_ranking_prior(data['enabled'])
+    
+    return jsonify({"ranking_prior": analytics.ranking_prior}), 200
+
 @kb_admin_bp.route('/test', methods=['GET'])
 def test():
     return jsonify({"message": "KB Admin route is working!"}), 200
\ No newline at end of file
@@ -0,0 +1,14 @@
+from flask import Blueprint, Response, jsonify, request
+
+from ..config import Config
+from ..services.metrics import stage_metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    # Optional shared secret for scrapers; open when METRICS_TOKEN is unset
+    if Config.METRICS_TOKEN and request.headers.get('Authorization') != f"Bearer {Config.METRICS_TOKEN}":
+        return jsonify({"error": "Invalid metrics token"}), 401
+    
+    return Response(stage_metrics.render(), mimetype='text/plain; version=0.0.4')
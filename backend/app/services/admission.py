@@ -0,0 +1,110 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+
+class TokenBuckets:
+    """Per-key token buckets refilling at rate tokens/second up to burst.
+
+    A request for more than burst tokens may leave a bucket in debt, by at
+    most burst tokens. Buckets are kept in order of last use, and one idle
+    for 2 * burst / rate seconds has refilled completely even from the
+    deepest debt, so it is indistinguishable from a new one and is
+    dropped: memory stays proportional to the keys active in that window.
+    """
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.idle_seconds = 2 * burst / rate
+        self._clock = clock
+        self._buckets: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, count: int = 1) -> float:
+        """Take count tokens; returns 0 when granted, else seconds until they are available.
+
+        A count above burst is granted once the bucket is full and leaves it
+        in debt, capped at burst tokens, so the key's next grant is at most
+        (burst + 1) / rate seconds away.
+        """
+        now = self._clock()
+        with self._lock:
+            buckets = self._buckets
+            while buckets:
+                oldest = next(iter(buckets.values()))
+                if now - oldest[1] < self.idle_seconds:
+                    break
+                buckets.popitem(last=False)
+
+            bucket = buckets.pop(key, None)
+            tokens = self.burst if bucket is None else min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            needed = min(count, self.burst)
+            if tokens >= needed:
+                tokens = max(tokens - count, -self.burst)
+                wait = 0.0
+            else:
+                wait = (needed - tokens) / self.rate
+            buckets[key] = (tokens, now)
+            return wait
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class AdmissionController:
+    """Fail-fast admission for expensive requests.
+
+    Each user draws from a token bucket (user_rate requests per second,
+    bursts of user_burst), and at most max_concurrent admitted requests
+    run at once. A request over either limit is refused immediately with
+    the status to return (429 for the user's rate, 503 when the service is
+    full) and a Retry-After in seconds, instead of queueing behind the
+    ones already running. A rate or limit of 0 disables that check. State
+    is per process, so with several gunicorn workers the limits apply to
+    each worker.
+    """
+
+    def __init__(self, user_rate: float = 0, user_burst: float = 10, max_concurrent: int = 0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.buckets = TokenBuckets(user_rate, max(user_burst, 1), clock) if user_rate > 0 else None
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+        self.admitted = 0
+        self.rate_limited = 0
+        self.shed = 0
+        self._lock = threading.Lock()
+
+    def try_admit(self, user: str, cost: int = 1) -> Optional[Tuple[int, int]]:
+        """Admit a request costing cost tokens, or return (status, retry_after_seconds) to refuse it.
+
+        Every admitted request must be followed by release().
+        """
+        with self._lock:
+            if self.max_concurrent and self.in_flight >= self.max_concurrent:
+                self.shed += 1
+                return 503, 1
+            if self.buckets is not None:
+                wait = self.buckets.take(user, cost)
+                if wait > 0:
+                    self.rate_limited += 1
+                    return 429, math.ceil(wait)
+            self.in_flight += 1
+            self.admitted += 1
+            return None
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrent": self.max_concurrent,
+            "active_users": len(self.buckets) if self.buckets is not None else 0,
+            "admitted": self.admitted,
+            "rate_limited": self.rate_limited,
+            "shed": self.shed
+        }
@@ -29,6 +29,10 @@ class AuthService:
             }
         return None
 
+    def token_claims(self, user: dict) -> dict:
+        """Claims embedded in a user's access token, so requests need no user lookup"""
+        return {"role": user["role"], "name": user["name"]}
+
     def get_user(self, username: str) -> dict:
         """Get user data by username"""
         if username in self.users:
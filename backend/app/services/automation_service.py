@@ -1,8 +1,16 @@
-import subprocess
-from typing import Dict, List, Optional
+import json
+import shlex
+import shutil
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from .command_parsers import PARSERS, create_parser
+from .command_runner import CommandRunner
+from .fanout import FanOut, resolve_hosts
+from .runbooks import DEFAULT_RUNBOOKS, RunbookIndex
 
 class AutomationService:
-    def __init__(self):
+    def __init__(self, command_runner: Optional[CommandRunner] = None, fan_out: Optional[FanOut] = None,
+                 inventory: Sequence[str] = ()):
         # Safe commands that can be executed
         self.safe_commands = {
             'disk_space': 'df -h',
@@ -11,98 +19,59 @@ class AutomationService:
             'system_uptime': 'uptime',
             'logged_in_users': 'who'
         }
+        self.command_runner = command_runner or CommandRunner()
+        # Remote execution, and the known hosts that name patterns expand to
+        self.fan_out = fan_out
+        self.inventory = list(inventory)
+        # Suggestions for callers that do not pass a KB's runbook index
+        self.runbooks = RunbookIndex(DEFAULT_RUNBOOKS)
+
+    def execute_safe_command(self, command_key: str, parse: Optional[Dict] = None) -> Dict:
+        """Execute a predefined safe command on this host.
 
-    def execute_safe_command(self, command_key: str) -> Dict[str, str]:
-        """Execute predefined safe commands (simulated for now)"""
+        Runs without a shell, with the runner's timeout and output limits;
+        results are shared between callers for a few seconds. With parse
+        (a dict of parser options, see command_parsers) the output is parsed
+        into records as it streams in; raises ValueError for options the
+        command's parser does not take.
+        """
         if command_key not in self.safe_commands:
             return {"error": f"Command {command_key} not in safe commands list"}
         
-        # For safety, we'll simulate command execution
-        # In production, you might actually run these commands
-        simulated_outputs = {
-            'disk_space': "Filesystem      Size  Used Avail Use% Mounted on\n/dev/sda1        20G   15G  4.5G  77% /\n",
-            'memory_usage': "              total        used        free      shared  buff/cache   available\nMem:           7.7G        2.1G        3.2G        256M        2.4G        5.1G\nSwap:          2.0G          0B        2.0G",
-            'process_list': "USER       PID %CPU %MEM    VSZ   RSS TTY      STAT START   TIME COMMAND\nroot         1  0.0  0.0 169316 13128 ?        Ss   10:00   0:01 /sbin/init",
-            'system_uptime': "10:00:30 up 2 days,  3:15,  1 user,  load average: 0.05, 0.10, 0.15",
-            'logged_in_users': "user1    pts/0        2023-12-01 09:30 (192.168.1.100)"
-        }
+        if parse is not None:
+            parser = create_parser(command_key, parse)
+            result = self.command_runner.execute(
+                f"{command_key}:{json.dumps(parse, sort_keys=True)}", parser.argv, parser
+            )
+            return dict(result, command=' '.join(parser.argv))
         
-        return {
-            "output": simulated_outputs.get(command_key, "Command executed successfully"),
-            "command": self.safe_commands[command_key]
-        }
+        command = self.safe_commands[command_key]
+        result = self.command_runner.execute(command_key, shlex.split(command))
+        return dict(result, command=command)
 
-    def generate_command_sequence(self, intent: str, entities: Dict) -> Optional[List[Dict]]:
-        """Generate step-by-step command sequences for common tasks"""
-        sequences = {
-            'restart_apache': [
-                {
-                    "command": "sudo systemctl status apache2", 
-                    "description": "Check current Apache status"
-                },
-                {
-                    "command": "sudo systemctl restart apache2", 
-                    "description": "Restart Apache service"
-                },
-                {
-                    "command": "sudo systemctl status apache2", 
-                    "description": "Verify Apache is running"
-                }
-            ],
-            'check_disk_usage': [
-                {
-                    "command": "df -h", 
-                    "description": "Check disk space usage"
-                },
-                {
-                    "command": "du -sh /var/log/*", 
-                    "description": "Check log directory sizes"
-                }
-            ],
-            'user_creation': [
-                {
-                    "command": "sudo useradd -m username", 
-                    "description": "Create new user with home directory"
-                },
-                {
-                    "command": "sudo passwd username", 
-                    "description": "Set password for new user"
-                },
-                {
-                    "command": "sudo usermod -aG groupname username", 
-                    "description": "Add user to group (optional)"
-                }
-            ],
-            'troubleshoot_permission': [
-                {
-                    "command": "ls -l /path/to/file", 
-                    "description": "Check current file permissions"
-                },
-                {
-                    "command": "chmod 755 /path/to/file", 
-                    "description": "Set appropriate permissions"
-                },
-                {
-                    "command": "chown user:group /path/to/file", 
-                    "description": "Change ownership if needed"
-                }
-            ]
-        }
-        
-        # Determine which sequence to use based on intent and entities
-        if intent == 'troubleshooting' and 'error_code' in entities:
-            if 'permission' in str(entities.get('error_code', [])).lower():
-                return sequences['troubleshoot_permission']
-        
-        if 'software_name' in entities:
-            software = entities['software_name'][0].lower()
-            if software == 'apache':
-                return sequences['restart_apache']
-        
-        if intent == 'user_management':
-            return sequences['user_creation']
-        
-        if intent == 'status_check':
-            return sequences['check_disk_usage']
+    def missing_commands(self) -> List[str]:
+        """Safe commands whose program is not installed on this host"""
+        programs = {key: shlex.split(command)[0] for key, command in self.safe_commands.items()}
+        programs.update((key, parser.argv[0]) for key, parser in PARSERS.items())
+        return sorted({key for key, program in programs.items() if shutil.which(program) is None})
+
+    def target_hosts(self, names: Sequence[str]) -> List[str]:
+        """Inventory hosts for server names or patterns, such as a query's server_name entities;
+        raises ValueError for names that are not in the inventory"""
+        return resolve_hosts(names, self.inventory)
+
+    def execute_on_hosts(self, command_key: str, hosts: Sequence[str]) -> Iterator[Dict]:
+        """Run a safe command on every host, yielding each host's result as it completes"""
+        if command_key not in self.safe_commands:
+            raise ValueError(f"Command {command_key} not in safe commands list")
+        if self.fan_out is None:
+            raise ValueError("Remote execution is not configured")
         
-        return None
\ No newline at end of file
+        command = self.safe_commands[command_key]
+        for result in self.fan_out.run(hosts, shlex.split(command)):
+            yield dict(result, command=command)
+
+    def generate_command_sequence(self, intent: str, entities: Dict,
+                                  runbooks: Optional[RunbookIndex] = None) -> Optional[List[Dict]]:
+        """Step-by-step command sequence for a query, from the KB's runbooks or the default ones"""
+        return (runbooks if runbooks is not None else self.runbooks).command_sequence(intent, entities)
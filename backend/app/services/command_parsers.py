@@ -0,0 +1,305 @@
+import heapq
+import re
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Parsers for the output of the safe commands. Each one is fed the output
+# line by line as it is read from the process (feed()) and keeps compact
+# typed records of only the lines that pass its filters; result() then
+# returns a JSON-ready summary. The argv each parser expects is fixed to a
+# machine-readable form of the safe command (exact byte counts, POSIX
+# df columns that never wrap).
+
+_TIME = re.compile(r"\d{1,2}:\d{2}$")
+
+
+def _text_option(name: str, value) -> Optional[str]:
+    if value is not None and not isinstance(value, str):
+        raise ValueError(f"{name} must be a string")
+    return value
+
+
+def _number_option(name: str, value) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{name} must be a number")
+    return float(value)
+
+
+def _number(text: str) -> Optional[int]:
+    try:
+        return int(text)
+    except ValueError:
+        return None
+
+
+class ProcessTable:
+    """ps aux rows as parallel columns.
+
+    Numbers live in typed arrays (4 or 8 bytes a value) and repeated
+    strings such as users, TTYs and states are interned, so a 100k process
+    listing costs a fraction of the text or of one dict per row.
+    """
+
+    __slots__ = ('user', 'pid', 'cpu', 'mem', 'vsz', 'rss', 'tty', 'stat', 'start', 'time', 'command')
+
+    COLUMNS = __slots__
+    # Columns PsParser can rank by
+    NUMERIC = ('pid', 'cpu', 'mem', 'vsz', 'rss')
+
+    def __init__(self):
+        self.user: List[str] = []
+        self.pid = array('i')
+        self.cpu = array('f')
+        self.mem = array('f')
+        self.vsz = array('q')
+        self.rss = array('q')
+        self.tty: List[str] = []
+        self.stat: List[str] = []
+        self.start: List[str] = []
+        self.time: List[str] = []
+        self.command: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.pid)
+
+    def row(self, index: int) -> List:
+        return [self.user[index], self.pid[index], round(self.cpu[index], 1), round(self.mem[index], 1),
+                self.vsz[index], self.rss[index], self.tty[index], self.stat[index], self.start[index],
+                self.time[index], self.command[index]]
+
+
+class PsParser:
+    """ps aux, filtered by user, command substring and minimum %CPU / %MEM.
+
+    Matching rows go into a ProcessTable, or with top set only the top N
+    by the sort column are kept, in a heap, so memory stays O(N) however
+    many processes the host runs.
+    """
+
+    argv = ['ps', 'aux']
+
+    def __init__(self, user: Optional[str] = None, command: Optional[str] = None,
+                 min_cpu: Optional[float] = None, min_mem: Optional[float] = None,
+                 top: Optional[int] = None, sort: str = 'mem'):
+        if sort not in ProcessTable.NUMERIC:
+            raise ValueError(f"sort must be one of {', '.join(ProcessTable.NUMERIC)}")
+        if top is not None and (isinstance(top, bool) or not isinstance(top, int) or top < 1):
+            raise ValueError("top must be a positive integer")
+        self.user = _text_option('user', user)
+        self.command = _text_option('command', command)
+        self.min_cpu = _number_option('min_cpu', min_cpu)
+        self.min_mem = _number_option('min_mem', min_mem)
+        self.top = top
+        self.sort = sort
+        self.table = ProcessTable()
+        # (sort value, -line number, row): the smallest kept row on top
+        self.heap: List[Tuple] = []
+        self.total = 0
+        self.matched = 0
+        self._header = True
+
+    def feed(self, lines: Iterable[str]):
+        table, heap, top = self.table, self.heap, self.top
+        sort_index = ProcessTable.NUMERIC.index(self.sort)
+        user_filter, command_filter = self.user, self.command
+        min_cpu, min_mem = self.min_cpu, self.min_mem
+        intern = sys.intern
+        for line in lines:
+            if self._header:
+                self._header = False
+                continue
+            fields = line.split(None, 10)
+            if len(fields) < 11:
+                continue
+            self.total += 1
+            user, pid, cpu, mem, vsz, rss, tty, stat, start, time, command = fields
+            if user_filter is not None and user != user_filter:
+                continue
+            if command_filter is not None and command_filter not in command:
+                continue
+            try:
+                numbers = (int(pid), float(cpu), float(mem), int(vsz), int(rss))
+            except ValueError:
+                continue
+            if (min_cpu is not None and numbers[1] < min_cpu) or (min_mem is not None and numbers[2] < min_mem):
+                continue
+            self.matched += 1
+
+            if top is not None:
+                key = numbers[sort_index]
+                if len(heap) < top:
+                    heapq.heappush(heap, (key, -self.total, (user, *numbers, tty, stat, start, time, command)))
+                elif key > heap[0][0]:
+                    heapq.heapreplace(heap, (key, -self.total, (user, *numbers, tty, stat, start, time, command)))
+                continue
+
+            table.user.append(intern(user))
+            table.pid.append(numbers[0])
+            table.cpu.append(numbers[1])
+            table.mem.append(numbers[2])
+            table.vsz.append(numbers[3])
+            table.rss.append(numbers[4])
+            table.tty.append(intern(tty))
+            table.stat.append(intern(stat))
+            table.start.append(intern(start))
+            table.time.append(time)
+            table.command.append(command)
+
+    def result(self) -> Dict:
+        if self.top is not None:
+            rows = [list(row) for _, _, row in sorted(self.heap, reverse=True)]
+        else:
+            rows = [self.table.row(index) for index in range(len(self.table))]
+        return {
+            "columns": list(ProcessTable.COLUMNS),
+            "rows": rows,
+            "total": self.total,
+            "matched": self.matched
+        }
+
+
+class Filesystem:
+    __slots__ = ('filesystem', 'size', 'used', 'available', 'use_percent', 'mounted_on')
+
+    def __init__(self, filesystem: str, size: int, used: int, available: int, use_percent: Optional[int],
+                 mounted_on: str):
+        self.filesystem = filesystem
+        self.size = size
+        self.used = used
+        self.available = available
+        self.use_percent = use_percent
+        self.mounted_on = mounted_on
+
+    def as_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class DfParser:
+    """df in POSIX format with sizes in bytes, optionally only filesystems at
+    or over min_use percent (the "Low disk" check is min_use=90)"""
+
+    argv = ['df', '-P', '-k']
+
+    def __init__(self, min_use: Optional[float] = None):
+        self.min_use = _number_option('min_use', min_use)
+        self.filesystems: List[Filesystem] = []
+        self.total = 0
+        self._header = True
+
+    def feed(self, lines: Iterable[str]):
+        for line in lines:
+            if self._header:
+                self._header = False
+                continue
+            # The mount point is last and may contain spaces
+            fields = line.split(None, 5)
+            if len(fields) < 6:
+                continue
+            self.total += 1
+            blocks, used, available = (_number(field) for field in fields[1:4])
+            if blocks is None or used is None or available is None:
+                continue
+            use_percent = _number(fields[4].rstrip('%'))
+            if self.min_use is not None and (use_percent is None or use_percent < self.min_use):
+                continue
+            self.filesystems.append(
+                Filesystem(fields[0], blocks * 1024, used * 1024, available * 1024, use_percent, fields[5])
+            )
+
+    def result(self) -> Dict:
+        return {
+            "filesystems": [filesystem.as_dict() for filesystem in self.filesystems],
+            "total": self.total,
+            "matched": len(self.filesystems)
+        }
+
+
+class MemoryRow:
+    __slots__ = ('total', 'used', 'free', 'shared', 'buff_cache', 'available')
+
+    def __init__(self, values: List[Optional[int]]):
+        values = values + [None] * (len(self.__slots__) - len(values))
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def as_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class FreeParser:
+    """free in bytes: the Mem and Swap rows (Swap has only the first three)"""
+
+    argv = ['free', '-b']
+
+    def __init__(self):
+        self.rows: Dict[str, MemoryRow] = {}
+
+    def feed(self, lines: Iterable[str]):
+        for line in lines:
+            label, _, rest = line.partition(':')
+            if label in ('Mem', 'Swap'):
+                self.rows[label.lower()] = MemoryRow([_number(value) for value in rest.split()])
+
+    def result(self) -> Dict:
+        return {label: row.as_dict() for label, row in self.rows.items()}
+
+
+class LoginSession:
+    __slots__ = ('user', 'line', 'login_time', 'host')
+
+    def __init__(self, user: str, line: str, login_time: str, host: Optional[str]):
+        self.user = user
+        self.line = line
+        self.login_time = login_time
+        self.host = host
+
+    def as_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class WhoParser:
+    """who: one session per line, optionally for one user only"""
+
+    argv = ['who']
+
+    def __init__(self, user: Optional[str] = None):
+        self.user = _text_option('user', user)
+        self.sessions: List[LoginSession] = []
+
+    def feed(self, lines: Iterable[str]):
+        for line in lines:
+            fields = line.split()
+            if len(fields) < 3 or (self.user is not None and fields[0] != self.user):
+                continue
+            # The login time is "2024-01-31 09:30" or "Jan 31 09:30" depending on locale
+            end = next((position for position in range(2, len(fields)) if _TIME.match(fields[position])), None)
+            if end is None:
+                continue
+            rest = ' '.join(fields[end + 1:])
+            host = rest[1:-1] if rest.startswith('(') and rest.endswith(')') else None
+            self.sessions.append(LoginSession(fields[0], fields[1], ' '.join(fields[2:end + 1]), host))
+
+    def result(self) -> Dict:
+        return {"sessions": [session.as_dict() for session in self.sessions], "matched": len(self.sessions)}
+
+
+# Safe command key -> parser of its output
+PARSERS = {
+    'process_list': PsParser,
+    'disk_space': DfParser,
+    'memory_usage': FreeParser,
+    'logged_in_users': WhoParser
+}
+
+
+def create_parser(command_key: str, options: Optional[Dict] = None):
+    """Parser for a safe command's output; raises ValueError for bad options or commands without one"""
+    if command_key not in PARSERS:
+        raise ValueError(f"No structured output for {command_key}; available for {', '.join(PARSERS)}")
+    try:
+        return PARSERS[command_key](**(options or {}))
+    except TypeError as e:
+        raise ValueError(f"Unsupported options for {command_key}: {e}")
@@ -0,0 +1,236 @@
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Coroutine, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_READ_SIZE = 64 * 1024
+# Extra seconds execute() waits past the command timeout, for the kill and
+# the hop back from the loop thread
+_RESULT_MARGIN = 1.0
+
+
+async def run_process(argv: List[str], timeout: float, max_output: int, env: Optional[Dict] = None,
+                      parser=None) -> Dict:
+    """Run argv without a shell; returns its output, or an error if it could not run or timed out.
+
+    Only the first max_output bytes of stdout and stderr are kept; the rest
+    is read and discarded, so a chatty command can neither block on a full
+    pipe nor fill memory. With a parser (see command_parsers), stdout is fed
+    to it line by line as it arrives and never kept, and the result has the
+    parser's "parsed" summary instead of "output". The process is killed on
+    timeout or cancellation.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    try:
+        # C locale: stable column formats whatever the server's locale
+        process = await asyncio.create_subprocess_exec(
+            *argv, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE, env=dict(os.environ, LC_ALL='C', **(env or {}))
+        )
+    except OSError as e:
+        return {"error": f"Could not run {argv[0]}: {e}"}
+    try:
+        if parser is None:
+            read_stdout = _read(process.stdout, max_output)
+        else:
+            read_stdout = _parse(process.stdout, parser, max_output)
+        (stdout, stdout_truncated), (stderr, stderr_truncated) = await asyncio.wait_for(
+            asyncio.gather(read_stdout, _read(process.stderr, max_output)), timeout
+        )
+        exit_code = await asyncio.wait_for(process.wait(), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        logger.warning(f"Command {' '.join(argv)} timed out after {timeout} s")
+        return {"error": f"Timed out after {timeout} s", "timed_out": True}
+    except asyncio.CancelledError:
+        process.kill()
+        raise
+    if parser is not None:
+        output = {"parsed": parser.result(), "output_bytes": stdout}
+    else:
+        output = {"output": stdout.decode('utf-8', errors='replace')}
+    return {
+        **output,
+        "stderr": stderr.decode('utf-8', errors='replace'),
+        "exit_code": exit_code,
+        "truncated": stdout_truncated or stderr_truncated,
+        "duration_ms": round((loop.time() - started) * 1000, 1)
+    }
+
+
+async def _read(stream: asyncio.StreamReader, max_output: int) -> Tuple[bytes, bool]:
+    chunks = []
+    size = 0
+    while True:
+        chunk = await stream.read(_READ_SIZE)
+        if not chunk:
+            return b''.join(chunks), size > max_output
+        if size < max_output:
+            chunks.append(chunk[:max_output - size])
+        size += len(chunk)
+
+
+async def _parse(stream: asyncio.StreamReader, parser, max_line: int) -> Tuple[int, bool]:
+    """Feed complete lines to the parser chunk by chunk; returns the bytes read"""
+    size = 0
+    truncated = False
+    partial = b''
+    # Inside a line longer than max_line, which is dropped whole
+    skipping = False
+    while True:
+        chunk = await stream.read(_READ_SIZE)
+        if not chunk:
+            if partial:
+                parser.feed([partial.decode('utf-8', errors='replace')])
+            return size, truncated
+        size += len(chunk)
+        if skipping:
+            newline = chunk.find(b'\n')
+            if newline < 0:
+                continue
+            chunk = chunk[newline + 1:]
+            skipping = False
+        data = partial + chunk
+        end = data.rfind(b'\n') + 1
+        partial = data[end:]
+        if end:
+            parser.feed(data[:end - 1].decode('utf-8', errors='replace').split('\n'))
+        if len(partial) > max_line:
+            partial = b''
+            skipping = True
+            truncated = True
+
+
+class BackgroundLoop:
+    """An asyncio event loop on a daemon thread, for use from synchronous code.
+
+    The thread starts on first use, and again in a forked child (threads do
+    not survive fork).
+    """
+
+    def __init__(self, name: str = 'command-runner'):
+        self.name = name
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name=self.name, daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def submit(self, coroutine: Coroutine) -> concurrent.futures.Future:
+        """Schedule a coroutine on the loop; cancelling the future cancels it"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+
+class CommandRunner:
+    """Runs commands as asyncio subprocesses on a background event loop.
+
+    At most max_concurrent commands run at once; each is killed after
+    timeout seconds, and only the first max_output bytes of stdout and
+    stderr are kept (the rest is read and discarded, so a chatty command
+    cannot fill the pipe or memory). Successful results are cached per key
+    for cache_ttl seconds, and callers asking for a key that is already
+    running wait for that run instead of starting another: fifty requests
+    for the same command in the same second run it once.
+
+    run() is the coroutine; execute() calls it from synchronous code such
+    as a Flask view, on the given background loop or one of its own, and
+    gives up after the timeout plus a margin even if the loop is stuck.
+    """
+
+    def __init__(self, max_concurrent: int = 4, timeout: float = 5.0, max_output: int = 256 * 1024,
+                 cache_ttl: float = 2.0, background: Optional[BackgroundLoop] = None):
+        self.background = background or BackgroundLoop()
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        self.max_output = max_output
+        self.cache_ttl = cache_ttl
+        self.runs = 0
+        self.cache_hits = 0
+        self.shared = 0
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # Created on the loop, which asyncio primitives are bound to in 3.9
+        self._slots: Optional[asyncio.Semaphore] = None
+        # key -> running task; key -> (expires_at, result) in expiry order
+        self._running: Dict[str, asyncio.Future] = {}
+        self._cache: OrderedDict = OrderedDict()
+
+    def execute(self, key: str, argv: List[str], parser=None) -> Dict:
+        """Run a command from synchronous code and wait for its result"""
+        future = self.background.submit(self.run(key, argv, parser))
+        wait = self.timeout + _RESULT_MARGIN
+        try:
+            return future.result(timeout=wait)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            logger.warning(f"No result for command {key} after {wait} s")
+            return {"error": f"Timed out after {wait} s", "timed_out": True}
+
+    async def run(self, key: str, argv: List[str], parser=None) -> Dict:
+        """Result of argv, shared with concurrent and recent runs of the same key.
+
+        A parser is only used by the run that starts the command, so the key
+        must cover everything that changes its result (such as filters).
+        """
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        while self._cache and next(iter(self._cache.values()))[0] <= now:
+            self._cache.popitem(last=False)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self.cache_hits += 1
+            return dict(cached[1], cached=True)
+
+        task = self._running.get(key)
+        if task is None:
+            task = self._running[key] = asyncio.ensure_future(self._run_process(argv, parser))
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self.shared += 1
+        # A cancelled caller must not cancel the run the others are waiting for
+        return dict(await asyncio.shield(task), cached=False)
+
+    def _finished(self, key: str, task: asyncio.Future):
+        del self._running[key]
+        if task.cancelled() or task.exception() is not None or not self.cache_ttl:
+            return
+        result = task.result()
+        if result.get('exit_code') == 0:
+            self._cache.pop(key, None)
+            self._cache[key] = (task.get_loop().time() + self.cache_ttl, result)
+
+    async def _run_process(self, argv: List[str], parser=None) -> Dict:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        async with self._slots:
+            self.runs += 1
+            return await run_process(argv, self.timeout, self.max_output, parser=parser)
+
+    def stats(self) -> Dict:
+        return {
+            "runs": self.runs,
+            "cache_hits": self.cache_hits,
+            "shared_runs": self.shared,
+            "running": len(self._running),
+            "cached": len(self._cache),
+            "max_concurrent": self.max_concurrent
+        }
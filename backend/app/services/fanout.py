@@ -0,0 +1,181 @@
+import asyncio
+import fnmatch
+import logging
+import math
+import os
+import queue
+import shlex
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from .command_runner import BackgroundLoop, run_process
+
+logger = logging.getLogger(__name__)
+
+
+class LocalTransport:
+    """Runs the command on this machine for every host.
+
+    A stand-in for SSH in tests and development: each run gets the target
+    host in the TARGET_HOST environment variable.
+    """
+
+    async def run(self, host: str, argv: List[str], timeout: float, max_output: int) -> Dict:
+        return await run_process(argv, timeout, max_output, env={'TARGET_HOST': host})
+
+
+class SshTransport:
+    """Runs the command on each host through the ssh client.
+
+    Uses key-based, non-interactive logins (BatchMode), so a host that
+    would prompt for a password fails instead of hanging.
+    """
+
+    def __init__(self, options: Sequence[str] = ('-o', 'BatchMode=yes', '-o', 'StrictHostKeyChecking=yes')):
+        self.options = list(options)
+
+    async def run(self, host: str, argv: List[str], timeout: float, max_output: int) -> Dict:
+        check_host_name(host)
+        # '--' ends ssh's options, so the host can never be read as one
+        result = await run_process(
+            ['ssh', *self.options, '-o', f"ConnectTimeout={math.ceil(timeout)}", '--', host,
+             ' '.join(shlex.quote(arg) for arg in argv)],
+            timeout, max_output
+        )
+        if result.get('exit_code') == 255:
+            # ssh's own failure (unreachable host, refused key), not the command's
+            return {"error": result['stderr'].strip() or "ssh failed", "exit_code": 255}
+        return result
+
+
+TRANSPORTS = {
+    'local': LocalTransport,
+    'ssh': SshTransport
+}
+
+
+def create_transport(name: str):
+    if name not in TRANSPORTS:
+        raise ValueError(f"Unknown fan-out transport {name!r}; use one of {', '.join(TRANSPORTS)}")
+    return TRANSPORTS[name]()
+
+
+def check_host_name(name: str):
+    """Raise ValueError for a name that ssh could read as an option or that is not one word"""
+    if not name or name.startswith('-') or any(char.isspace() or not char.isprintable() for char in name):
+        raise ValueError(f"Invalid host name {name!r}")
+
+
+def read_inventory(path: Optional[str]) -> List[str]:
+    """Host names from a file with one per line; blank lines and # comments are skipped"""
+    if not path or not os.path.exists(path):
+        return []
+    hosts = []
+    with open(path) as f:
+        for line in f:
+            host = line.split('#', 1)[0].strip()
+            if not host:
+                continue
+            try:
+                check_host_name(host)
+            except ValueError as e:
+                logger.warning(f"Skipping inventory entry in {path}: {e}")
+                continue
+            hosts.append(host)
+    return hosts
+
+
+def resolve_hosts(names: Iterable[str], inventory: Sequence[str]) -> List[str]:
+    """Expand host names and patterns against the inventory, keeping first-seen order.
+
+    A name ending in '-' (like the prod- entity) matches every inventory host
+    with that prefix, and shell-style wildcards (server-web-*) are matched
+    with fnmatch; any other name must be an inventory host. Only inventory
+    hosts are ever returned: raises ValueError naming the hosts that are not.
+    """
+    hosts = {}
+    known = set(inventory)
+    unknown = []
+    for name in names:
+        if name.endswith('-'):
+            hosts.update(dict.fromkeys(host for host in inventory if host.startswith(name)))
+        elif any(char in name for char in '*?['):
+            hosts.update(dict.fromkeys(fnmatch.filter(inventory, name)))
+        elif name in known:
+            hosts[name] = None
+        else:
+            unknown.append(name)
+    if unknown:
+        raise ValueError(f"Not in the host inventory: {', '.join(unknown)}")
+    return list(hosts)
+
+
+class FanOut:
+    """Runs one command on many hosts with bounded concurrency.
+
+    At most max_concurrent hosts are contacted at once (per process, across
+    requests), each host gets timeout seconds, and a host that fails or
+    times out only fails its own result. Results are yielded as each host
+    completes, so the slowest host holds back nothing but itself.
+    """
+
+    def __init__(self, transport, max_concurrent: int = 50, timeout: float = 10.0,
+                 max_output: int = 256 * 1024, background: Optional[BackgroundLoop] = None):
+        self.transport = transport
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        self.max_output = max_output
+        self.background = background or BackgroundLoop('fanout')
+        self._slots: Optional[asyncio.Semaphore] = None
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._slots = None
+
+    async def stream(self, hosts: Sequence[str], argv: List[str]) -> AsyncIterator[Dict]:
+        """Per-host results in completion order"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        tasks = [asyncio.ensure_future(self._run_host(host, argv)) for host in hosts]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # The consumer went away: stop the hosts still waiting or running
+            for task in tasks:
+                task.cancel()
+
+    async def _run_host(self, host: str, argv: List[str]) -> Dict:
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            try:
+                result = await asyncio.wait_for(
+                    self.transport.run(host, argv, self.timeout, self.max_output), self.timeout
+                )
+            except asyncio.TimeoutError:
+                result = {"error": f"Timed out after {self.timeout} s", "timed_out": True}
+            except Exception as e:
+                logger.warning(f"Fan-out to {host} failed: {e}")
+                result = {"error": str(e) or type(e).__name__}
+            return dict(result, host=host, duration_ms=round((loop.time() - started) * 1000, 1))
+
+    def run(self, hosts: Sequence[str], argv: List[str]) -> Iterator[Dict]:
+        """stream() for synchronous code; closing the iterator early cancels the rest"""
+        results = queue.Queue()
+
+        async def produce():
+            try:
+                async for result in self.stream(hosts, argv):
+                    results.put(result)
+            finally:
+                results.put(None)
+
+        future = self.background.submit(produce())
+        try:
+            while True:
+                result = results.get()
+                if result is None:
+                    break
+                yield result
+        finally:
+            future.cancel()
@@ -0,0 +1,83 @@
+from collections import deque
+from typing import Dict, List, Tuple
+
+
+class FaqMatcher:
+    """Aho-Corasick automaton over every FAQ question and variation.
+
+    All patterns are compiled once, so matching a query is a single pass over
+    its characters no matter how many FAQ entries the KB holds. With
+    word_boundary enabled a pattern only counts when it is not glued to
+    letters or digits, so "hi" no longer matches "this".
+    """
+
+    def __init__(self, faq: Dict[str, Dict], word_boundary: bool = True):
+        self.word_boundary = word_boundary
+        self.faq_ids: List[str] = list(faq.keys())
+        self.pattern_count = 0
+        # Trie transitions, failure links and outputs of (pattern length, entry)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[Tuple[int, int], ...]] = [()]
+        self._build(faq)
+
+    def _build(self, faq: Dict[str, Dict]):
+        outputs: List[List[Tuple[int, int]]] = [[]]
+
+        for entry, faq_data in enumerate(faq.values()):
+            patterns = [faq_data.get('question', '')] + list(faq_data.get('variations', []))
+            for pattern in {p.lower() for p in patterns if p}:
+                state = 0
+                for char in pattern:
+                    next_state = self._goto[state].get(char)
+                    if next_state is None:
+                        next_state = len(self._goto)
+                        self._goto[state][char] = next_state
+                        self._goto.append({})
+                        self._fail.append(0)
+                        outputs.append([])
+                    state = next_state
+                outputs[state].append((len(pattern), entry))
+                self.pattern_count += 1
+
+        # Breadth-first pass to set failure links and merge outputs;
+        # depth-one states keep their failure link to the root
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                outputs[next_state].extend(outputs[self._fail[next_state]])
+
+        self._out = [tuple(out) for out in outputs]
+
+    def match(self, text: str) -> List[str]:
+        """Return the ids of every FAQ entry found in text, in KB order"""
+        text = text.lower()
+        goto, fail, out = self._goto, self._fail, self._out
+        word_boundary = self.word_boundary
+        found = set()
+        state = 0
+
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            for length, entry in out[state]:
+                if entry in found:
+                    continue
+                if word_boundary:
+                    start = position - length + 1
+                    if start > 0 and text[start - 1].isalnum():
+                        continue
+                    end = position + 1
+                    if end < len(text) and text[end].isalnum():
+                        continue
+                found.add(entry)
+
+        return [self.faq_ids[entry] for entry in sorted(found)]
@@ -0,0 +1,242 @@
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .query_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Ranked candidates fetched per requested result when the prior may reorder them
+PRIOR_CANDIDATES = 3
+_READ_SIZE = 1 << 20
+
+
+class FeedbackAnalytics:
+    """Helpfulness aggregates kept up to date from the feedback log.
+
+    Counters of helpful and total votes are kept per matched KB article,
+    per intent and per normalized query; record() updates each in O(1).
+    A follower thread reads the entries appended to the JSONL log since
+    its last poll, following rotations, so every gunicorn and query worker
+    sees all feedback without rescanning the log. The per-article rates
+    double as a ranking prior: article_weights maps each rated article to
+    a multiplier between 1 - prior_weight and 1 + prior_weight, pulled
+    towards 1 by prior_votes neutral votes so a few ratings barely move it.
+    """
+
+    def __init__(self, path: Optional[str] = None, poll_interval: float = 2.0, prior_weight: float = 0.2,
+                 prior_votes: int = 5, max_queries: int = 10000, ranking_prior: bool = True):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.prior_weight = prior_weight
+        self.prior_votes = prior_votes
+        self.max_queries = max_queries
+        self.ranking_prior = ranking_prior
+        self.articles: Dict[str, List[int]] = {}
+        self.intents: Dict[str, List[int]] = {}
+        self.queries: OrderedDict = OrderedDict()
+        self.article_weights: Dict[str, float] = {}
+        self.helpful = 0
+        self.total = 0
+        self.malformed = 0
+        self._lock = threading.Lock()
+        self._stop: Optional[threading.Event] = None
+        # Open log file, its read offset and any partial last line
+        self._file = None
+        self._offset = 0
+        self._partial = b''
+        self._settings_mtime = None
+        os.register_at_fork(after_in_child=self.restart_after_fork)
+
+    @property
+    def settings_path(self) -> Optional[str]:
+        """File holding the admin ranking prior switch, shared by all workers"""
+        return f"{self.path}.prior" if self.path else None
+
+    def record(self, entry: Dict):
+        """Add one feedback entry to every aggregate it belongs to"""
+        helpful = 1 if entry.get('was_helpful') else 0
+        with self._lock:
+            self.helpful += helpful
+            self.total += 1
+            for article_id in entry.get('article_ids') or ():
+                counts = self._add(self.articles, article_id, helpful)
+                self.article_weights[article_id] = 1 + self.prior_weight * (
+                    (2 * counts[0] + self.prior_votes) / (counts[1] + self.prior_votes) - 1
+                )
+            if entry.get('intent'):
+                self._add(self.intents, entry['intent'], helpful)
+            query = normalize_query(entry.get('query') or '')
+            if query:
+                self._add(self.queries, query, helpful)
+                self.queries.move_to_end(query)
+                if len(self.queries) > self.max_queries:
+                    self.queries.popitem(last=False)
+
+    @staticmethod
+    def _add(table: Dict, key: str, helpful: int) -> List[int]:
+        counts = table.get(key)
+        if counts is None:
+            counts = table[key] = [0, 0]
+        counts[0] += helpful
+        counts[1] += 1
+        return counts
+
+    def rerank(self, hits: List[Tuple[str, float]], top_k: int) -> List[Tuple[str, float]]:
+        """Scale ranked (article_id, score) hits by the prior and keep the best top_k"""
+        weights = self.article_weights
+        rescored = [(article_id, score * weights.get(article_id, 1.0)) for article_id, score in hits]
+        rescored.sort(key=lambda hit: hit[1], reverse=True)
+        return rescored[:top_k]
+
+    def prior_active(self) -> bool:
+        return self.ranking_prior and bool(self.article_weights)
+
+    def set_ranking_prior(self, enabled: bool):
+        """Turn the ranking prior on or off here and, through the settings file, in every worker.
+
+        The settings file outlives restarts and takes precedence over the
+        configured default.
+        """
+        self.ranking_prior = enabled
+        if self.settings_path:
+            tmp_path = f"{self.settings_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({"ranking_prior": enabled}, f)
+            os.replace(tmp_path, self.settings_path)
+
+    def summary(self, limit: int = 20) -> Dict:
+        """Overall, per-article, per-intent and busiest-query helpfulness"""
+        def rows(table, key_name, order):
+            ranked = sorted(table.items(), key=order)[:limit]
+            return [{key_name: key, "helpful": helpful, "total": total, "helpful_rate": round(helpful / total, 3)}
+                    for key, (helpful, total) in ranked]
+
+        with self._lock:
+            return {
+                "total": self.total,
+                "helpful": self.helpful,
+                "helpful_rate": round(self.helpful / self.total, 3) if self.total else None,
+                "ranking_prior": self.ranking_prior,
+                "articles": rows(self.articles, "article_id", lambda item: (-item[1][1], item[0])),
+                "intents": rows(self.intents, "intent", lambda item: (-item[1][1], item[0])),
+                "queries": rows(self.queries, "query", lambda item: -item[1][1]),
+                "malformed_entries": self.malformed
+            }
+
+    def start(self):
+        """Follow the feedback log on a daemon thread"""
+        if not self.path or self._stop is not None:
+            return
+        stop = threading.Event()
+
+        def follow():
+            while True:
+                try:
+                    self.poll()
+                except Exception as e:
+                    logger.error(f"Feedback analytics error: {e}")
+                if stop.wait(self.poll_interval):
+                    return
+
+        self._stop = stop
+        threading.Thread(target=follow, name='feedback-analytics', daemon=True).start()
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
+
+    def restart_after_fork(self):
+        # The follower thread does not survive fork; reads use pread with
+        # this process's own offset, so the inherited file can be kept
+        self._lock = threading.Lock()
+        if self._stop is not None:
+            self._stop = None
+            self.start()
+
+    def poll(self) -> int:
+        """Apply entries appended to the log since the last poll; returns how many"""
+        self._poll_settings()
+        if self._file is None:
+            if not os.path.exists(self.path):
+                return 0
+            # First poll: rotated backups, oldest first, then the live file
+            applied = 0
+            backups = []
+            index = 1
+            while os.path.exists(f"{self.path}.{index}"):
+                backups.append(f"{self.path}.{index}")
+                index += 1
+            for backup in reversed(backups):
+                with open(backup, 'rb') as f:
+                    applied += self._apply_lines(f.read())
+            self._file = open(self.path, 'rb')
+            self._offset, self._partial = 0, b''
+            return applied + self._read_new()
+
+        applied = self._read_new()
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            return applied
+        opened = os.fstat(self._file.fileno())
+        if (current.st_ino, current.st_dev) != (opened.st_ino, opened.st_dev):
+            # Rotated: finish the old file, which may have grown since the
+            # read above, then continue with the new one
+            applied += self._read_new()
+            self._file.close()
+            self._file = open(self.path, 'rb')
+            self._offset, self._partial = 0, b''
+            applied += self._read_new()
+        return applied
+
+    def _read_new(self) -> int:
+        applied = 0
+        while True:
+            chunk = self._read_at(self._offset)
+            if not chunk:
+                return applied
+            data = self._partial + chunk
+            end = data.rfind(b'\n') + 1
+            applied += self._apply_lines(data[:end])
+            # Only once applied, so a failure re-reads the lines next poll
+            self._offset += len(chunk)
+            self._partial = data[end:]
+
+    def _read_at(self, offset: int) -> bytes:
+        if hasattr(os, 'pread'):
+            return os.pread(self._file.fileno(), _READ_SIZE, offset)
+        # No fork on Windows, so the file offset is never shared
+        self._file.seek(offset)
+        return self._file.read(_READ_SIZE)
+
+    def _apply_lines(self, data: bytes) -> int:
+        applied = 0
+        for line in data.splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                self.malformed += 1
+                continue
+            if isinstance(entry, dict):
+                self.record(entry)
+                applied += 1
+        return applied
+
+    def _poll_settings(self):
+        try:
+            mtime = os.stat(self.settings_path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._settings_mtime:
+            return
+        self._settings_mtime = mtime
+        try:
+            with open(self.settings_path) as f:
+                self.ranking_prior = bool(json.load(f).get("ranking_prior", self.ranking_prior))
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read {self.settings_path}: {e}")
@@ -0,0 +1,199 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process dev server only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# When written batches are fsynced: after every batch, at most once per
+# fsync_interval, or never (left to the OS page cache)
+FSYNC_POLICIES = ('always', 'interval', 'never')
+
+
+class FeedbackBacklogFull(Exception):
+    """Raised when the writer has fallen too far behind to accept more entries"""
+
+
+class FeedbackLog:
+    """Append-only JSONL feedback log written by a background thread.
+
+    append() only adds the entry to an in-memory list; the writer thread
+    flushes pending entries in one write whenever batch_size entries are
+    waiting or flush_interval seconds have passed. Once the file exceeds
+    max_bytes it is rotated to path.1 ... path.<backups>. Every gunicorn
+    worker appends to the same file under an advisory lock, so rotation
+    happens once. close(), also run at exit, writes and fsyncs everything
+    still pending, so accepted entries survive a graceful shutdown.
+    """
+
+    def __init__(self, path: str, batch_size: int = 500, flush_interval: float = 1.0,
+                 fsync: str = 'interval', fsync_interval: float = 1.0,
+                 max_bytes: int = 50 * 1024 * 1024, backups: int = 5, max_pending: int = 100000):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {', '.join(FSYNC_POLICIES)}")
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.max_pending = max_pending
+        self._start()
+        atexit.register(self.close)
+        # A gunicorn worker forked from a preloaded master needs its own thread
+        os.register_at_fork(after_in_child=self._start)
+
+    def _start(self):
+        self.appended = 0
+        self.written = 0
+        self.rotations = 0
+        self.last_error: Optional[str] = None
+        self._pending: List[Dict] = []
+        self._condition = threading.Condition()
+        self._closing = False
+        self._file = None
+        self._last_fsync = time.monotonic()
+        self._writer = threading.Thread(target=self._run, name='feedback-writer', daemon=True)
+        self._writer.start()
+
+    def append(self, entry: Dict):
+        """Queue an entry for writing; raises FeedbackBacklogFull if too many are waiting"""
+        with self._condition:
+            if self._closing:
+                raise FeedbackBacklogFull("Feedback log is closed")
+            if len(self._pending) >= self.max_pending:
+                raise FeedbackBacklogFull(f"{len(self._pending)} feedback entries waiting to be written")
+            self._pending.append(entry)
+            self.appended += 1
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._closing and len(self._pending) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                batch, self._pending = self._pending, []
+                closing = self._closing
+            written = self._write_batch(batch) if batch else True
+            if closing and written:
+                self._close_file()
+                return
+
+    def _write_batch(self, batch: List[Dict]) -> bool:
+        data = ''.join(json.dumps(entry, default=str) + '\n' for entry in batch).encode('utf-8')
+        try:
+            with self._file_lock():
+                f = self._current_file()
+                size = os.fstat(f.fileno()).st_size
+                if self.max_bytes and size and size + len(data) > self.max_bytes:
+                    f = self._rotate()
+                f.write(data)
+                f.flush()
+            if self.fsync == 'always' or (
+                    self.fsync == 'interval' and time.monotonic() - self._last_fsync >= self.fsync_interval):
+                os.fsync(f.fileno())
+                self._last_fsync = time.monotonic()
+            self.written += len(batch)
+            self.last_error = None
+            return True
+        except OSError as e:
+            # Keep the batch for the next flush instead of losing it
+            self.last_error = str(e)
+            logger.error(f"Could not write {len(batch)} feedback entries to {self.path}: {e}")
+            with self._condition:
+                self._pending[:0] = batch
+            time.sleep(self.flush_interval)
+            return False
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _current_file(self):
+        """The open log file, reopened if another process rotated it away"""
+        if self._file is not None:
+            try:
+                current = os.stat(self.path)
+            except FileNotFoundError:
+                current = None
+            opened = os.fstat(self._file.fileno())
+            if current is None or (current.st_ino, current.st_dev) != (opened.st_ino, opened.st_dev):
+                self._close_file()
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, 'ab')
+        return self._file
+
+    def _rotate(self):
+        self._close_file()
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{index}"):
+                os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.rotations += 1
+        return self._current_file()
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until everything appended so far has been written"""
+        deadline = time.monotonic() + timeout
+        target = self.appended
+        while self.written < target:
+            if time.monotonic() >= deadline:
+                return False
+            with self._condition:
+                self._condition.notify()
+            time.sleep(0.005)
+        return True
+
+    def close(self, timeout: float = 10.0):
+        """Write and fsync every pending entry, then stop the writer"""
+        with self._condition:
+            if self._closing:
+                return
+            self._closing = True
+            self._condition.notify()
+        self._writer.join(timeout)
+
+    def status(self) -> Dict:
+        with self._condition:
+            pending = len(self._pending)
+        return {
+            "path": self.path,
+            "pending": pending,
+            "appended": self.appended,
+            "written": self.written,
+            "rotations": self.rotations,
+            "fsync": self.fsync,
+            "last_error": self.last_error
+        }
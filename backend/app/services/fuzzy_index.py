@@ -0,0 +1,78 @@
+import math
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of a lowercased, space-padded string"""
+    padded = f"  {' '.join(text.lower().split())} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Case-insensitive, typo-tolerant lookup of short keys.
+
+    Every key is split into character trigrams and indexed by trigram, and
+    candidates are ranked by trigram Jaccard similarity, so "permision
+    denied" still finds "Permission denied". Exact case-insensitive matches
+    skip the trigram pass entirely.
+
+    Lookups use prefix filtering: a key reaching the cutoff must share at
+    least ceil(cutoff * n) of the text's n trigrams, so it must contain one
+    of the n - ceil(cutoff * n) + 1 rarest ones. Only those short posting
+    lists are scanned; common trigrams are never walked.
+    """
+
+    def __init__(self, keys: Iterable[str], cutoff: float = 0.45):
+        self.cutoff = cutoff
+        self.keys: List[str] = []
+        self.exact: Dict[str, str] = {}
+        self._grams: List[FrozenSet[str]] = []
+        self._postings: Dict[str, List[int]] = {}
+
+        for key in keys:
+            normalized = ' '.join(key.lower().split())
+            if normalized in self.exact:
+                continue
+            key_id = len(self.keys)
+            self.keys.append(key)
+            self.exact[normalized] = key
+            grams = frozenset(trigrams(key))
+            self._grams.append(grams)
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(key_id)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, text: str, limit: int = 1) -> List[Tuple[str, float]]:
+        """Return up to limit (key, similarity) pairs above the cutoff, best first"""
+        exact = self.exact.get(' '.join(text.lower().split()))
+        if exact is not None:
+            return [(exact, 1.0)]
+
+        grams = trigrams(text)
+        if not grams or not self.keys:
+            return []
+        postings = self._postings
+        rarest = sorted(grams, key=lambda gram: len(postings.get(gram, ())))
+        prefix_length = len(grams) - math.ceil(self.cutoff * len(grams)) + 1
+
+        candidates = set()
+        for gram in rarest[:prefix_length]:
+            candidates.update(postings.get(gram, ()))
+
+        matches = []
+        for key_id in candidates:
+            key_grams = self._grams[key_id]
+            common = len(grams & key_grams)
+            similarity = common / (len(grams) + len(key_grams) - common)
+            if similarity >= self.cutoff:
+                matches.append((similarity, -key_id))
+        matches.sort(reverse=True)
+
+        return [(self.keys[-neg_id], round(similarity, 4)) for similarity, neg_id in matches[:limit]]
+
+    def best(self, text: str) -> Optional[str]:
+        """Return the closest key above the cutoff, or None"""
+        matches = self.lookup(text)
+        return matches[0][0] if matches else None
@@ -0,0 +1,263 @@
+import hashlib
+import io
+import json
+import logging
+import mmap
+import os
+import pickle
+import struct
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from .faq_matcher import FaqMatcher
+from .fuzzy_index import TrigramIndex
+from .runbooks import RunbookIndex
+from .search_index import ArticleIndex, PreparedArticle, prepare_articles
+from .tfidf_index import TfidfIndex
+
+logger = logging.getLogger(__name__)
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    """Return (inode, mtime_ns, size) of a file, or None if it is missing"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def content_version(raw: bytes) -> str:
+    """Short content hash used as the KB version"""
+    return hashlib.sha256(raw).hexdigest()[:12]
+
+
+def read_kb_file(path: str) -> Tuple[Dict, str]:
+    """Read and parse a KB JSON file, returning the data and its version"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    return json.loads(raw.decode('utf-8')), content_version(raw)
+
+
+class KnowledgeSnapshot:
+    """One KB version together with every search structure built from it.
+
+    A snapshot is never mutated once build_snapshot() returns it. Reloads
+    build a new snapshot and swap the reference, so a request that grabbed
+    a snapshot keeps a consistent view even if a reload lands mid-request.
+    """
+
+    __slots__ = ('data', 'version', 'source', 'articles', 'article_index', 'tfidf_index', 'faq_matcher',
+                 'command_index', 'troubleshooting_index', 'runbook_index', 'build_seconds', 'built_at')
+
+    def __init__(self, data: Dict, version: str, source,
+                 articles: Tuple[PreparedArticle, ...], article_index: ArticleIndex,
+                 tfidf_index: Optional[TfidfIndex], faq_matcher: FaqMatcher,
+                 command_index: TrigramIndex, troubleshooting_index: TrigramIndex,
+                 runbook_index: RunbookIndex, build_seconds: float, built_at: float):
+        self.data = data
+        self.version = version
+        self.source = source
+        self.articles = articles
+        self.article_index = article_index
+        self.tfidf_index = tfidf_index
+        self.faq_matcher = faq_matcher
+        self.command_index = command_index
+        self.troubleshooting_index = troubleshooting_index
+        self.runbook_index = runbook_index
+        self.build_seconds = build_seconds
+        self.built_at = built_at
+
+
+def build_snapshot(data: Dict, version: str, source=None,
+                   faq_word_boundary: bool = True, started: Optional[float] = None,
+                   build_tfidf: bool = False, keep_article_bodies: bool = True) -> KnowledgeSnapshot:
+    """Build every search structure for a KB document.
+
+    Pass the perf_counter() value taken before the KB was read as started
+    to have build_seconds include parsing as well. The optional TF-IDF
+    engine is only built when build_tfidf is set. Without
+    keep_article_bodies, article content is dropped once it is indexed and
+    has to be fetched from the KB store when a result is rendered.
+    """
+    start = started if started is not None else time.perf_counter()
+    articles = prepare_articles(data.get('articles', {}))
+    article_index = ArticleIndex(data.get('articles', {}))
+    tfidf_index = TfidfIndex(data.get('articles', {})) if build_tfidf else None
+    faq_matcher = FaqMatcher(data.get('faq', {}), word_boundary=faq_word_boundary)
+    command_index = TrigramIndex(data.get('commands', {}))
+    troubleshooting_index = TrigramIndex(data.get('troubleshooting', {}))
+    runbook_index = RunbookIndex(data.get('runbooks', {}))
+    if not keep_article_bodies:
+        data = dict(data)
+        data['articles'] = {
+            article_id: {field: value for field, value in article_data.items() if field != 'content'}
+            for article_id, article_data in data.get('articles', {}).items()
+        }
+    build_seconds = time.perf_counter() - start
+
+    return KnowledgeSnapshot(
+        data=data,
+        version=version,
+        source=source,
+        articles=articles,
+        article_index=article_index,
+        tfidf_index=tfidf_index,
+        faq_matcher=faq_matcher,
+        command_index=command_index,
+        troubleshooting_index=troubleshooting_index,
+        runbook_index=runbook_index,
+        build_seconds=build_seconds,
+        built_at=time.time()
+    )
+
+
+# Compiled snapshot file layout:
+#   magic | format version (u32) | header length (u32) | JSON header
+#   | pickled KnowledgeSnapshot | 8-byte aligned typed columns
+# Typed arrays inside the snapshot (index postings) are written as raw
+# columns and mapped back as read-only memoryviews over the file, so their
+# pages come straight from the shared page cache.
+#
+# Only those columns are shared between processes. Everything else in the
+# pickle is unpickled into private memory in each worker that loads it:
+# the KB dict, prepared articles, the FAQ automaton, the trigram indexes
+# and the TF-IDF structures. What a snapshot saves
+# over JSON is the parse and index build time, not their memory; workers
+# forked from a preloading master (gunicorn.conf.py) share those
+# structures copy-on-write instead.
+SNAPSHOT_MAGIC = b'ITSDKBS\x00'
+# Bump whenever a pickled class (snapshot, index, matcher) changes shape
+SNAPSHOT_FORMAT_VERSION = 6
+_PREAMBLE = struct.Struct('<8sII')
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+class _SnapshotPickler(pickle.Pickler):
+    def __init__(self, file, columns: List):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.columns = columns
+
+    def persistent_id(self, obj):
+        if isinstance(obj, (array, memoryview)):
+            typecode = obj.typecode if isinstance(obj, array) else obj.format
+            self.columns.append((typecode, obj.tobytes()))
+            return ('column', len(self.columns) - 1)
+        return None
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    def __init__(self, file, columns: List[memoryview]):
+        super().__init__(file)
+        self.columns = columns
+
+    def persistent_load(self, pid):
+        kind, position = pid
+        if kind != 'column':
+            raise pickle.UnpicklingError(f"Unknown persistent id {pid!r}")
+        return self.columns[position]
+
+
+def snapshot_options(faq_word_boundary: bool, build_tfidf: bool) -> Dict:
+    """Build options a compiled snapshot must match to be reused"""
+    return {"faq_word_boundary": faq_word_boundary, "tfidf": build_tfidf}
+
+
+def write_snapshot_file(snapshot: KnowledgeSnapshot, path: str, source_path: str):
+    """Write a compiled snapshot next to its JSON source, atomically"""
+    columns: List[Tuple[str, bytes]] = []
+    buffer = io.BytesIO()
+    _SnapshotPickler(buffer, columns).dump(snapshot)
+    payload = buffer.getvalue()
+
+    stat = os.stat(source_path)
+    offset = len(payload)
+    column_table = []
+    for typecode, raw in columns:
+        offset = _align(offset)
+        column_table.append([offset, len(raw), typecode])
+        offset += len(raw)
+
+    header = json.dumps({
+        "version": snapshot.version,
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "options": snapshot_options(snapshot.faq_matcher.word_boundary, snapshot.tfidf_index is not None),
+        "created_at": time.time(),
+        "payload_length": len(payload),
+        "columns": column_table
+    }).encode('utf-8')
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREAMBLE.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION, len(header)))
+        f.write(header)
+        data_start = _align(f.tell())
+        f.write(b'\0' * (data_start - f.tell()))
+        f.write(payload)
+        for (column_offset, _, _), (_, raw) in zip(column_table, columns):
+            f.write(b'\0' * (data_start + column_offset - f.tell()))
+            f.write(raw)
+        f.flush()
+        os.fsync(f.fileno())
+    # Workers that already mapped the old file keep its inode alive
+    os.replace(tmp_path, path)
+
+
+def load_snapshot_file(path: str, source_path: str, faq_word_boundary: bool = True,
+                       build_tfidf: bool = False) -> Optional[KnowledgeSnapshot]:
+    """Map a compiled snapshot read-only, or return None if it is missing or stale.
+
+    The snapshot is stale when its format version or build options differ,
+    or when the JSON source no longer has the content it was compiled from. Size and mtime are checked first so the JSON is only
+    hashed when they differ. A snapshot whose JSON source is missing is
+    never trusted, since nothing shows it is still current. Only the typed
+    index columns are mapped; the rest is unpickled into this process.
+    """
+    started = time.perf_counter()
+    try:
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    view = memoryview(mapped)
+    if len(view) < _PREAMBLE.size:
+        return None
+    magic, format_version, header_length = _PREAMBLE.unpack_from(view)
+    if magic != SNAPSHOT_MAGIC or format_version != SNAPSHOT_FORMAT_VERSION:
+        logger.warning(f"KB snapshot {path} has an unsupported format, ignoring it")
+        return None
+
+    header = json.loads(bytes(view[_PREAMBLE.size:_PREAMBLE.size + header_length]))
+    if header['options'] != snapshot_options(faq_word_boundary, build_tfidf):
+        logger.warning(f"KB snapshot {path} was compiled with other options, ignoring it")
+        return None
+
+    source = file_signature(source_path)
+    if source is None:
+        logger.error(f"KB source {source_path} is missing; not trusting snapshot {path}")
+        return None
+    if (source[2], source[1]) != (header['source_size'], header['source_mtime_ns']):
+        with open(source_path, 'rb') as f:
+            if content_version(f.read()) != header['version']:
+                logger.warning(f"KB snapshot {path} is stale, falling back to JSON")
+                return None
+
+    data_start = _align(_PREAMBLE.size + header_length)
+    columns = [
+        view[data_start + offset:data_start + offset + length].cast(typecode)
+        for offset, length, typecode in header['columns']
+    ]
+    payload = view[data_start:data_start + header['payload_length']]
+    snapshot = _SnapshotUnpickler(io.BytesIO(payload), columns).load()
+
+    # Describe this process's load rather than the compile run
+    snapshot.source = source
+    snapshot.build_seconds = time.perf_counter() - started
+    snapshot.built_at = time.time()
+    return snapshot
@@ -0,0 +1,128 @@
+import json
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ASCENDING, MongoClient
+
+from .kb_snapshot import content_version
+
+# One pooled client per URI and process; MongoClient is thread-safe and
+# manages its own connection pool
+_clients: Dict[str, MongoClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_mongo_client(uri: str, max_pool_size: int = 50) -> MongoClient:
+    """Return the shared MongoClient for uri, creating it on first use.
+
+    connect=False defers opening sockets until the first operation, so a
+    client created before gunicorn forks is never shared across workers.
+    """
+    with _clients_lock:
+        client = _clients.get(uri)
+        if client is None:
+            client = MongoClient(uri, maxPoolSize=max_pool_size, connect=False)
+            _clients[uri] = client
+        return client
+
+
+class MongoKnowledgeStore:
+    """KB storage in MongoDB, one collection per KB section.
+
+    Snapshot builds stream every section in batches with projections.
+    Article bodies are only needed to index them, so snapshots built from
+    this store drop them and search results fetch the few bodies they
+    render by id. The kb_meta collection holds the KB version that reloads
+    poll for changes.
+    """
+
+    # Sections stored as {_id: key, value: text}
+    SCALAR_SECTIONS = ('intents', 'commands', 'troubleshooting')
+    ARTICLE_FIELDS = {'title': 1, 'content': 1, 'tags': 1}
+    FAQ_FIELDS = {'question': 1, 'answer': 1, 'variations': 1}
+    RUNBOOK_FIELDS = {'triggers': 1, 'steps': 1}
+    # Sections are imported into <section>_import, then renamed into place
+    STAGING_SUFFIX = '_import'
+
+    lazy_article_bodies = True
+
+    def __init__(self, database, batch_size: int = 1000):
+        self.db = database
+        self.batch_size = batch_size
+
+    def describe(self) -> str:
+        return f"mongodb:{self.db.name}"
+
+    def ensure_indexes(self, articles=None):
+        """Create the indexes article listings and tag filters rely on (on db.articles by default)"""
+        articles = articles if articles is not None else self.db.articles
+        articles.create_index([('tags', ASCENDING)], name='tags')
+        articles.create_index([('title', ASCENDING)], name='title')
+
+    def version(self) -> Optional[str]:
+        """Version stamped by the last import, or None for an empty store"""
+        meta = self.db.kb_meta.find_one({'_id': 'kb'}, {'version': 1})
+        return meta.get('version') if meta else None
+
+    def load_knowledge_base(self) -> Tuple[Dict, str]:
+        """Read every KB section into a KB document, returning it and its version"""
+        kb_data = {}
+        for section in self.SCALAR_SECTIONS:
+            cursor = self.db[section].find({}, {'value': 1}, batch_size=self.batch_size)
+            kb_data[section] = {doc['_id']: doc.get('value', '') for doc in cursor}
+
+        cursor = self.db.articles.find({}, self.ARTICLE_FIELDS, batch_size=self.batch_size)
+        kb_data['articles'] = {doc.pop('_id'): doc for doc in cursor}
+
+        cursor = self.db.faq.find({}, self.FAQ_FIELDS, batch_size=self.batch_size)
+        kb_data['faq'] = {doc.pop('_id'): doc for doc in cursor}
+
+        cursor = self.db.runbooks.find({}, self.RUNBOOK_FIELDS, batch_size=self.batch_size)
+        kb_data['runbooks'] = {doc.pop('_id'): doc for doc in cursor}
+
+        version = self.version() or content_version(json.dumps(kb_data, sort_keys=True).encode('utf-8'))
+        return kb_data, version
+
+    def fetch_article_bodies(self, article_ids: Iterable[str]) -> Dict[str, str]:
+        """Fetch the content of the given articles in one round trip"""
+        cursor = self.db.articles.find({'_id': {'$in': list(article_ids)}}, {'content': 1})
+        return {doc['_id']: doc.get('content', '') for doc in cursor}
+
+    def list_articles(self, tag: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        """List article ids, titles and tags without loading their bodies"""
+        query = {'tags': tag} if tag else {}
+        cursor = self.db.articles.find(query, {'title': 1, 'tags': 1}).sort('title', ASCENDING).limit(limit)
+        return [{'id': doc['_id'], 'title': doc.get('title', ''), 'tags': doc.get('tags', [])} for doc in cursor]
+
+    def import_knowledge_base(self, kb_data: Dict, version: str):
+        """Replace every KB section with kb_data using bulk inserts.
+
+        Each section is written to a staging collection first and renamed
+        over the live one (dropTarget) only once every section has been
+        written, so a failed import leaves the old KB in place and readers
+        never see an emptied section. The version is stamped last, so
+        polling readers only rebuild once the import is complete.
+        """
+        collections = {
+            section: [{'_id': key, 'value': value} for key, value in kb_data.get(section, {}).items()]
+            for section in self.SCALAR_SECTIONS
+        }
+        collections['articles'] = [{'_id': key, **article} for key, article in kb_data.get('articles', {}).items()]
+        collections['faq'] = [{'_id': key, **entry} for key, entry in kb_data.get('faq', {}).items()]
+        collections['runbooks'] = [{'_id': key, **runbook} for key, runbook in kb_data.get('runbooks', {}).items()]
+
+        for name, documents in collections.items():
+            staging = self.db[f"{name}{self.STAGING_SUFFIX}"]
+            # Left over from an import that failed part way
+            staging.drop()
+            if documents:
+                staging.insert_many(documents, ordered=False)
+        self.ensure_indexes(self.db[f"articles{self.STAGING_SUFFIX}"])
+
+        for name, documents in collections.items():
+            if documents:
+                self.db[f"{name}{self.STAGING_SUFFIX}"].rename(name, dropTarget=True)
+            else:
+                self.db[name].drop()
+        self.ensure_indexes()
+        self.db.kb_meta.replace_one({'_id': 'kb'}, {'_id': 'kb', 'version': version}, upsert=True)
@@ -1,36 +1,290 @@
+import copy
 import json
+import logging
 import os
-from typing import Dict, List, Optional
+import threading
+import time
+import weakref
+from typing import Dict, Iterator, List, Optional, Tuple
 import re
 
+from .faq_matcher import FaqMatcher
+from .feedback_analytics import PRIOR_CANDIDATES, FeedbackAnalytics
+from .kb_snapshot import (
+    KnowledgeSnapshot, build_snapshot, content_version, file_signature, load_snapshot_file, read_kb_file
+)
+from .metrics import stage_metrics
+from .runbooks import DEFAULT_RUNBOOKS
+from .search_index import TOKEN_PATTERN, ArticleIndex
+from .tfidf_index import tfidf_available
+
+# Article ranking engines selectable per request; BM25 is the default
+ARTICLE_ENGINES = ('bm25', 'keyword', 'tfidf')
+DEFAULT_ARTICLE_ENGINE = 'bm25'
+# Key order of search_knowledge() results
+RESULT_SECTIONS = ('intent_matches', 'command_matches', 'troubleshooting_matches', 'faq_matches', 'article_matches')
+# Sections format_response() shows, in display order
+FORMATTED_SECTIONS = ('faq_matches', 'article_matches', 'command_matches', 'troubleshooting_matches')
+
+logger = logging.getLogger(__name__)
+
+# Services with a running watcher. Threads do not survive fork, so a
+# forked child (a gunicorn worker of a preloaded app) restarts them
+_watching = weakref.WeakSet()
+
+
+def _restart_watchers_after_fork():
+    for service in list(_watching):
+        service._restart_after_fork()
+
+
+os.register_at_fork(after_in_child=_restart_watchers_after_fork)
+
+def create_knowledge_service(kb_file: str, snapshot_file: Optional[str] = None, enable_tfidf: bool = False,
+                             kb_backend: str = 'json', mongodb_uri: Optional[str] = None,
+                             mongo_pool_size: int = 50, watch_interval: float = 0,
+                             feedback_file: Optional[str] = None, ranking_prior: bool = True,
+                             prior_weight: float = 0.2) -> 'KnowledgeService':
+    """Build a KnowledgeService from deployment settings and start its watcher.
+
+    Takes plain values so query worker processes can build the same service
+    as the web process from a picklable settings dict. With a feedback_file,
+    article ranking follows the helpfulness aggregates of that log.
+    """
+    store = None
+    if kb_backend == 'mongo':
+        from .kb_store import MongoKnowledgeStore, get_mongo_client
+        store = MongoKnowledgeStore(get_mongo_client(mongodb_uri, mongo_pool_size).get_default_database())
+
+    service = KnowledgeService(kb_file, snapshot_file=snapshot_file, enable_tfidf=enable_tfidf, store=store)
+    if watch_interval > 0:
+        service.start_watcher(watch_interval)
+    if feedback_file:
+        service.feedback_analytics = FeedbackAnalytics(feedback_file, prior_weight=prior_weight,
+                                                       ranking_prior=ranking_prior)
+        service.feedback_analytics.start()
+    return service
+
 class KnowledgeService:
-    def __init__(self, kb_file: str):
+    def __init__(self, kb_file: Optional[str], faq_word_boundary: bool = True, snapshot_file: Optional[str] = None,
+                 enable_tfidf: bool = False, store=None):
         self.kb_file = kb_file
-        print(f"KnowledgeService initialized with file: {kb_file}")
-        self.knowledge_base = self.load_knowledge_base()
+        # Optional KB store (e.g. MongoKnowledgeStore) used instead of the JSON file
+        self.store = store
+        self.snapshot_file = snapshot_file if store is None else None
+        self.enable_tfidf = enable_tfidf and tfidf_available()
+        if enable_tfidf and not self.enable_tfidf:
+            logger.warning("TF-IDF engine requested but numpy is not installed; it stays disabled")
+        self.faq_word_boundary = faq_word_boundary
+        self.last_reload_error = None
+        # Time spent in typo-tolerant command/troubleshooting lookups
+        self.fuzzy_lookups = 0
+        self.fuzzy_seconds = 0.0
+        self._fuzzy_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._reload_thread = None
+        self._watcher_stop = None
+        self._watch_interval = None
+        # Optional helpfulness aggregates used as an article ranking prior
+        self.feedback_analytics: Optional[FeedbackAnalytics] = None
+        logger.info(f"KnowledgeService initialized with {self.source_name}")
+
+        snapshot = self.load_compiled_snapshot()
+        if snapshot is None:
+            started = time.perf_counter()
+            source = self.source_signature()
+            kb_data, version = self.load_knowledge_base()
+            snapshot = self.build_snapshot(kb_data, version, source, started)
+        self._snapshot = snapshot
+
+    # Readers grab the snapshot reference once per request; a reload only
+    # ever replaces the reference, never the snapshot's contents.
+    @property
+    def snapshot(self) -> KnowledgeSnapshot:
+        return self._snapshot
+
+    @property
+    def knowledge_base(self) -> Dict:
+        return self._snapshot.data
+
+    @property
+    def article_index(self) -> ArticleIndex:
+        return self._snapshot.article_index
+
+    @property
+    def faq_matcher(self) -> FaqMatcher:
+        return self._snapshot.faq_matcher
+
+    @property
+    def version(self) -> str:
+        return self._snapshot.version
+
+    @property
+    def source_name(self) -> str:
+        return self.store.describe() if self.store is not None else f"file: {self.kb_file}"
+
+    def source_signature(self):
+        """Cheap fingerprint of the KB source that changes whenever it is edited"""
+        if self.store is not None:
+            return self.store.version()
+        return file_signature(self.kb_file)
+
+    def build_snapshot(self, kb_data: Dict, version: str, source=None, started: Optional[float] = None) -> KnowledgeSnapshot:
+        """Build the article index and FAQ matcher for a KB document"""
+        keep_bodies = self.store is None or not self.store.lazy_article_bodies
+        snapshot = build_snapshot(kb_data, version, source, self.faq_word_boundary, started,
+                                  self.enable_tfidf, keep_bodies)
+        logger.info(f"Built KB snapshot {version}: {len(snapshot.article_index)} articles, "
+              f"{snapshot.article_index.term_count} terms, {snapshot.faq_matcher.pattern_count} FAQ patterns "
+              f"in {snapshot.build_seconds * 1000:.1f} ms")
+        return snapshot
+
+    def load_compiled_snapshot(self) -> Optional[KnowledgeSnapshot]:
+        """Map the precompiled snapshot file if one exists and is up to date"""
+        if not self.snapshot_file:
+            return None
+        try:
+            snapshot = load_snapshot_file(self.snapshot_file, self.kb_file, self.faq_word_boundary, self.enable_tfidf)
+        except Exception as e:
+            logger.error(f"Error loading KB snapshot from {self.snapshot_file}: {e}")
+            return None
+        if snapshot is not None:
+            logger.info(f"Mapped compiled KB snapshot {snapshot.version} from {self.snapshot_file} "
+                  f"in {snapshot.build_seconds * 1000:.1f} ms")
+        return snapshot
+
+    def reload_knowledge_base(self, force: bool = False) -> bool:
+        """Rebuild the snapshot from the KB source and swap it in atomically.
+
+        Unless force is set, nothing happens when the source signature (the
+        file's inode, mtime and size, or the store's version) is unchanged. A file that fails to parse leaves the current
+        snapshot in place. Returns True when a new snapshot was installed.
+        """
+        with self._reload_lock:
+            source = self.source_signature()
+            if not force and source == self._snapshot.source:
+                return False
+
+            snapshot = self.load_compiled_snapshot()
+            if snapshot is None:
+                started = time.perf_counter()
+                try:
+                    kb_data, version = self.read_knowledge_base()
+                except Exception as e:
+                    self.last_reload_error = str(e)
+                    logger.error(f"KB reload failed, keeping version {self._snapshot.version}: {e}")
+                    return False
+                snapshot = self.build_snapshot(kb_data, version, source, started)
+
+            self._snapshot = snapshot
+            self.last_reload_error = None
+            return True
+
+    def reload_in_background(self, force: bool = True) -> bool:
+        """Start a reload on a background thread unless one is already running"""
+        with self._reload_lock:
+            if self._reload_thread is not None and self._reload_thread.is_alive():
+                return False
+            self._reload_thread = threading.Thread(
+                target=self.reload_knowledge_base, kwargs={'force': force}, name='kb-reload', daemon=True
+            )
+            self._reload_thread.start()
+            return True
+
+    def start_watcher(self, interval: float = 5.0):
+        """Poll the KB source signature on a daemon thread and reload on change"""
+        if self._watcher_stop is not None:
+            return
+        stop = threading.Event()
+
+        def watch():
+            while not stop.wait(interval):
+                try:
+                    self.reload_knowledge_base()
+                except Exception as e:
+                    logger.error(f"KB watcher error: {e}")
+
+        self._watcher_stop = stop
+        self._watch_interval = interval
+        _watching.add(self)
+        threading.Thread(target=watch, name='kb-watcher', daemon=True).start()
+        logger.info(f"Watching {self.source_name} for changes every {interval}s")
+
+    def stop_watcher(self):
+        """Stop the KB watcher if it is running"""
+        if self._watcher_stop is not None:
+            self._watcher_stop.set()
+            self._watcher_stop = None
+            _watching.discard(self)
+
+    def _restart_after_fork(self):
+        # The parent's threads may have held these locks when it forked
+        self._reload_lock = threading.Lock()
+        self._fuzzy_lock = threading.Lock()
+        self._reload_thread = None
+        self._watcher_stop = None
+        self.start_watcher(self._watch_interval)
+
+    def status(self) -> Dict:
+        """Describe the KB version currently being served"""
+        snapshot = self._snapshot
+        reloading = self._reload_thread is not None and self._reload_thread.is_alive()
+        return {
+            "source": self.source_name,
+            "version": snapshot.version,
+            "built_at": snapshot.built_at,
+            "build_ms": round(snapshot.build_seconds * 1000, 3),
+            "articles": len(snapshot.article_index),
+            "faq_entries": len(snapshot.data.get('faq', {})),
+            "reloading": reloading,
+            "watching": self._watcher_stop is not None,
+            "last_reload_error": self.last_reload_error,
+            "fuzzy_lookup": self.fuzzy_stats()
+        }
+
+    def fuzzy_stats(self) -> Dict:
+        """Count and time of trigram lookups for commands and troubleshooting"""
+        with self._fuzzy_lock:
+            lookups, seconds = self.fuzzy_lookups, self.fuzzy_seconds
+        return {
+            "lookups": lookups,
+            "total_ms": round(seconds * 1000, 3),
+            "mean_us": round(seconds * 1e6 / lookups, 3) if lookups else 0.0
+        }
+
+    def read_knowledge_base(self) -> Tuple[Dict, str]:
+        """Read and parse the KB source, returning the data and its version"""
+        if self.store is not None:
+            return self.store.load_knowledge_base()
+        return read_kb_file(self.kb_file)
+
+    def load_knowledge_base(self) -> Tuple[Dict, str]:
+        """Load knowledge base from the KB store or JSON file"""
+        if self.store is not None:
+            try:
+                kb_data, version = self.read_knowledge_base()
+                logger.info(f"Successfully loaded KB from: {self.source_name}")
+                return kb_data, version
+            except Exception as e:
+                logger.error(f"Error loading knowledge base from {self.source_name}: {e}")
+                return self.create_default_kb()
 
-    def load_knowledge_base(self) -> Dict:
-        """Load knowledge base from JSON file"""
         try:
             if not os.path.exists(self.kb_file):
-                print(f"KB file not found at: {self.kb_file}")
+                logger.warning(f"KB file not found at: {self.kb_file}")
                 return self.create_default_kb()
                 
-            with open(self.kb_file, 'r', encoding='utf-8') as f:
-                kb_data = json.load(f)
-                print(f"Successfully loaded KB from: {self.kb_file}")
-                return kb_data
+            kb_data, version = self.read_knowledge_base()
+            logger.info(f"Successfully loaded KB from: {self.kb_file}")
+            return kb_data, version
                 
         except Exception as e:
-            print(f"Error loading knowledge base from {self.kb_file}: {e}")
+            logger.error(f"Error loading knowledge base from {self.kb_file}: {e}")
             return self.create_default_kb()
 
-    def create_default_kb(self) -> Dict:
+    def create_default_kb(self) -> Tuple[Dict, str]:
         """Create default knowledge base structure"""
-        print(f"Creating default KB structure...")
-        
-        # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(self.kb_file), exist_ok=True)
+        logger.info("Creating default KB structure...")
         
         default_kb = {
             "intents": {
@@ -57,153 +311,286 @@ class KnowledgeService:
                     "answer": "How can I help you?",
                     "variations": ["hi", "hello"]
                 }
-            }
+            },
+            "runbooks": copy.deepcopy(DEFAULT_RUNBOOKS)
         }
         
-        try:
-            with open(self.kb_file, 'w', encoding='utf-8') as f:
-                json.dump(default_kb, f, indent=2, ensure_ascii=False)
-            print(f"Default KB created at: {self.kb_file}")
-        except Exception as e:
-            print(f"Error creating default KB: {e}")
+        # Only a JSON-backed KB gets the default written out
+        if self.store is None:
+            try:
+                # Create directory if it doesn't exist
+                os.makedirs(os.path.dirname(self.kb_file), exist_ok=True)
+                with open(self.kb_file, 'w', encoding='utf-8') as f:
+                    json.dump(default_kb, f, indent=2, ensure_ascii=False)
+                logger.info(f"Default KB created at: {self.kb_file}")
+            except Exception as e:
+                logger.error(f"Error creating default KB: {e}")
         
-        return default_kb
+        return default_kb, content_version(json.dumps(default_kb, sort_keys=True).encode('utf-8'))
+
+    def search_knowledge(self, intent: str, entities: Dict, user_query: str = "",
+                         engine: str = DEFAULT_ARTICLE_ENGINE, snapshot: Optional[KnowledgeSnapshot] = None,
+                         article_results: Optional[Dict] = None) -> Optional[Dict]:
+        """Search knowledge base for relevant information.
 
-    def search_knowledge(self, intent: str, entities: Dict, user_query: str = "") -> Optional[Dict]:
-        """Search knowledge base for relevant information"""
-        results = {}
+        Batch callers pass the snapshot they grabbed for the whole batch and
+        article_results ranked ahead of time with search_articles_batch.
+        """
+        found = dict(self.iter_search_knowledge(intent, entities, user_query, engine, snapshot, article_results))
+        results = {section: found[section] for section in RESULT_SECTIONS if section in found}
+        return results if results else None
+
+    def iter_search_knowledge(self, intent: str, entities: Dict, user_query: str = "",
+                              engine: str = DEFAULT_ARTICLE_ENGINE, snapshot: Optional[KnowledgeSnapshot] = None,
+                              article_results: Optional[Dict] = None) -> Iterator[Tuple[str, object]]:
+        """Yield (section, matches) for each result section as soon as it is found.
+
+        Sections come in the order format_response shows them, so a
+        streaming client can render each one on arrival.
+        """
+        snapshot = snapshot or self._snapshot
+        kb = snapshot.data
         
         # Search by intent in structured sections
-        if intent in self.knowledge_base.get('intents', {}):
-            results['intent_matches'] = self.knowledge_base['intents'][intent]
-        
-        # Search for command syntax
-        if 'command_name' in entities:
-            for command in entities['command_name']:
-                if command in self.knowledge_base.get('commands', {}):
-                    if 'command_matches' not in results:
-                        results['command_matches'] = {}
-                    results['command_matches'][command] = self.knowledge_base['commands'][command]
-        
-        # Search troubleshooting
-        if intent == 'troubleshooting' and 'error_code' in entities:
-            for error in entities['error_code']:
-                if error in self.knowledge_base.get('troubleshooting', {}):
-                    if 'troubleshooting_matches' not in results:
-                        results['troubleshooting_matches'] = {}
-                    results['troubleshooting_matches'][error] = self.knowledge_base['troubleshooting'][error]
+        started = time.perf_counter()
+        intents = kb.get('intents', {})
+        found_intent = intent in intents
+        stage_metrics.observe('kb_intent', time.perf_counter() - started)
+        if found_intent:
+            yield 'intent_matches', intents[intent]
         
         # Search FAQ using the user query
         if user_query:
-            faq_results = self.search_faq(user_query)
+            started = time.perf_counter()
+            faq_results = self.search_faq(user_query, snapshot)
+            stage_metrics.observe('kb_faq', time.perf_counter() - started)
             if faq_results:
-                results['faq_matches'] = faq_results
+                yield 'faq_matches', faq_results
         
         # Search articles by keywords
-        article_results = self.search_articles(user_query, entities)
+        if article_results is None:
+            started = time.perf_counter()
+            article_results = self.search_articles(user_query, entities, snapshot=snapshot, engine=engine)
+            stage_metrics.observe('kb_articles', time.perf_counter() - started)
         if article_results:
-            results['article_matches'] = article_results
+            yield 'article_matches', article_results
         
-        return results if results else None
-
-    def search_faq(self, user_query: str) -> Dict:
-        """Search FAQ using keyword matching"""
-        query_lower = user_query.lower()
-        matches = {}
+        # Search for command syntax and troubleshooting, tolerating case
+        # differences and typos in the extracted entities
+        fuzzy_started = time.perf_counter()
+        fuzzy_lookups = 0
+        command_matches = {}
+        troubleshooting_matches = {}
         
-        if 'faq' in self.knowledge_base:
-            for faq_id, faq_data in self.knowledge_base['faq'].items():
-                # Check question
-                if faq_data.get('question', '').lower() in query_lower:
-                    matches[faq_id] = faq_data
-                    continue
-                
-                # Check variations
-                variations = faq_data.get('variations', [])
-                for variation in variations:
-                    if variation.lower() in query_lower:
-                        matches[faq_id] = faq_data
-                        break
+        if 'command_name' in entities:
+            for command in entities['command_name']:
+                fuzzy_lookups += 1
+                key = snapshot.command_index.best(command)
+                if key is not None:
+                    command_matches[key] = kb['commands'][key]
+        
+        if intent == 'troubleshooting' and 'error_code' in entities:
+            for error in entities['error_code']:
+                fuzzy_lookups += 1
+                key = snapshot.troubleshooting_index.best(error)
+                if key is not None:
+                    troubleshooting_matches[key] = kb['troubleshooting'][key]
+        
+        if fuzzy_lookups:
+            elapsed = time.perf_counter() - fuzzy_started
+            stage_metrics.observe('kb_fuzzy', elapsed)
+            with self._fuzzy_lock:
+                self.fuzzy_lookups += fuzzy_lookups
+                self.fuzzy_seconds += elapsed
         
+        if command_matches:
+            yield 'command_matches', command_matches
+        if troubleshooting_matches:
+            yield 'troubleshooting_matches', troubleshooting_matches
+
+    def search_faq(self, user_query: str, snapshot: Optional[KnowledgeSnapshot] = None) -> Dict:
+        """Search FAQ questions and variations in a single pass over the query"""
+        snapshot = snapshot or self._snapshot
+        faq = snapshot.data.get('faq', {})
+        return {faq_id: faq[faq_id] for faq_id in snapshot.faq_matcher.match(user_query)}
+
+    def check_engine(self, engine: str):
+        """Raise ValueError unless engine can rank articles in this service"""
+        if engine not in ARTICLE_ENGINES:
+            raise ValueError(f"Unknown search engine '{engine}', expected one of {', '.join(ARTICLE_ENGINES)}")
+        if engine == 'tfidf' and self._snapshot.tfidf_index is None:
+            raise ValueError("The tfidf search engine is not enabled on this server")
+
+    def search_articles(self, user_query: str, entities: Dict, top_k: int = 3,
+                        snapshot: Optional[KnowledgeSnapshot] = None,
+                        engine: str = DEFAULT_ARTICLE_ENGINE) -> Dict:
+        """Search articles with the selected engine (BM25 inverted index by default)"""
+        snapshot = snapshot or self._snapshot
+        if engine == 'keyword':
+            return self.search_articles_keyword(user_query, entities, top_k, snapshot)
+
+        self.check_engine(engine)
+        index = snapshot.tfidf_index if engine == 'tfidf' else snapshot.article_index
+        prior = self._ranking_prior()
+        if prior is None:
+            return self._article_matches(snapshot, index.search(user_query, entities, top_k))
+        hits = index.search(user_query, entities, top_k * PRIOR_CANDIDATES)
+        return self._article_matches(snapshot, prior.rerank(hits, top_k))
+
+    def search_articles_batch(self, user_queries: List[str], entities_list: Optional[List[Dict]] = None,
+                              top_k: int = 3, snapshot: Optional[KnowledgeSnapshot] = None) -> List[Dict]:
+        """Rank articles for many queries at once with the TF-IDF engine"""
+        snapshot = snapshot or self._snapshot
+        self.check_engine('tfidf')
+        prior = self._ranking_prior()
+        if prior is None:
+            ranked = snapshot.tfidf_index.search_batch(user_queries, entities_list, top_k)
+        else:
+            ranked = [prior.rerank(hits, top_k)
+                      for hits in snapshot.tfidf_index.search_batch(user_queries, entities_list, top_k * PRIOR_CANDIDATES)]
+        return [self._article_matches(snapshot, hits) for hits in ranked]
+
+    def cache_version(self, snapshot: Optional[KnowledgeSnapshot] = None) -> str:
+        """Version cached responses are tied to: the KB version, and whether the ranking prior applies
+
+        Every worker notices the admin prior switch on its own feedback poll,
+        so keying on it empties each worker's response cache as it does.
+        """
+        version = (snapshot or self._snapshot).version
+        return f"{version}+prior" if self._ranking_prior() is not None else version
+
+    def _ranking_prior(self) -> Optional[FeedbackAnalytics]:
+        """The feedback aggregates, if they should reorder article results"""
+        analytics = self.feedback_analytics
+        return analytics if analytics is not None and analytics.prior_active() else None
+
+    def _article_matches(self, snapshot: KnowledgeSnapshot, hits: List[Tuple[str, float]]) -> Dict:
+        articles = snapshot.data.get('articles', {})
+        matches = {}
+
+        # Snapshots built from a lazy store carry no bodies; fetch only the
+        # ones being returned, in one round trip
+        missing = [article_id for article_id, _ in hits if 'content' not in articles[article_id]]
+        bodies = self.store.fetch_article_bodies(missing) if missing and self.store is not None else {}
+
+        for article_id, score in hits:
+            article_data = articles[article_id]
+            matches[article_id] = {
+                'title': article_data.get('title', ''),
+                'content': article_data.get('content', bodies.get(article_id, '')),
+                'score': score
+            }
+
         return matches
 
-    def search_articles(self, user_query: str, entities: Dict) -> Dict:
-        """Search articles by keywords and entities"""
+    def list_articles(self, tag: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        """List article ids, titles and tags, optionally filtered by tag"""
+        if self.store is not None:
+            return self.store.list_articles(tag, limit)
+
+        listing = [
+            {'id': article_id, 'title': article_data.get('title', ''), 'tags': article_data.get('tags', [])}
+            for article_id, article_data in self._snapshot.data.get('articles', {}).items()
+            if tag is None or tag in article_data.get('tags', [])
+        ]
+        return sorted(listing, key=lambda article: article['title'])[:limit]
+
+    def search_articles_keyword(self, user_query: str, entities: Dict, top_k: int = 3,
+                                snapshot: Optional[KnowledgeSnapshot] = None) -> Dict:
+        """Hand-weighted keyword scan over every article's precomputed fields"""
+        snapshot = snapshot or self._snapshot
         query_lower = user_query.lower()
-        matches = {}
+        query_tokens = set(TOKEN_PATTERN.findall(query_lower))
+        content_keywords = {token for token in query_tokens if len(token) > 3}
+        entity_tokens = set()
+        for entity_list in (entities or {}).values():
+            for entity in entity_list:
+                entity_tokens.update(TOKEN_PATTERN.findall(str(entity).lower()))
+        scores = {}
         
-        if 'articles' in self.knowledge_base:
-            for article_id, article_data in self.knowledge_base['articles'].items():
-                score = 0
-                
-                # Check title
-                title = article_data.get('title', '').lower()
-                if any(word in title for word in query_lower.split()):
+        for article in snapshot.articles:
+            score = 0
+            
+            # Check title
+            if not article.title_tokens.isdisjoint(query_tokens):
+                score += 2
+            
+            # Check tags (multi-word tags still need a phrase match)
+            for tag in article.tags:
+                if tag in query_tokens or (' ' in tag and tag in query_lower):
+                    score += 3
+                if tag in entity_tokens:
                     score += 2
-                
-                # Check tags
-                tags = article_data.get('tags', [])
-                for tag in tags:
-                    if tag.lower() in query_lower:
-                        score += 3
-                    if entities and any(tag.lower() in str(entity).lower() for entity_list in entities.values() for entity in entity_list):
-                        score += 2
-                
-                # Check content for main keywords
-                content = article_data.get('content', '').lower()
-                if any(keyword in content for keyword in query_lower.split() if len(keyword) > 3):
-                    score += 1
-                
-                if score >= 2:  # Threshold for considering it a match
-                    matches[article_id] = {
-                        'title': article_data.get('title', ''),
-                        'content': article_data.get('content', ''),
-                        'score': score
-                    }
+            
+            # Check content for main keywords
+            if not article.content_tokens.isdisjoint(content_keywords):
+                score += 1
+            
+            if score >= 2:  # Threshold for considering it a match
+                scores[article.article_id] = score
         
-        # Sort by score and return top 3
-        sorted_matches = dict(sorted(matches.items(), key=lambda x: x[1]['score'], reverse=True)[:3])
-        return sorted_matches
+        # Sort by score and return top k
+        hits = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        prior = self._ranking_prior()
+        hits = prior.rerank(hits, top_k) if prior is not None else hits[:top_k]
+        return self._article_matches(snapshot, hits)
 
     def format_response(self, kb_results, automation_suggestions=None):
         """Format the response based on available data"""
+        return "\n".join(self.iter_format_response(kb_results, automation_suggestions))
+
+    def iter_format_response(self, kb_results, automation_suggestions=None) -> Iterator[str]:
+        """Yield the formatted response one section at a time"""
         if not kb_results and not automation_suggestions:
-            return "I'm not sure how to help with that. Could you provide more details?"
-        
-        response_parts = []
+            yield "I'm not sure how to help with that. Could you provide more details?"
+            return
         
         if kb_results:
-            # FAQ matches (highest priority)
-            if 'faq_matches' in kb_results:
-                for faq_id, faq_data in kb_results['faq_matches'].items():
-                    response_parts.append(f"**{faq_data.get('question', 'Help')}**")
-                    response_parts.append(f"{faq_data.get('answer', '')}")
-            
-            # Article matches
-            if 'article_matches' in kb_results:
-                response_parts.append("\n**Related Knowledge Articles:**")
-                for article_id, article_data in kb_results['article_matches'].items():
-                    response_parts.append(f"\n📖 **{article_data['title']}**")
-                    # Show first 200 characters of content
-                    content_preview = article_data['content'][:200] + "..." if len(article_data['content']) > 200 else article_data['content']
-                    response_parts.append(f"{content_preview}")
-            
-            # Command help
-            if 'command_matches' in kb_results:
-                response_parts.append("\n**Command Help:**")
-                for cmd, info in kb_results['command_matches'].items():
-                    response_parts.append(f"- `{cmd}`: {info}")
-            
-            # Troubleshooting
-            if 'troubleshooting_matches' in kb_results:
-                response_parts.append("\n**Troubleshooting:**")
-                for error, solution in kb_results['troubleshooting_matches'].items():
-                    response_parts.append(f"- **{error}**: {solution}")
+            for section in FORMATTED_SECTIONS:
+                if section in kb_results:
+                    yield self.format_section(section, kb_results[section])
         
         if automation_suggestions:
+            yield self.format_section('automation_suggestions', automation_suggestions)
+
+    def format_section(self, section: str, matches) -> Optional[str]:
+        """Format one result section, or return None for sections not shown"""
+        response_parts = []
+        
+        # FAQ matches (highest priority)
+        if section == 'faq_matches':
+            for faq_id, faq_data in matches.items():
+                response_parts.append(f"**{faq_data.get('question', 'Help')}**")
+                response_parts.append(f"{faq_data.get('answer', '')}")
+        
+        # Article matches
+        elif section == 'article_matches':
+            response_parts.append("\n**Related Knowledge Articles:**")
+            for article_id, article_data in matches.items():
+                response_parts.append(f"\n📖 **{article_data['title']}**")
+                # Show first 200 characters of content
+                content_preview = article_data['content'][:200] + "..." if len(article_data['content']) > 200 else article_data['content']
+                response_parts.append(f"{content_preview}")
+        
+        # Command help
+        elif section == 'command_matches':
+            response_parts.append("\n**Command Help:**")
+            for cmd, info in matches.items():
+                response_parts.append(f"- `{cmd}`: {info}")
+        
+        # Troubleshooting
+        elif section == 'troubleshooting_matches':
+            response_parts.append("\n**Troubleshooting:**")
+            for error, solution in matches.items():
+                response_parts.append(f"- **{error}**: {solution}")
+        
+        elif section == 'automation_suggestions':
             response_parts.append("\n**Recommended Steps:**")
-            for step in automation_suggestions:
+            for step in matches:
                 response_parts.append(f"- {step['description']}")
                 response_parts.append(f"  Command: `{step['command']}`")
         
-        return "\n".join(response_parts)
\ No newline at end of file
+        else:
+            return None
+        
+        return "\n".join(response_parts)
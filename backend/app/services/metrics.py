@@ -0,0 +1,130 @@
+import glob
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence
+
+# Stages of a chat query, in the order they run
+STAGES = (
+    'jwt', 'intent', 'entities', 'kb_intent', 'kb_faq', 'kb_articles', 'kb_fuzzy', 'automation', 'format', 'query'
+)
+# Upper bounds in seconds; one more bucket catches everything above
+BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5
+)
+
+METRIC_NAME = 'itsd_stage_duration_seconds'
+# One file per process start: a nonce after the pid keeps a recycled pid
+# from truncating the counts an exited process left behind
+_FILE_PATTERN = 'stages_{pid}_{nonce}.db'
+
+
+class StageHistograms:
+    """Fixed-bucket latency histograms, one per pipeline stage.
+
+    Each stage owns a row of doubles: one count per bucket, then the sum
+    and count of observations. observe() is a bisect and three in-place
+    additions. With a directory configured, every process keeps its rows
+    in its own memory-mapped file there, so /metrics in any gunicorn or
+    query worker can add up all processes; without one, the rows live in
+    process memory. Only the owning process writes its file.
+    """
+
+    def __init__(self, stages: Sequence[str] = STAGES, buckets: Sequence[float] = BUCKETS):
+        self.stages = tuple(stages)
+        self.buckets = tuple(buckets)
+        self.row_size = len(self.buckets) + 3
+        self._offsets = {stage: i * self.row_size for i, stage in enumerate(self.stages)}
+        self.directory: Optional[str] = None
+        self._lock = threading.Lock()
+        self._mapped = None
+        self._values = array('d', bytes(8 * self.row_size * len(self.stages)))
+        # A forked child gets a fresh set of rows (and its own file)
+        os.register_at_fork(after_in_child=self._reopen)
+
+    def configure(self, directory: Optional[str]):
+        """Keep this process's histograms in a file under directory"""
+        self.directory = directory
+        self._reopen()
+
+    def _reopen(self):
+        size = 8 * self.row_size * len(self.stages)
+        self._lock = threading.Lock()
+        if not self.directory:
+            self._mapped = None
+            self._values = array('d', bytes(size))
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, _FILE_PATTERN.format(pid=os.getpid(), nonce=os.urandom(4).hex()))
+        # Exclusive create: never reset a file another process wrote
+        with open(path, 'xb') as f:
+            f.write(bytes(size))
+        with open(path, 'r+b') as f:
+            self._mapped = mmap.mmap(f.fileno(), size)
+        self._values = memoryview(self._mapped).cast('d')
+
+    def observe(self, stage: str, seconds: float):
+        """Record one duration; unknown stages are ignored"""
+        base = self._offsets.get(stage)
+        if base is None:
+            return
+        values = self._values
+        bucket = bisect_left(self.buckets, seconds)
+        with self._lock:
+            values[base + bucket] += 1
+            values[base + self.row_size - 2] += seconds
+            values[base + self.row_size - 1] += 1
+
+    def _collect(self) -> List[float]:
+        """Rows summed over every process writing to the directory"""
+        if not self.directory:
+            return list(self._values)
+        totals = [0.0] * (self.row_size * len(self.stages))
+        for path in glob.glob(os.path.join(self.directory, _FILE_PATTERN.format(pid='*', nonce='*'))):
+            try:
+                with open(path, 'rb') as f:
+                    raw = f.read()
+            except OSError:
+                continue
+            if len(raw) != 8 * len(totals):
+                continue
+            for i, value in enumerate(memoryview(raw).cast('d')):
+                totals[i] += value
+        return totals
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Per-stage cumulative bucket counts, sum and count"""
+        values = self._collect()
+        result = {}
+        for stage, base in self._offsets.items():
+            cumulative, running = [], 0.0
+            for i in range(len(self.buckets) + 1):
+                running += values[base + i]
+                cumulative.append(running)
+            result[stage] = {
+                "buckets": cumulative,
+                "sum": values[base + self.row_size - 2],
+                "count": values[base + self.row_size - 1]
+            }
+        return result
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines = [
+            f"# HELP {METRIC_NAME} Time spent in each chat query stage.",
+            f"# TYPE {METRIC_NAME} histogram"
+        ]
+        bounds = [repr(bound) for bound in self.buckets] + ['+Inf']
+        for stage, row in self.snapshot().items():
+            for bound, count in zip(bounds, row["buckets"]):
+                lines.append(f'{METRIC_NAME}_bucket{{stage="{stage}",le="{bound}"}} {int(count)}')
+            lines.append(f'{METRIC_NAME}_sum{{stage="{stage}"}} {row["sum"]!r}')
+            lines.append(f'{METRIC_NAME}_count{{stage="{stage}"}} {int(row["count"])}')
+        return "\n".join(lines) + "\n"
+
+
+# Shared by every service in the process
+stage_metrics = StageHistograms()
@@ -1,6 +1,26 @@
 import re
 import json
-from typing import Dict, List, Tuple
+import logging
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from ..logging_setup import log_query
+
+# Intent patterns made only of literal text joined by ".*" are compiled
+# into the combined scanner; anything else keeps its own regex
+_GAP = '.*'
+_LITERAL_PATTERN = re.compile(r"(?:[^.^$*+?{}\[\]\\|()]|\\[^a-zA-Z0-9])*")
+
+# Entity extraction: one tokenizer pass, then per-token lookups
+_ENTITY_TOKEN = re.compile(r"[A-Za-z0-9_~./-]+")
+_SERVER_NAME = re.compile(r"[A-Za-z]+-[A-Za-z0-9-]*")
+_ERROR_CODE = re.compile(r"err[A-Za-z0-9]*", re.IGNORECASE)
+_USERNAME = re.compile(r"[a-z_][a-z0-9_.-]{0,31}")
+_NUMBERED_USER = re.compile(r"user[0-9_][a-z0-9_]*")
+# Distinct values kept per entity type, so pasted logs stay cheap downstream
+MAX_ENTITY_VALUES = 20
+
+logger = logging.getLogger(__name__)
 
 class NlpEngine:
     def __init__(self):
@@ -40,52 +60,252 @@ class NlpEngine:
             ]
         }
         
-        # Enhanced entity patterns
-        self.entity_patterns = {
-            'server_name': r'server-[a-zA-Z0-9-]+|prod-|staging-|dev-',
-            'username': r'user[a-zA-Z0-9_]*|\b[a-z][a-z0-9_]{2,31}\b',
-            'error_code': r'error[A-Z0-9]*|ERR[A-Z0-9]*|permission denied|command not found|no such file',
-            'software_name': r'(apache|nginx|ssh|mysql|postgresql|docker|kubernetes|k8s|python|java)',
-            'command_name': r'(cd|ls|grep|find|chmod|chown|ps|kill|df|du|top|htop|free|uname|who|w)',
-            'file_path': r'/[/a-zA-Z0-9_.-]+|\~?/[a-zA-Z0-9_/. -]+'
+        # Entity lookup tables; extract_entities classifies each token of
+        # the query against these instead of running one regex per type
+        self.software_names = {
+            'apache', 'nginx', 'ssh', 'mysql', 'postgresql', 'docker', 'kubernetes', 'k8s', 'python', 'java'
+        }
+        self.command_names = {
+            'cd', 'ls', 'grep', 'find', 'chmod', 'chown', 'ps', 'kill', 'df', 'du', 'top', 'htop',
+            'free', 'uname', 'who', 'w'
+        }
+        self.error_phrases = [('permission', 'denied'), ('command', 'not', 'found'), ('no', 'such', 'file')]
+        self.server_prefixes = ('server-', 'prod-', 'staging-', 'dev-')
+        # Words after which the next token is taken to be a user name
+        self.username_cues = {'user', 'username', 'named', 'login', 'account'}
+        self.username_stop_words = {
+            'a', 'an', 'the', 'and', 'or', 'to', 'for', 'with', 'on', 'in', 'is', 'from', 'of',
+            'user', 'username', 'login', 'account', 'accounts', 'named', 'name', 'group', 'password',
+            'permission', 'permissions'
+        }
+
+        self._compile_intent_patterns()
+        self._compile_entity_tables()
+
+    def _compile_intent_patterns(self):
+        """Compile every intent pattern into one scanner over literal keywords.
+
+        Each pattern is a sequence of literal keywords separated by ".*"
+        gaps, so "how.*command" is the keywords ("how", "command"). All
+        keywords go into one prefix-factored alternation with a named group
+        per keyword; a single finditer over the text reports the longest
+        keyword starting at every position, and every shorter keyword
+        starting there is one of its prefixes. A pattern matches when its
+        keywords occur in order on one line, which is exactly when
+        re.search would have matched it.
+        """
+        keywords: Dict[str, str] = {}
+        # Single-keyword patterns: keyword -> intent credited per pattern
+        self._keyword_credits: Dict[str, List[str]] = {}
+        self._sequence_rules: List[Tuple[str, Tuple[str, ...]]] = []
+        self._regex_rules: List[Tuple[str, re.Pattern]] = []
+
+        for intent, patterns in self.intent_patterns.items():
+            for pattern in patterns:
+                pieces = pattern.split(_GAP)
+                if not all(_LITERAL_PATTERN.fullmatch(piece) for piece in pieces):
+                    self._regex_rules.append((intent, re.compile(pattern)))
+                    continue
+                sequence = tuple(re.sub(r'\\(.)', r'\1', piece) for piece in pieces if piece)
+                for keyword in sequence:
+                    keywords.setdefault(keyword, f"k{len(keywords)}")
+                if len(sequence) == 1:
+                    self._keyword_credits.setdefault(sequence[0], []).append(intent)
+                else:
+                    self._sequence_rules.append((intent, sequence))
+
+        # Every keyword that also starts wherever the named one does
+        self._keyword_prefixes = {
+            group: [other for other in keywords if keyword.startswith(other)]
+            for keyword, group in keywords.items()
         }
+        self._keyword_scanner = re.compile(self._keyword_trie(keywords)) if keywords else None
+
+    @staticmethod
+    def _keyword_trie(keywords: Dict[str, str]) -> str:
+        """Alternation of keywords factored by common prefix.
+
+        Each keyword ends in an empty named group, tried after every longer
+        continuation, so a match's lastgroup names the longest keyword. Only
+        the first character is consumed and the rest is a lookahead, so
+        matches overlap while the regex engine can still skip ahead to
+        possible first characters.
+        """
+        trie: Dict = {}
+        for keyword, group in keywords.items():
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[None] = group
+
+        def children(node: Dict):
+            return sorted((item for item in node.items() if item[0] is not None), key=lambda item: item[0])
+
+        def emit(node: Dict) -> str:
+            branches = [re.escape(char) + emit(child) for char, child in children(node)]
+            if None in node:
+                branches.append(f"(?P<{node[None]}>)")
+            return branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+
+        return '|'.join(f"{re.escape(char)}(?={emit(child)})" for char, child in children(trie))
+
+    def _keyword_positions(self, text: str) -> Dict[str, List[int]]:
+        """Start offsets of every intent keyword in text, in ascending order"""
+        positions: Dict[str, List[int]] = {}
+        if self._keyword_scanner is None:
+            return positions
+        prefixes = self._keyword_prefixes
+        for match in self._keyword_scanner.finditer(text):
+            start = match.start()
+            for keyword in prefixes[match.lastgroup]:
+                positions.setdefault(keyword, []).append(start)
+        return positions
+
+    @staticmethod
+    def _sequence_matches(sequence: Tuple[str, ...], positions: Dict[str, List[int]],
+                          lines: List[Tuple[int, int]]) -> bool:
+        """Whether the keywords occur in order, without overlapping, on one line"""
+        for line_start, line_end in lines:
+            end = line_start
+            for keyword in sequence:
+                starts = positions.get(keyword)
+                if not starts:
+                    return False
+                index = bisect_left(starts, end)
+                if index == len(starts):
+                    break
+                end = starts[index] + len(keyword)
+                if end > line_end:
+                    break
+            else:
+                return True
+        return False
 
     def extract_intent(self, text: str) -> str:
         """Extract intent from user query with confidence scoring"""
         text_lower = text.lower()
-        scores = {}
+        scores = dict.fromkeys(self.intent_patterns, 0)
+        positions = self._keyword_positions(text_lower)
         
-        for intent, patterns in self.intent_patterns.items():
-            score = 0
-            for pattern in patterns:
-                if re.search(pattern, text_lower):
-                    score += 1
-            scores[intent] = score
+        # One point per pattern found anywhere in the text
+        credits = self._keyword_credits
+        for keyword in positions:
+            for intent in credits.get(keyword, ()):
+                scores[intent] += 1
+        
+        if self._sequence_rules:
+            lines = self._line_spans(text_lower)
+            for intent, sequence in self._sequence_rules:
+                if self._sequence_matches(sequence, positions, lines):
+                    scores[intent] += 1
+        
+        for intent, regex in self._regex_rules:
+            if regex.search(text_lower):
+                scores[intent] += 1
         
         # Get intent with highest score
         best_intent = max(scores, key=scores.get)
         return best_intent if scores[best_intent] > 0 else 'general_query'
 
+    @staticmethod
+    def _line_spans(text: str) -> List[Tuple[int, int]]:
+        """(start, end) offsets of each line, since ".*" never crosses a newline"""
+        if '\n' not in text:
+            return [(0, len(text))]
+        spans, start = [], 0
+        for line in text.split('\n'):
+            spans.append((start, start + len(line)))
+            start += len(line) + 1
+        return spans
+
+    def _compile_entity_tables(self):
+        """Index the entity lookup tables by the first word they need"""
+        self._error_phrases_by_word: Dict[str, List[Tuple[str, ...]]] = {}
+        for phrase in self.error_phrases:
+            self._error_phrases_by_word.setdefault(phrase[0], []).append(phrase)
+        # First letter of any server prefix, so most tokens skip the check
+        self._server_initials = frozenset(prefix[0] for prefix in self.server_prefixes)
+        # Words whose position matters: error phrase starts and user name cues
+        self._entity_cues = frozenset(self._error_phrases_by_word) | frozenset(self.username_cues)
+
+    def _software_name(self, token: str, lowered: str) -> Optional[str]:
+        """The software a token names, allowing version and daemon suffixes (python3, sshd)"""
+        if lowered in self.software_names:
+            return token
+        stem = lowered.rstrip('0123456789.')
+        if stem not in self.software_names and stem.endswith('d'):
+            stem = stem[:-1]
+        return token[:len(stem)] if stem in self.software_names else None
+
     def extract_entities(self, text: str) -> Dict[str, List[str]]:
-        """Extract entities from user query"""
-        entities = {}
-        
-        for entity_type, pattern in self.entity_patterns.items():
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                # Remove duplicates and filter empty matches
-                unique_matches = list(set([match for match in matches if match.strip()]))
-                if unique_matches:
-                    entities[entity_type] = unique_matches
-        
-        return entities
+        """Extract entities from user query.
+
+        The text is tokenized once. Each distinct token is classified with
+        set and prefix lookups, and only the positions of cue words are
+        revisited for multi-word error phrases and user names, so the cost
+        stays linear on pasted logs. Each entity type keeps at most
+        MAX_ENTITY_VALUES distinct values: single-token values in the order
+        they first appear, then error phrases and cued user names.
+        """
+        found: Dict[str, Dict[str, None]] = {}
+
+        def add(entity_type: str, value: str):
+            values = found.setdefault(entity_type, {})
+            if len(values) < MAX_ENTITY_VALUES:
+                values[value] = None
+
+        tokens = _ENTITY_TOKEN.findall(text)
+        words = _ENTITY_TOKEN.findall(text.lower())
+        if len(words) != len(tokens):
+            # Case folding changed the text's shape; fall back to per-token folding
+            words = [token.lower() for token in tokens]
+        words = [word.rstrip('.') for word in words]
+
+        for token in dict.fromkeys(tokens):
+            lowered = token.lower()
+            word = lowered.rstrip('.')
+            value = token[:len(word)]
+
+            if token[0] == '/' or lowered.startswith('~/'):
+                if len(word) > 1:
+                    add('file_path', value)
+            elif lowered[0] in self._server_initials and lowered.startswith(self.server_prefixes):
+                name = _SERVER_NAME.match(token)
+                if name:
+                    add('server_name', name.group())
+
+            if word in self.command_names:
+                add('command_name', value)
+
+            software = self._software_name(value, word)
+            if software:
+                add('software_name', software)
+
+            if word.startswith('err'):
+                add('error_code', _ERROR_CODE.match(token).group())
+            elif _NUMBERED_USER.fullmatch(word):
+                add('username', value)
+
+        cues = self._entity_cues
+        for position in [position for position, word in enumerate(words) if word in cues]:
+            word = words[position]
+            for phrase in self._error_phrases_by_word.get(word, ()):
+                end = position + len(phrase)
+                if tuple(words[position:end]) == phrase:
+                    add('error_code', ' '.join(token.rstrip('.') for token in tokens[position:end]))
+            if word in self.username_cues and position + 1 < len(words):
+                candidate = words[position + 1]
+                if candidate not in self.username_stop_words and _USERNAME.fullmatch(candidate):
+                    add('username', tokens[position + 1][:len(candidate)])
+
+        return {entity_type: list(values) for entity_type, values in found.items()}
 
     def process_query(self, text: str) -> Tuple[str, Dict[str, List[str]]]:
         """Process user query and return intent and entities"""
         intent = self.extract_intent(text)
         entities = self.extract_entities(text)
         
-        print(f"🔍 NLP Analysis: '{text}' -> Intent: {intent}, Entities: {entities}")
+        log_query(logger, "NLP analysis", query=text, intent=intent, entities=entities)
         
         return intent, entities
 
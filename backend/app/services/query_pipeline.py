@@ -0,0 +1,191 @@
+import logging
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .kb_snapshot import KnowledgeSnapshot
+from .knowledge_service import DEFAULT_ARTICLE_ENGINE, RESULT_SECTIONS
+from .metrics import stage_metrics
+from .query_cache import normalize_query
+
+# Queries analysed and ranked together; bounds what a batch holds in memory
+BATCH_CHUNK_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+def query_cache_key(user_query: str, engine: str = DEFAULT_ARTICLE_ENGINE) -> str:
+    """Response cache key of a query; non-default engines get their own entries"""
+    key = normalize_query(user_query)
+    return key if engine == DEFAULT_ARTICLE_ENGINE else f"{engine}:{key}"
+
+
+class QueryPipeline:
+    """Turns chat queries into responses: NLP, KB search, automation, formatting.
+
+    answer() handles one query and answer_stream() yields it stage by
+    stage. answer_batch() streams results for many queries against a
+    single KB snapshot, chunk by chunk: duplicates within a chunk are
+    answered once, cached responses are reused, and the TF-IDF engine
+    ranks a whole chunk in one matrix product.
+    """
+
+    def __init__(self, nlp_engine, knowledge_service, automation_service, cache=None,
+                 chunk_size: int = BATCH_CHUNK_SIZE):
+        self.nlp_engine = nlp_engine
+        self.knowledge_service = knowledge_service
+        self.automation_service = automation_service
+        self.cache = cache
+        self.chunk_size = chunk_size
+
+    def answer(self, user_query: str, engine: str = DEFAULT_ARTICLE_ENGINE,
+               snapshot: Optional[KnowledgeSnapshot] = None) -> Dict:
+        """Build the /chat/query response for one query"""
+        intent, entities = self.analyse(user_query)
+        return self._respond(user_query, intent, entities, engine, snapshot)
+
+    def analyse(self, user_query: str) -> Tuple[str, Dict]:
+        """Intent and entities of a query, timed per stage"""
+        started = perf_counter()
+        intent = self.nlp_engine.extract_intent(user_query)
+        extracted = perf_counter()
+        entities = self.nlp_engine.extract_entities(user_query)
+        stage_metrics.observe('intent', extracted - started)
+        stage_metrics.observe('entities', perf_counter() - extracted)
+        return intent, entities
+
+    def _respond(self, user_query: str, intent: str, entities: Dict, engine: str,
+                 snapshot: Optional[KnowledgeSnapshot], article_results: Optional[Dict] = None) -> Dict:
+        snapshot = snapshot or self.knowledge_service.snapshot
+        kb_results = self.knowledge_service.search_knowledge(
+            intent, entities, user_query, engine, snapshot, article_results
+        )
+        started = perf_counter()
+        automation_suggestions = self.automation_service.generate_command_sequence(
+            intent, entities, snapshot.runbook_index
+        )
+        suggested = perf_counter()
+        response_text = self.knowledge_service.format_response(kb_results, automation_suggestions)
+        stage_metrics.observe('automation', suggested - started)
+        stage_metrics.observe('format', perf_counter() - suggested)
+
+        return {
+            "intent": intent,
+            "entities": entities,
+            "response": response_text,
+            "automation_suggestions": automation_suggestions,
+            "kb_matches": list(kb_results.keys()) if kb_results else [],
+            # Echoed back with /feedback/submit for the helpfulness analytics
+            "article_ids": list(kb_results.get('article_matches', ())) if kb_results else []
+        }
+
+    def answer_stream(self, user_query: str, engine: str = DEFAULT_ARTICLE_ENGINE,
+                      snapshot: Optional[KnowledgeSnapshot] = None) -> Iterator[Tuple[str, Dict]]:
+        """Yield (event, data) pairs as each stage of answer() finishes.
+
+        "analysis" carries the intent and entities. Each KB result section
+        found, then "automation", follows with its matches and formatted
+        "text" (None for sections the response does not show). "done"
+        carries the full response answer() would have returned.
+        """
+        snapshot = snapshot or self.knowledge_service.snapshot
+        intent, entities = self.analyse(user_query)
+        yield 'analysis', {"intent": intent, "entities": entities}
+
+        found = {}
+        for section, matches in self.knowledge_service.iter_search_knowledge(
+                intent, entities, user_query, engine, snapshot):
+            found[section] = matches
+            yield section, {"matches": matches, "text": self.knowledge_service.format_section(section, matches)}
+
+        started = perf_counter()
+        automation_suggestions = self.automation_service.generate_command_sequence(
+            intent, entities, snapshot.runbook_index
+        )
+        stage_metrics.observe('automation', perf_counter() - started)
+        if automation_suggestions:
+            yield 'automation', {
+                "steps": automation_suggestions,
+                "text": self.knowledge_service.format_section('automation_suggestions', automation_suggestions)
+            }
+
+        kb_results = {section: found[section] for section in RESULT_SECTIONS if section in found} or None
+        started = perf_counter()
+        response_text = self.knowledge_service.format_response(kb_results, automation_suggestions)
+        stage_metrics.observe('format', perf_counter() - started)
+        yield 'done', {
+            "intent": intent,
+            "entities": entities,
+            "response": response_text,
+            "automation_suggestions": automation_suggestions,
+            "kb_matches": list(kb_results.keys()) if kb_results else [],
+            # Echoed back with /feedback/submit for the helpfulness analytics
+            "article_ids": list(kb_results.get('article_matches', ())) if kb_results else []
+        }
+
+    def answer_batch(self, queries: Sequence, engine: str = DEFAULT_ARTICLE_ENGINE,
+                     snapshot: Optional[KnowledgeSnapshot] = None) -> Iterator[Dict]:
+        """Yield one result per query, in input order.
+
+        Each result is the /chat/query response plus its index, or
+        {"index", "error"} for a query that could not be answered; one bad
+        query never fails the rest of the batch.
+        """
+        snapshot = snapshot or self.knowledge_service.snapshot
+        for chunk_start in range(0, len(queries), self.chunk_size):
+            chunk = queries[chunk_start:chunk_start + self.chunk_size]
+            yield from self._answer_chunk(chunk, chunk_start, engine, snapshot)
+
+    def _answer_chunk(self, chunk: Sequence, chunk_start: int, engine: str,
+                      snapshot: KnowledgeSnapshot) -> Iterator[Dict]:
+        keys: List[Optional[str]] = []
+        unique: Dict[str, str] = {}
+        for user_query in chunk:
+            if not isinstance(user_query, str) or not user_query.strip():
+                keys.append(None)
+                continue
+            key = query_cache_key(user_query, engine)
+            keys.append(key)
+            unique.setdefault(key, user_query)
+
+        responses: Dict[str, object] = {}
+        analysed = []
+        cache_version = self.knowledge_service.cache_version(snapshot)
+        for key, user_query in unique.items():
+            cached = self.cache.get(key, cache_version) if self.cache is not None else None
+            if cached is not None:
+                responses[key] = cached
+                continue
+            try:
+                intent, entities = self.analyse(user_query)
+                analysed.append((key, user_query, intent, entities))
+            except Exception as e:
+                responses[key] = e
+
+        article_results: List[Optional[Dict]] = [None] * len(analysed)
+        if engine == 'tfidf' and analysed:
+            try:
+                article_results = self.knowledge_service.search_articles_batch(
+                    [item[1] for item in analysed], [item[3] for item in analysed], snapshot=snapshot
+                )
+            except Exception as e:
+                # Fails this chunk's queries, not the rest of the batch
+                responses.update((item[0], e) for item in analysed)
+                analysed = []
+
+        for (key, user_query, intent, entities), articles in zip(analysed, article_results):
+            try:
+                responses[key] = self._respond(user_query, intent, entities, engine, snapshot, articles)
+            except Exception as e:
+                responses[key] = e
+
+        for offset, key in enumerate(keys):
+            index = chunk_start + offset
+            if key is None:
+                yield {"index": index, "error": "Query must be a non-empty string"}
+                continue
+            response = responses[key]
+            if isinstance(response, Exception):
+                logger.error(f"Error in batch query {index}: {response}")
+                yield {"index": index, "error": "Failed to process query"}
+            else:
+                yield {"index": index, **response}
@@ -0,0 +1,121 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (intent, entity type, entity value); None matches anything
+RuleKey = Tuple[Optional[str], Optional[str], Optional[str]]
+
+# The command sequences suggested before runbooks moved into the KB; the
+# default KB and AutomationService callers without a KB index use them
+DEFAULT_RUNBOOKS = {
+    "troubleshoot_permission": {
+        "triggers": [{"intent": "troubleshooting", "entity": "error_code", "value": "permission denied"}],
+        "steps": [
+            {"command": "ls -l /path/to/file", "description": "Check current file permissions"},
+            {"command": "chmod 755 /path/to/file", "description": "Set appropriate permissions"},
+            {"command": "chown user:group /path/to/file", "description": "Change ownership if needed"}
+        ]
+    },
+    "restart_apache": {
+        "triggers": [{"entity": "software_name", "value": "apache"}],
+        "steps": [
+            {"command": "sudo systemctl status apache2", "description": "Check current Apache status"},
+            {"command": "sudo systemctl restart apache2", "description": "Restart Apache service"},
+            {"command": "sudo systemctl status apache2", "description": "Verify Apache is running"}
+        ]
+    },
+    "user_creation": {
+        "triggers": [{"intent": "user_management"}],
+        "steps": [
+            {"command": "sudo useradd -m username", "description": "Create new user with home directory"},
+            {"command": "sudo passwd username", "description": "Set password for new user"},
+            {"command": "sudo usermod -aG groupname username", "description": "Add user to group (optional)"}
+        ]
+    },
+    "check_disk_usage": {
+        "triggers": [{"intent": "status_check"}],
+        "steps": [
+            {"command": "df -h", "description": "Check disk space usage"},
+            {"command": "du -sh /var/log/*", "description": "Check log directory sizes"}
+        ]
+    }
+}
+
+
+class RunbookIndex:
+    """Command sequences from the KB's runbooks section, keyed by their triggers.
+
+    Each runbook has steps ({"command", "description"}) and triggers, each
+    naming an intent, an entity type, an entity value (which needs a type),
+    or a combination:
+
+        "restart_apache": {
+            "triggers": [{"entity": "software_name", "value": "apache"}],
+            "steps": [{"command": "sudo systemctl restart apache2", "description": "..."}]
+        }
+
+    Triggers are compiled into one dict keyed on (intent, entity, value),
+    so a lookup costs a few probes per extracted entity however many
+    runbooks there are. When several triggers match, the most specific one
+    (most of intent, entity and value given) wins, then the runbook listed
+    first. Entity values match case-insensitively.
+    """
+
+    def __init__(self, runbooks: Dict[str, Dict]):
+        self.steps: Dict[str, Tuple[Dict, ...]] = {}
+        # rule -> (specificity, -position, runbook id); higher wins
+        self.rules: Dict[RuleKey, Tuple[int, int, str]] = {}
+        self.skipped = 0
+
+        for position, (runbook_id, runbook) in enumerate(runbooks.items()):
+            try:
+                steps = tuple(
+                    {"command": str(step["command"]), "description": str(step.get("description", ""))}
+                    for step in runbook["steps"]
+                )
+                rules = [self._rule_key(trigger) for trigger in runbook["triggers"]]
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning(f"Skipping runbook {runbook_id}: {e!r}")
+                self.skipped += 1
+                continue
+            self.steps[runbook_id] = steps
+            for rule in rules:
+                ranked = (sum(part is not None for part in rule), -position, runbook_id)
+                self.rules[rule] = max(self.rules.get(rule, ranked), ranked)
+
+    @staticmethod
+    def _rule_key(trigger: Dict) -> RuleKey:
+        intent, entity, value = trigger.get("intent"), trigger.get("entity"), trigger.get("value")
+        if value is not None and entity is None:
+            raise ValueError("a trigger value needs an entity type")
+        if intent is None and entity is None:
+            raise ValueError("a trigger needs an intent or an entity type")
+        return intent, entity, str(value).lower() if value is not None else None
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def match(self, intent: str, entities: Dict[str, List[str]]) -> Optional[str]:
+        """Id of the runbook whose best trigger matches the query, or None"""
+        rules = self.rules
+        best = rules.get((intent, None, None))
+        for entity, values in entities.items():
+            for key in ((intent, entity, None), (None, entity, None)):
+                rule = rules.get(key)
+                if rule is not None and (best is None or rule > best):
+                    best = rule
+            for value in values:
+                value = str(value).lower()
+                for key in ((intent, entity, value), (None, entity, value)):
+                    rule = rules.get(key)
+                    if rule is not None and (best is None or rule > best):
+                        best = rule
+        return best[2] if best is not None else None
+
+    def command_sequence(self, intent: str, entities: Dict[str, List[str]]) -> Optional[List[Dict]]:
+        """Steps of the matching runbook, as fresh dicts the caller may change"""
+        runbook_id = self.match(intent, entities)
+        if runbook_id is None:
+            return None
+        return [dict(step) for step in self.steps[runbook_id]]
@@ -0,0 +1,168 @@
+import heapq
+import math
+import re
+from array import array
+from typing import Dict, List, Optional, Set, Tuple
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Words that carry no meaning for KB lookups
+STOP_WORDS = frozenset({
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'does',
+    'for', 'from', 'how', 'i', 'in', 'is', 'it', 'me', 'my', 'of', 'on',
+    'or', 'the', 'to', 'what', 'when', 'where', 'which', 'why', 'with', 'you'
+})
+
+# Field weights mirror the old keyword scorer (title +2, tag +3, content +1)
+TITLE_WEIGHT = 2.0
+TAG_WEIGHT = 3.0
+CONTENT_WEIGHT = 1.0
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split text into index terms, dropping stop words"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def entity_terms(entities: Optional[Dict]) -> Set[str]:
+    """Flatten extracted entity values into index terms"""
+    terms = set()
+    if entities:
+        for entity_list in entities.values():
+            for entity in entity_list:
+                terms.update(tokenize(str(entity)))
+    return terms
+
+
+def field_weights(article_data: Dict) -> Tuple[Dict[str, float], Set[str]]:
+    """Field-weighted term frequencies of an article, plus its title/tag terms"""
+    weights: Dict[str, float] = {}
+    strong: Set[str] = set()
+
+    for token in tokenize(article_data.get('title', '')):
+        weights[token] = weights.get(token, 0.0) + TITLE_WEIGHT
+        strong.add(token)
+    for tag in article_data.get('tags', []):
+        for token in tokenize(tag):
+            weights[token] = weights.get(token, 0.0) + TAG_WEIGHT
+            strong.add(token)
+    for token in tokenize(article_data.get('content', '')):
+        weights[token] = weights.get(token, 0.0) + CONTENT_WEIGHT
+
+    return weights, strong
+
+
+class PreparedArticle:
+    """Normalized fields of one article, computed once when the KB loads"""
+
+    __slots__ = ('article_id', 'title_tokens', 'tags', 'content_tokens')
+
+    def __init__(self, article_id: str, article_data: Dict):
+        self.article_id = article_id
+        self.title_tokens = frozenset(TOKEN_PATTERN.findall(article_data.get('title', '').lower()))
+        self.tags = tuple(tag.lower() for tag in article_data.get('tags', []))
+        self.content_tokens = frozenset(TOKEN_PATTERN.findall(article_data.get('content', '').lower()))
+
+
+def prepare_articles(articles: Dict[str, Dict]) -> Tuple[PreparedArticle, ...]:
+    """Precompute the normalized form of every article"""
+    return tuple(PreparedArticle(article_id, article_data) for article_id, article_data in articles.items())
+
+
+class ArticleIndex:
+    """Inverted index over article titles, tags and content with BM25 ranking.
+
+    Term impacts are query independent, so they are computed once at build
+    time and a query only sums the postings of its terms. Postings live in
+    flat typed columns so a compiled KB snapshot can map them straight from
+    disk instead of rebuilding them.
+    """
+
+    def __init__(self, articles: Dict[str, Dict], k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids: List[str] = []
+        # term -> (offset, count) into the posting columns below
+        self.terms: Dict[str, Tuple[int, int]] = {}
+        # Doc number, BM25 impact and whether the term hit the title or tags
+        self.posting_docs = array('i')
+        self.posting_impacts = array('d')
+        self.posting_strong = array('B')
+        self._build(articles)
+
+    def _build(self, articles: Dict[str, Dict]):
+        doc_terms = []
+        doc_lengths = []
+
+        for article_id, article_data in articles.items():
+            weights, strong = field_weights(article_data)
+            self.doc_ids.append(article_id)
+            doc_terms.append((weights, strong))
+            doc_lengths.append(sum(weights.values()))
+
+        doc_count = len(self.doc_ids)
+        if not doc_count:
+            return
+
+        avg_length = (sum(doc_lengths) / doc_count) or 1.0
+
+        document_frequency: Dict[str, int] = {}
+        for weights, _ in doc_terms:
+            for term in weights:
+                document_frequency[term] = document_frequency.get(term, 0) + 1
+
+        idf = {
+            term: math.log(1.0 + (doc_count - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+
+        postings: Dict[str, List[Tuple[int, float, bool]]] = {}
+        for doc, (weights, strong) in enumerate(doc_terms):
+            norm = self.k1 * (1.0 - self.b + self.b * doc_lengths[doc] / avg_length)
+            for term, tf in weights.items():
+                impact = idf[term] * tf * (self.k1 + 1.0) / (tf + norm)
+                postings.setdefault(term, []).append((doc, impact, term in strong))
+
+        for term, term_postings in postings.items():
+            self.terms[term] = (len(self.posting_docs), len(term_postings))
+            for doc, impact, is_strong in term_postings:
+                self.posting_docs.append(doc)
+                self.posting_impacts.append(impact)
+                self.posting_strong.append(is_strong)
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @property
+    def term_count(self) -> int:
+        return len(self.terms)
+
+    def query_terms(self, user_query: str, entities: Optional[Dict] = None) -> Set[str]:
+        """Collect the distinct terms of a query and its entities"""
+        terms = set(tokenize(user_query))
+        terms.update(entity_terms(entities))
+        return terms
+
+    def search(self, user_query: str, entities: Optional[Dict] = None, top_k: int = 3) -> List[Tuple[str, float]]:
+        """Return up to top_k (article_id, score) pairs, best first.
+
+        Like the old scorer, an article only qualifies when a query term hits
+        its title or tags; content-only hits just add to the score.
+        """
+        scores: Dict[int, float] = {}
+        qualified: Set[int] = set()
+        docs, impacts, strong = self.posting_docs, self.posting_impacts, self.posting_strong
+
+        for term in self.query_terms(user_query, entities):
+            span = self.terms.get(term)
+            if span is None:
+                continue
+            start, end = span[0], span[0] + span[1]
+            for doc, impact, is_strong in zip(docs[start:end], impacts[start:end], strong[start:end]):
+                scores[doc] = scores.get(doc, 0.0) + impact
+                if is_strong:
+                    qualified.add(doc)
+
+        best = heapq.nlargest(top_k, qualified, key=lambda doc: (scores[doc], -doc))
+        return [(self.doc_ids[doc], round(scores[doc], 4)) for doc in best]
+
@@ -0,0 +1,147 @@
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# NumPy is optional; without it the TF-IDF engine is simply unavailable
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .search_index import entity_terms, field_weights, tokenize
+
+# Dense score rows per batch chunk (queries x articles) kept under this size
+BATCH_CELLS = 4_000_000
+
+
+def tfidf_available() -> bool:
+    """Whether NumPy is installed so the TF-IDF engine can be built"""
+    return np is not None
+
+
+class TfidfIndex:
+    """Article corpus as a sparse, L2-normalized TF-IDF matrix.
+
+    The matrix is stored column-major by term (indptr/doc/value arrays), so
+    scoring a query is one sparse matrix-vector product: gather the columns
+    of the query's terms and reduce them with a single bincount. Batches do
+    the same for many queries at once and take each row's top k with
+    argpartition. Scores are cosine similarities in [0, 1].
+    """
+
+    def __init__(self, articles: Dict[str, Dict], min_score: float = 0.1):
+        if np is None:
+            raise RuntimeError("The TF-IDF engine requires numpy (pip install numpy)")
+        self.min_score = min_score
+        self.doc_ids: List[str] = list(articles.keys())
+        self.vocabulary: Dict[str, int] = {}
+        self._build(articles)
+
+    def _build(self, articles: Dict[str, Dict]):
+        rows, cols, counts = [], [], []
+        for doc, article_data in enumerate(articles.values()):
+            weights, _ = field_weights(article_data)
+            for term, weight in weights.items():
+                rows.append(doc)
+                cols.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                counts.append(weight)
+
+        doc_count = len(self.doc_ids)
+        term_count = len(self.vocabulary)
+        rows = np.asarray(rows, dtype=np.int32)
+        cols = np.asarray(cols, dtype=np.int32)
+        counts = np.asarray(counts, dtype=np.float64)
+
+        document_frequency = np.bincount(cols, minlength=term_count)
+        self.idf = np.log((1.0 + doc_count) / (1.0 + document_frequency)) + 1.0
+
+        # Sublinear tf, then normalize every article vector to unit length
+        values = (1.0 + np.log(counts)) * self.idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=doc_count))
+        values /= np.where(norms[rows] > 0, norms[rows], 1.0)
+
+        order = np.argsort(cols, kind='stable')
+        self.indptr = np.zeros(term_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cols, minlength=term_count), out=self.indptr[1:])
+        self.docs = rows[order]
+        self.values = values[order].astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def query_vector(self, user_query: str, entities: Optional[Dict] = None) -> Tuple[List[int], List[float]]:
+        """Sparse, unit-length TF-IDF vector of a query as (term ids, weights)"""
+        counts: Dict[int, int] = {}
+        terms = tokenize(user_query)
+        terms.extend(entity_terms(entities))
+        for term in terms:
+            term_id = self.vocabulary.get(term)
+            if term_id is not None:
+                counts[term_id] = counts.get(term_id, 0) + 1
+
+        term_ids = list(counts)
+        weights = [(1.0 + math.log(counts[t])) * float(self.idf[t]) for t in term_ids]
+        norm = math.sqrt(sum(w * w for w in weights)) or 1.0
+        return term_ids, [w / norm for w in weights]
+
+    def _gather(self, term_ids: Sequence[int], weights: Sequence[float]):
+        """Nonzeros of (matrix columns for term_ids) scaled by the query weights"""
+        if not term_ids:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64)
+        docs, values = [], []
+        for term_id, weight in zip(term_ids, weights):
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            docs.append(self.docs[start:end])
+            values.append(self.values[start:end] * weight)
+        return np.concatenate(docs), np.concatenate(values)
+
+    def _top_k(self, scores, top_k: int) -> List[Tuple[str, float]]:
+        k = min(top_k, len(scores))
+        if k <= 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [
+            (self.doc_ids[doc], round(float(scores[doc]), 4))
+            for doc in best if scores[doc] >= self.min_score
+        ]
+
+    def search(self, user_query: str, entities: Optional[Dict] = None, top_k: int = 3) -> List[Tuple[str, float]]:
+        """Return up to top_k (article_id, cosine score) pairs, best first"""
+        docs, values = self._gather(*self.query_vector(user_query, entities))
+        scores = np.bincount(docs, weights=values, minlength=len(self.doc_ids))
+        return self._top_k(scores, top_k)
+
+    def search_batch(self, queries: Sequence[str], entities_list: Optional[Sequence[Optional[Dict]]] = None,
+                     top_k: int = 3) -> List[List[Tuple[str, float]]]:
+        """Score many queries with one sparse matrix-matrix product per chunk"""
+        doc_count = len(self.doc_ids)
+        if not doc_count:
+            return [[] for _ in queries]
+
+        entities_list = entities_list or [None] * len(queries)
+        chunk_size = max(1, BATCH_CELLS // doc_count)
+        results = []
+
+        for chunk_start in range(0, len(queries), chunk_size):
+            chunk = range(chunk_start, min(chunk_start + chunk_size, len(queries)))
+            cells, values = [], []
+            for row, position in enumerate(chunk):
+                docs, row_values = self._gather(*self.query_vector(queries[position], entities_list[position]))
+                cells.append(docs.astype(np.int64) + row * doc_count)
+                values.append(row_values)
+
+            scores = np.bincount(
+                np.concatenate(cells), weights=np.concatenate(values), minlength=len(chunk) * doc_count
+            ).reshape(len(chunk), doc_count)
+
+            k = min(top_k, doc_count)
+            best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            for row in range(len(chunk)):
+                row_scores = scores[row]
+                ranked = best[row][np.argsort(-row_scores[best[row]], kind='stable')]
+                results.append([
+                    (self.doc_ids[doc], round(float(row_scores[doc]), 4))
+                    for doc in ranked if row_scores[doc] >= self.min_score
+                ])
+
+        return results
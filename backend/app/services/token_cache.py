@@ -0,0 +1,210 @@
+import hashlib
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def token_digest(token: str) -> bytes:
+    """Fixed-size cache key of a raw token, so the cache never holds tokens"""
+    return hashlib.blake2b(token.encode('utf-8'), digest_size=16).digest()
+
+
+class TokenCache:
+    """Bounded cache of verified JWT claims, keyed by token digest.
+
+    A hit skips signature verification and claim decoding for a token that
+    was already verified. Entries never outlive the token's exp claim:
+    expired ones are dropped on lookup, and a heap of expiry times lets
+    put() evict expired entries before falling back to least recently used.
+    """
+
+    def __init__(self, max_entries: int = 10000, clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict = OrderedDict()
+        self._expiries = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, token: str) -> Optional[Tuple[Dict, Dict]]:
+        """Return the (header, claims) cached for a token, or None"""
+        key = token_digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            header, claims, expires_at = entry
+            if expires_at is not None and expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return header, claims
+
+    def put(self, token: str, header: Dict, claims: Dict):
+        """Cache the claims of a token that has just been verified"""
+        if self.max_entries <= 0:
+            return
+        key = token_digest(token)
+        expires_at = claims.get('exp')
+        with self._lock:
+            self._entries[key] = (header, claims, expires_at)
+            self._entries.move_to_end(key)
+            if expires_at is not None:
+                heapq.heappush(self._expiries, (expires_at, key))
+            if len(self._entries) > self.max_entries:
+                self._evict_expired()
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            # Heap items of replaced or evicted entries are skipped lazily
+            if len(self._expiries) > 2 * self.max_entries:
+                self._expiries = [(exp, k) for exp, k in self._expiries
+                                  if k in self._entries and self._entries[k][2] == exp]
+                heapq.heapify(self._expiries)
+
+    def _evict_expired(self):
+        now = self._clock()
+        while self._expiries and self._expiries[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiries)
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] == expires_at:
+                del self._entries[key]
+                self.expirations += 1
+
+    def discard(self, token: str):
+        with self._lock:
+            self._entries.pop(token_digest(token), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._expiries = []
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+
+class RevocationList:
+    """Revoked tokens (by jti) and users (tokens issued before a time).
+
+    Revocations are appended to a JSONL file that every worker reads
+    incrementally at most once per poll_interval, so a logout handled by
+    one gunicorn worker applies to all of them within that interval.
+    Entries are kept in memory until the tokens they cover have expired.
+    """
+
+    def __init__(self, path: Optional[str] = None, poll_interval: float = 1.0,
+                 clock: Callable[[], float] = time.time):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._clock = clock
+        # jti -> exp of the revoked token
+        self.tokens: Dict[str, float] = {}
+        # username -> (revoked before, expiry of the entry)
+        self.users: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        # Held for a whole poll, so concurrent requests never read the same
+        # bytes twice or advance the offset past unparsed entries
+        self._refresh_lock = threading.Lock()
+        self._offset = 0
+        self._partial = b''
+        self._next_poll = 0.0
+
+    def is_revoked(self, claims: Dict) -> bool:
+        self.refresh()
+        if claims.get('jti') in self.tokens:
+            return True
+        user = self.users.get(claims.get('sub'))
+        return user is not None and claims.get('iat', 0) < user[0]
+
+    def revoke_token(self, jti: str, expires_at: float):
+        """Revoke one token until it would have expired anyway"""
+        self._append({"jti": jti, "exp": expires_at})
+
+    def revoke_user(self, username: str, max_token_age: float):
+        """Revoke every token issued to a user up to now"""
+        now = self._clock()
+        # Whole seconds like the iat claim, so tokens issued later in the
+        # same second stay valid
+        self._append({"sub": username, "before": int(now), "exp": now + max_token_age})
+
+    def _append(self, entry: Dict):
+        self._apply(entry)
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # One O_APPEND write per entry, so concurrent workers never interleave
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                os.write(fd, (json.dumps(entry) + '\n').encode('utf-8'))
+            finally:
+                os.close(fd)
+
+    def _apply(self, entry: Dict):
+        if entry.get('exp', 0) <= self._clock():
+            return
+        with self._lock:
+            if 'jti' in entry:
+                self.tokens[entry['jti']] = entry['exp']
+            elif 'sub' in entry:
+                before = max(entry['before'], self.users.get(entry['sub'], (0, 0))[0])
+                self.users[entry['sub']] = (before, max(entry['exp'], self.users.get(entry['sub'], (0, 0))[1]))
+
+    def refresh(self, force: bool = False):
+        """Apply revocations other workers appended since the last poll"""
+        if not self.path or (not force and self._clock() < self._next_poll):
+            return
+        with self._refresh_lock:
+            now = self._clock()
+            # Another thread may have polled while this one waited
+            if not force and now < self._next_poll:
+                return
+            self._next_poll = now + self.poll_interval
+            try:
+                with open(self.path, 'rb') as f:
+                    if os.fstat(f.fileno()).st_size < self._offset:
+                        # Replaced by a shorter file: start over
+                        self._offset, self._partial = 0, b''
+                    f.seek(self._offset)
+                    data = f.read()
+            except FileNotFoundError:
+                return
+            self._offset += len(data)
+            data = self._partial + data
+            end = data.rfind(b'\n') + 1
+            self._partial = data[end:]
+            for line in data[:end].splitlines():
+                try:
+                    self._apply(json.loads(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    logger.warning(f"Skipping bad revocation entry in {self.path}: {e}")
+            self._prune(now)
+
+    def _prune(self, now: float):
+        with self._lock:
+            self.tokens = {jti: exp for jti, exp in self.tokens.items() if exp > now}
+            self.users = {user: entry for user, entry in self.users.items() if entry[1] > now}
@@ -0,0 +1,162 @@
+import logging
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ..logging_setup import configure_logging
+from .automation_service import AutomationService
+from .knowledge_service import DEFAULT_ARTICLE_ENGINE, create_knowledge_service
+from .metrics import stage_metrics
+from .nlp_engine import NlpEngine
+from .query_pipeline import BATCH_CHUNK_SIZE, QueryPipeline
+
+logger = logging.getLogger(__name__)
+
+# Pipeline of the current worker process, built once by _init_worker
+_worker_pipeline: Optional[QueryPipeline] = None
+
+
+def _init_worker(kb_settings: Dict, metrics_dir: Optional[str]):
+    """Build the compiled engines once per worker process"""
+    global _worker_pipeline
+    configure_logging()
+    stage_metrics.configure(metrics_dir)
+    knowledge_service = create_knowledge_service(**kb_settings)
+    _worker_pipeline = QueryPipeline(NlpEngine(), knowledge_service, AutomationService())
+
+
+def _worker_ready() -> int:
+    return os.getpid()
+
+
+def _worker_answer(user_query: str, engine: str) -> Tuple[Dict, str]:
+    snapshot = _worker_pipeline.knowledge_service.snapshot
+    return _worker_pipeline.answer(user_query, engine, snapshot), snapshot.version
+
+
+def _worker_answer_chunk(queries: Sequence, engine: str) -> List[Dict]:
+    return list(_worker_pipeline.answer_batch(queries, engine))
+
+
+def _start_method() -> str:
+    # forkserver children never inherit the web process's threads or sockets
+    return 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+class QueryWorkerPool:
+    """Pre-warmed worker processes that run the NLP and KB search stage.
+
+    The pure-Python regex and scoring work holds the GIL, so threads in one
+    web process cannot use more than a core. Each worker builds its own
+    NlpEngine and KnowledgeService once, watching the KB for reloads like
+    the web process does, and queries travel to it over the executor's
+    pipe. The processes are started lazily in the process that first uses
+    the pool, so creating one before gunicorn forks is safe; a crashed
+    worker makes the next call start a fresh pool.
+    """
+
+    def __init__(self, processes: int, kb_settings: Dict, timeout: float = 30.0,
+                 chunk_size: int = BATCH_CHUNK_SIZE, metrics_dir: Optional[str] = None):
+        self.processes = processes
+        self.kb_settings = kb_settings
+        # Workers write stage histograms here so /metrics includes them
+        self.metrics_dir = metrics_dir
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.restarts = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._owner_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._owner_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context(_start_method()),
+                    initializer=_init_worker,
+                    initargs=(self.kb_settings, self.metrics_dir)
+                )
+                self._owner_pid = os.getpid()
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self.restarts += 1
+        executor.shutdown(wait=False)
+
+    def warm(self) -> List[int]:
+        """Start every worker and wait until each has built its engines"""
+        executor = self._get_executor()
+        futures = [executor.submit(_worker_ready) for _ in range(self.processes)]
+        return [future.result(timeout=self.timeout) for future in futures]
+
+    def answer(self, user_query: str, engine: str = DEFAULT_ARTICLE_ENGINE) -> Tuple[Dict, str]:
+        """Answer one query in a worker, returning the response and its KB version"""
+        executor = self._get_executor()
+        try:
+            return executor.submit(_worker_answer, user_query, engine).result(timeout=self.timeout)
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise
+
+    def answer_batch(self, queries: Sequence, engine: str = DEFAULT_ARTICLE_ENGINE) -> Iterator[Dict]:
+        """Like QueryPipeline.answer_batch, spreading chunks over the workers.
+
+        At most two chunks per worker are in flight, so a slow consumer
+        never makes the pool buffer a whole batch of results.
+        """
+        executor = self._get_executor()
+        pending = deque()
+        chunk_starts = iter(range(0, len(queries), self.chunk_size))
+
+        def submit_next() -> bool:
+            chunk_start = next(chunk_starts, None)
+            if chunk_start is None:
+                return False
+            chunk = queries[chunk_start:chunk_start + self.chunk_size]
+            pending.append((chunk_start, executor.submit(_worker_answer_chunk, chunk, engine)))
+            return True
+
+        try:
+            while len(pending) < 2 * self.processes and submit_next():
+                pass
+            while pending:
+                chunk_start, future = pending.popleft()
+                try:
+                    results = future.result(timeout=self.timeout)
+                except FutureTimeoutError:
+                    # The chunk's queries fail; the worker moves on once it is done
+                    logger.error(f"Batch chunk at {chunk_start} timed out after {self.timeout} s")
+                    chunk_size = len(queries[chunk_start:chunk_start + self.chunk_size])
+                    results = [{"index": offset, "error": "Failed to process query"} for offset in range(chunk_size)]
+                submit_next()
+                for result in results:
+                    result['index'] += chunk_start
+                    yield result
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def status(self) -> Dict:
+        return {
+            "processes": self.processes,
+            "running": self._executor is not None and self._owner_pid == os.getpid(),
+            "start_method": _start_method(),
+            "restarts": self.restarts
+        }
@@ -0,0 +1,200 @@
+"""Latency of /chat/query under overload, with and without admission control.
+
+Runs one gthread gunicorn worker whose queries also wait on a backend
+that serves BACKEND_SLOTS at a time for BACKEND_SECONDS each, standing in
+for a MongoDB KB or a saturated query worker pool (in-process searches
+are too fast to overload with a client on the same machine). Measures
+capacity with a closed loop of clients, then offers twice that rate open
+loop (requests are sent on schedule whether or not earlier ones have
+finished) for a fixed time. Without a concurrency limit requests queue
+for the backend and p99 keeps growing with the backlog; with
+MAX_CONCURRENT_QUERIES at the backend's capacity the excess is refused
+with 503 right away and admitted requests keep their latency. A last run
+shows one user over USER_QUERY_RATE getting 429s while the others are
+served. Latencies count from each request's scheduled send time. Run
+from the backend directory:
+    python -m benchmarks.bench_admission
+"""
+import contextlib
+import io
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('KB_WATCH_INTERVAL', '0')
+# Every query does the full work instead of hitting the query cache
+os.environ.setdefault('QUERY_CACHE_SIZE', '0')
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from benchmarks.synthetic import SAMPLE_QUERIES
+
+PORT = 5058
+THREADS = 32
+BACKEND_SLOTS = 8
+BACKEND_SECONDS = 0.05
+USERS = 20
+CAPACITY_SECONDS = 5
+OVERLOAD_SECONDS = 10
+CLIENT_THREADS = 128
+
+
+def backend_bound_app():
+    """The app, with every uncached query also holding one of BACKEND_SLOTS for BACKEND_SECONDS"""
+    from app.routes import chat
+
+    app = create_app()
+    backend = threading.BoundedSemaphore(BACKEND_SLOTS)
+    answer = chat.query_pipeline.answer
+
+    def answer_via_backend(*args, **kwargs):
+        with backend:
+            time.sleep(BACKEND_SECONDS)
+        return answer(*args, **kwargs)
+
+    chat.query_pipeline.answer = answer_via_backend
+    return app
+
+
+def start_server(**env) -> subprocess.Popen:
+    server = subprocess.Popen(
+        ['gunicorn', '--workers', '1', '--worker-class', 'gthread', '--threads', str(THREADS),
+         '--bind', f"127.0.0.1:{PORT}", 'benchmarks.bench_admission:backend_bound_app()'],
+        env=dict(os.environ, **env), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{PORT}/").read()
+            return server
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    stop_server(server)
+    raise RuntimeError("gunicorn did not start")
+
+
+def stop_server(server: subprocess.Popen):
+    server.send_signal(signal.SIGTERM)
+    server.wait()
+
+
+def send(token: str, i: int) -> int:
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{PORT}/chat/query",
+        data=json.dumps({"query": f"{SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)]} {i}"}).encode(),
+        headers={"Content-Type": "application/json", "Authorization": f"Bearer {token}"}
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code
+
+
+def capacity(tokens) -> float:
+    """Requests per second served by BACKEND_SLOTS clients sending back to back"""
+    deadline = time.perf_counter() + CAPACITY_SECONDS
+    counts = [0] * BACKEND_SLOTS
+
+    def client(n):
+        while time.perf_counter() < deadline:
+            send(tokens[n], counts[n] * BACKEND_SLOTS + n)
+            counts[n] += 1
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(BACKEND_SLOTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / CAPACITY_SECONDS
+
+
+def open_loop(rate: float, pick_token) -> list:
+    """Send rate requests a second for OVERLOAD_SECONDS; returns (user, status, seconds) per request"""
+    results = []
+    total = int(rate * OVERLOAD_SECONDS)
+    started = time.perf_counter()
+
+    def timed(i, scheduled):
+        user, token = pick_token(i)
+        status = send(token, i)
+        results.append((user, status, time.perf_counter() - scheduled))
+
+    with ThreadPoolExecutor(CLIENT_THREADS) as pool:
+        for i in range(total):
+            scheduled = started + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(timed, i, scheduled)
+    return results
+
+
+def percentile(values, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else float('nan')
+
+
+def report(label: str, results: list):
+    served = [seconds for _, status, seconds in results if status == 200]
+    refused = [seconds for _, status, seconds in results if status in (429, 503)]
+    print(f"{label:<26}{len(results):>7}{len(served):>7}{len(refused):>8}"
+          f"{percentile(served, 0.5) * 1000:>9.0f}{percentile(served, 0.99) * 1000:>9.0f}"
+          f"{percentile(refused, 0.99) * 1000:>13.0f}")
+
+
+def main():
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_app()
+    with app.app_context():
+        tokens = [create_access_token(identity=f"user{n}") for n in range(USERS)]
+
+    def any_user(i):
+        return f"user{i % USERS}", tokens[i % USERS]
+
+    server = start_server(USER_QUERY_RATE='0', MAX_CONCURRENT_QUERIES='0')
+    try:
+        served_per_second = capacity(tokens)
+        baseline = open_loop(served_per_second * 0.5, any_user)
+        unlimited = open_loop(served_per_second * 2, any_user)
+    finally:
+        stop_server(server)
+
+    server = start_server(USER_QUERY_RATE='0', MAX_CONCURRENT_QUERIES=str(BACKEND_SLOTS))
+    try:
+        limited = open_loop(served_per_second * 2, any_user)
+    finally:
+        stop_server(server)
+
+    # user0 sends half of all queries at 5x its rate; the others stay within theirs
+    user_rate = served_per_second * 0.5 / (USERS - 1)
+    server = start_server(USER_QUERY_RATE=str(user_rate), USER_QUERY_BURST='5',
+                          MAX_CONCURRENT_QUERIES=str(BACKEND_SLOTS))
+    try:
+        noisy = open_loop(served_per_second * 0.5, lambda i: any_user(0 if i % 2 == 0 else 1 + i // 2 % (USERS - 1)))
+    finally:
+        stop_server(server)
+
+    print(f"capacity: {served_per_second:.1f} queries/s with {BACKEND_SLOTS} clients, "
+          f"{OVERLOAD_SECONDS} s per open-loop run\n")
+    print(f"{'':<26}{'sent':>7}{'200':>7}{'429/503':>8}{'p50 ms':>9}{'p99 ms':>9}{'refused p99':>13}")
+    report("0.5x capacity", baseline)
+    report("2x capacity, no limit", unlimited)
+    report(f"2x capacity, {BACKEND_SLOTS} at a time", limited)
+    report("one user over rate: user0", [r for r in noisy if r[0] == 'user0'])
+    report("  other users", [r for r in noisy if r[0] != 'user0'])
+
+
+if __name__ == '__main__':
+    main()
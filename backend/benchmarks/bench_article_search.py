@@ -0,0 +1,50 @@
+"""Compare the inverted-index BM25 article search with the keyword scan.
+
+Run from the backend directory:
+    python -m benchmarks.bench_article_search
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.knowledge_service import KnowledgeService
+from benchmarks.synthetic import SAMPLE_QUERIES, make_kb
+
+SIZES = [1_000, 10_000, 100_000]
+
+
+def time_queries(search, rounds: int) -> float:
+    """Return the mean latency of one query in milliseconds"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for query in SAMPLE_QUERIES:
+            search(query, {})
+    elapsed = time.perf_counter() - start
+    return elapsed * 1000 / (rounds * len(SAMPLE_QUERIES))
+
+
+def main():
+    print(f"{'articles':>10} {'build ms':>10} {'keyword ms/q':>12} {'bm25 ms/q':>10} {'speedup':>8}")
+    for size in SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            kb_file = os.path.join(tmp, 'kb.json')
+            with open(kb_file, 'w', encoding='utf-8') as f:
+                json.dump(make_kb(size), f)
+
+            service = KnowledgeService(kb_file)
+
+            build_ms = service.snapshot.build_seconds * 1000
+
+            keyword_rounds = max(1, 20_000 // size)
+            keyword_ms = time_queries(service.search_articles_keyword, keyword_rounds)
+            bm25_ms = time_queries(service.search_articles, keyword_rounds * 10)
+
+            print(f"{size:>10} {build_ms:>10.1f} {keyword_ms:>12.3f} {bm25_ms:>10.3f} {keyword_ms / bm25_ms:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Per-request cost of the JWT check, with and without the claims cache.
+
+Times verify_jwt_in_request() (full signature check and decode on every
+call) against the cached verify_token() inside a request context, then
+an admin-only endpoint end to end. Run from the backend directory:
+    python -m benchmarks.bench_auth
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('KB_WATCH_INTERVAL', '0')
+os.environ.setdefault('REVOKED_TOKENS_FILE', os.path.join(tempfile.mkdtemp(), 'revoked.jsonl'))
+
+from flask_jwt_extended import verify_jwt_in_request
+
+from app import create_app
+from app.routes.auth import token_cache, verify_token
+
+ROUNDS = 20_000
+REQUESTS = 3_000
+
+
+def per_call_us(app, headers, check) -> float:
+    with app.test_request_context('/chat/query', headers=headers):
+        check()
+        started = time.perf_counter()
+        for _ in range(ROUNDS):
+            check()
+        return (time.perf_counter() - started) / ROUNDS * 1e6
+
+
+def per_request_us(client, headers) -> float:
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        client.get('/kb-admin/cache-stats', headers=headers)
+    return (time.perf_counter() - started) / REQUESTS * 1e6
+
+
+def main():
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_app()
+    client = app.test_client()
+    token = client.post('/auth/login', json={'username': 'admin', 'password': 'admin123'}).get_json()['access_token']
+    headers = {'Authorization': f"Bearer {token}"}
+
+    print(f"verify_jwt_in_request:  {per_call_us(app, headers, verify_jwt_in_request):6.1f} us per check")
+    print(f"cached verify_token:    {per_call_us(app, headers, verify_token):6.1f} us per check")
+
+    cached = per_request_us(client, headers)
+    token_cache.max_entries = 0
+    token_cache.clear()
+    uncached = per_request_us(client, headers)
+    print(f"admin request, no cache: {uncached:6.1f} us")
+    print(f"admin request, cached:   {cached:6.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Top 10 processes by %MEM from a synthetic 100k-process `ps aux` listing.
+
+Compares reading the whole output as text and turning every line into a
+dict (what a client had to do with the opaque output string) against
+PsParser fed chunk by chunk as run_process reads the pipe. Reports time
+and peak memory for the top 10, and time and memory held when all 100k
+rows are kept, as dicts or as a ProcessTable. A last pair runs the listing through a
+real subprocess (cat) with and without the parser. Run from the backend
+directory:
+    python -m benchmarks.bench_command_parsers
+"""
+import asyncio
+import heapq
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.command_parsers import PsParser
+from app.services.command_runner import CommandRunner, _parse, _read
+from benchmarks.synthetic import make_ps_listing
+
+PROCESSES = 100_000
+TOP = 10
+CHUNK = 64 * 1024
+
+
+class ChunkReader:
+    """The read() side of an asyncio.StreamReader over bytes already in memory"""
+
+    def __init__(self, data: bytes):
+        self.view = memoryview(data)
+        self.offset = 0
+
+    async def read(self, size: int) -> bytes:
+        chunk = bytes(self.view[self.offset:self.offset + size])
+        self.offset += len(chunk)
+        return chunk
+
+
+def text_to_dicts(data: bytes):
+    async def read_all():
+        return await _read(ChunkReader(data), len(data))
+
+    text = asyncio.run(read_all())[0].decode('utf-8')
+    rows = []
+    lines = text.splitlines()
+    keys = lines[0].split()
+    for line in lines[1:]:
+        rows.append(dict(zip(keys, line.split(None, 10))))
+    return rows
+
+
+def text_top(data: bytes):
+    rows = text_to_dicts(data)
+    return heapq.nlargest(TOP, rows, key=lambda row: float(row['%MEM']))
+
+
+def streamed(data: bytes, top=TOP) -> PsParser:
+    parser = PsParser(top=top, sort='mem')
+
+    async def feed():
+        await _parse(ChunkReader(data), parser, CHUNK)
+
+    asyncio.run(feed())
+    return parser
+
+
+def measure(work, data: bytes):
+    """Result, seconds, then memory held afterwards and at peak (traced in a second run)"""
+    started = time.perf_counter()
+    result = work(data)
+    seconds = time.perf_counter() - started
+    del result
+    tracemalloc.start()
+    result = work(data)
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, held, peak
+
+
+def main():
+    data = make_ps_listing(PROCESSES).encode('utf-8')
+    print(f"{PROCESSES} processes, {len(data) / 2 ** 20:.1f} MB of ps aux output\n")
+
+    top_dicts, text_seconds, _, text_peak = measure(text_top, data)
+    parser, parse_seconds, _, parse_peak = measure(streamed, data)
+    expected = [int(row['PID']) for row in top_dicts]
+    assert [row[1] for row in parser.result()['rows']] == expected
+
+    print(f"{'top 10 by %MEM':<34}{'ms':>8}{'peak MB':>9}")
+    print(f"{'text, then one dict per line':<34}{text_seconds * 1000:>8.0f}{text_peak / 2 ** 20:>9.1f}")
+    print(f"{'PsParser, streamed':<34}{parse_seconds * 1000:>8.0f}{parse_peak / 2 ** 20:>9.1f}")
+
+    rows, rows_seconds, rows_held, _ = measure(text_to_dicts, data)
+    table, table_seconds, table_held, _ = measure(lambda d: streamed(d, top=None).table, data)
+    print(f"\n{'all rows kept':<34}{'ms':>8}{'held MB':>9}")
+    print(f"{'dicts':<34}{rows_seconds * 1000:>8.0f}{rows_held / 2 ** 20:>9.1f}")
+    print(f"{'ProcessTable':<34}{table_seconds * 1000:>8.0f}{table_held / 2 ** 20:>9.1f}")
+    del rows, table
+
+    with tempfile.NamedTemporaryFile(suffix='.txt') as listing:
+        listing.write(data)
+        listing.flush()
+        runner = CommandRunner(max_output=len(data) * 2, timeout=60, cache_ttl=0)
+        started = time.perf_counter()
+        plain = runner.execute('plain', ['cat', listing.name])
+        plain_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        parsed = runner.execute('parsed', ['cat', listing.name], PsParser(top=TOP, sort='mem'))
+        parsed_seconds = time.perf_counter() - started
+    print(f"\nsubprocess, output as text:   {plain_seconds * 1000:6.0f} ms, {len(plain['output']) / 2 ** 20:.1f} MB response")
+    print(f"subprocess, parsed top {TOP}:   {parsed_seconds * 1000:6.0f} ms, {parsed['parsed']['total']} rows read")
+
+
+if __name__ == '__main__':
+    main()
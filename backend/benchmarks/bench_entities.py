@@ -0,0 +1,89 @@
+"""Entity extraction on normal queries and adversarial 100 KB inputs.
+
+Run from the backend directory:
+    python -m benchmarks.bench_entities
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.nlp_engine import NlpEngine
+from benchmarks.synthetic import SAMPLE_QUERIES
+
+SIZE = 100_000
+
+# NlpEngine.entity_patterns before the tokenizer-based extractor
+ORIGINAL_PATTERNS = {
+    'server_name': r'server-[a-zA-Z0-9-]+|prod-|staging-|dev-',
+    'username': r'user[a-zA-Z0-9_]*|\b[a-z][a-z0-9_]{2,31}\b',
+    'error_code': r'error[A-Z0-9]*|ERR[A-Z0-9]*|permission denied|command not found|no such file',
+    'software_name': r'(apache|nginx|ssh|mysql|postgresql|docker|kubernetes|k8s|python|java)',
+    'command_name': r'(cd|ls|grep|find|chmod|chown|ps|kill|df|du|top|htop|free|uname|who|w)',
+    'file_path': r'/[/a-zA-Z0-9_.-]+|\~?/[a-zA-Z0-9_/. -]+'
+}
+
+
+def original_extract_entities(text):
+    """NlpEngine.extract_entities before the tokenizer-based extractor, verbatim"""
+    entities = {}
+
+    for entity_type, pattern in ORIGINAL_PATTERNS.items():
+        matches = re.findall(pattern, text, re.IGNORECASE)
+        if matches:
+            unique_matches = list(set([match for match in matches if match.strip()]))
+            if unique_matches:
+                entities[entity_type] = unique_matches
+
+    return entities
+
+
+def fill(unit: str) -> str:
+    return (unit * (SIZE // len(unit) + 1))[:SIZE]
+
+
+def workloads():
+    trace = ''.join(
+        f'  File "/usr/lib/python3.11/site-packages/app/module_{i}.py", line {i}, in handler\n'
+        f'    raise PermissionError("permission denied for user{i} on server-app-{i}")\n'
+        for i in range(2000)
+    )
+    return [
+        ('stack trace', trace[:SIZE]),
+        ('one long word', 'a' * SIZE),
+        ('slash spaces', fill('/ ')),
+        ('home paths', fill('~/a b ')),
+        ('deep path', fill('/aa')),
+        ('short words', fill('ab cd ef gh ')),
+        ('user words', fill('username ')),
+        ('error runs', fill('errorERR')),
+    ]
+
+
+def time_ms(extract, text, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        extract(text)
+    return (time.perf_counter() - started) * 1000 / rounds
+
+
+def main():
+    nlp = NlpEngine()
+
+    before = sum(time_ms(original_extract_entities, query, 2000) for query in SAMPLE_QUERIES) / len(SAMPLE_QUERIES)
+    after = sum(time_ms(nlp.extract_entities, query, 2000) for query in SAMPLE_QUERIES) / len(SAMPLE_QUERIES)
+    print(f"sample queries: {before * 1000:.1f} us -> {after * 1000:.1f} us per query\n")
+
+    print(f"{'100 KB input':>14} {'before ms':>10} {'after ms':>9} {'values before':>14} {'values after':>13}")
+    for label, text in workloads():
+        before = time_ms(original_extract_entities, text, 3)
+        after = time_ms(nlp.extract_entities, text, 3)
+        count_before = sum(len(values) for values in original_extract_entities(text).values())
+        count_after = sum(len(values) for values in nlp.extract_entities(text).values())
+        print(f"{label:>14} {before:>10.1f} {after:>9.1f} {count_before:>14} {count_after:>13}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Running one safe command on 500 hosts through FanOut.
+
+Simulated hosts answer after a random latency (log-normal around 80 ms,
+with 5% slow hosts at 1-3 s), 2% refuse the connection and 1% never
+answer. Reports when the first and the median result arrive, when the
+last one does, and how many hosts failed, for several concurrency
+limits; the sum of all latencies is what running them one by one would
+take. A last run spawns a real uptime process per host through the
+local transport. Run from the backend directory:
+    python -m benchmarks.bench_fanout
+"""
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.fanout import FanOut, LocalTransport
+
+HOSTS = 500
+TIMEOUT = 5.0
+CONCURRENCY = [10, 50, 100, 500]
+
+
+class SimulatedTransport:
+    def __init__(self, hosts, seed: int = 7):
+        rng = random.Random(seed)
+        self.latency = {}
+        self.behaviour = {}
+        for host in hosts:
+            roll = rng.random()
+            self.behaviour[host] = 'refuse' if roll < 0.02 else 'hang' if roll < 0.03 else 'ok'
+            slow = rng.random() < 0.05
+            self.latency[host] = rng.uniform(1, 3) if slow else rng.lognormvariate(-2.5, 0.5)
+
+    async def run(self, host, argv, timeout, max_output):
+        if self.behaviour[host] == 'hang':
+            await asyncio.sleep(3600)
+        await asyncio.sleep(self.latency[host])
+        if self.behaviour[host] == 'refuse':
+            raise ConnectionRefusedError(f"{host}: connection refused")
+        return {"output": f"{host} ok", "exit_code": 0}
+
+
+def fan_out_once(fan_out: FanOut, hosts) -> dict:
+    started = time.perf_counter()
+    arrivals = []
+    failed = 0
+    for result in fan_out.run(hosts, ['uptime']):
+        arrivals.append(time.perf_counter() - started)
+        failed += 'error' in result or bool(result.get('exit_code'))
+    return {
+        "first": arrivals[0],
+        "median": arrivals[len(arrivals) // 2],
+        "last": arrivals[-1],
+        "results": len(arrivals),
+        "failed": failed
+    }
+
+
+def report(label: str, result: dict):
+    print(f"{label:<28}{result['first'] * 1000:>9.0f}{result['median'] * 1000:>10.0f}"
+          f"{result['last'] * 1000:>9.0f}{result['results']:>9}{result['failed']:>8}")
+
+
+def main():
+    # Refused hosts are expected here; do not log each one
+    logging.getLogger('app').setLevel(logging.ERROR)
+    hosts = [f"server-web-{n:03d}" for n in range(HOSTS)]
+    transport = SimulatedTransport(hosts)
+    sequential = sum(latency for host, latency in transport.latency.items()
+                     if transport.behaviour[host] != 'hang') + TIMEOUT * sum(
+        behaviour == 'hang' for behaviour in transport.behaviour.values())
+
+    print(f"{HOSTS} hosts, {TIMEOUT:.0f} s timeout; one at a time would take {sequential:.1f} s\n")
+    print(f"{'':<28}{'first ms':>9}{'median ms':>10}{'last ms':>9}{'results':>9}{'failed':>8}")
+    for limit in CONCURRENCY:
+        report(f"simulated, {limit} at a time", fan_out_once(FanOut(transport, limit, TIMEOUT), hosts))
+    report("local uptime, 50 at a time", fan_out_once(FanOut(LocalTransport(), 50, TIMEOUT), hosts))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Feedback submission throughput under burst load.
+
+Compares writing each entry to disk inside the request (append plus
+fsync) with the batched background FeedbackLog under each fsync policy.
+Threads submit entries as fast as they can; every run checks that the
+file holds every accepted entry after close(). Run from the backend
+directory:
+    python -m benchmarks.bench_feedback
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.feedback_log import FeedbackLog
+
+THREADS = 8
+ENTRIES_PER_THREAD = 5_000
+
+
+def entry(thread: int, i: int):
+    return {"query": f"disk full on server-{thread}", "response": "Run df -h", "was_helpful": i % 3 != 0,
+            "user_feedback": "", "timestamp": time.time()}
+
+
+class SyncWriter:
+    """Baseline: one append and fsync per request"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def append(self, feedback):
+        with self.lock, open(self.path, 'a') as f:
+            f.write(json.dumps(feedback) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def close(self):
+        pass
+
+
+def burst(writer, entries_per_thread: int):
+    latencies = []
+
+    def submit(thread):
+        local = []
+        for i in range(entries_per_thread):
+            started = time.perf_counter()
+            writer.append(entry(thread, i))
+            local.append(time.perf_counter() - started)
+        latencies.extend(local)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=submit, args=(t,)) for t in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    accepted_seconds = time.perf_counter() - started
+    writer.close()
+    latencies.sort()
+    return len(latencies) / accepted_seconds, latencies[int(len(latencies) * 0.99)] * 1e6
+
+
+def main():
+    print(f"{THREADS} threads submitting feedback")
+    print(f"{'writer':<28}{'entries/s':>12}{'p99 us':>10}{'on disk':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        runs = [("fsync per request", lambda path: SyncWriter(path), 200)]
+        for policy in ('always', 'interval', 'never'):
+            runs.append((f"batched, fsync={policy}", lambda path, p=policy: FeedbackLog(path, fsync=p),
+                         ENTRIES_PER_THREAD))
+        for label, make_writer, per_thread in runs:
+            path = os.path.join(directory, f"{label.replace(' ', '_')}.jsonl")
+            rate, p99 = burst(make_writer(path), per_thread)
+            with open(path) as f:
+                lines = sum(1 for _ in f)
+            print(f"{label:<28}{rate:>12,.0f}{p99:>10.1f}{lines:>10,}")
+
+
+if __name__ == '__main__':
+    main()
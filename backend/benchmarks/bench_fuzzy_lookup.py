@@ -0,0 +1,55 @@
+"""Per-lookup cost of the trigram index over thousands of KB keys.
+
+Run from the backend directory:
+    python -m benchmarks.bench_fuzzy_lookup
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.fuzzy_index import TrigramIndex
+from benchmarks.synthetic import WORDS, zipf_vocabulary
+
+SIZES = [100, 1_000, 10_000]
+
+
+def make_keys(count: int, rng: random.Random):
+    """Error-message-like keys: a domain word plus rarer identifiers"""
+    vocab, weights = zipf_vocabulary(rng)
+    keys = {"Permission denied", "Command not found", "Disk full", "Low disk", "Slow disk"}
+    while len(keys) < count:
+        words = [rng.choice(WORDS)] + rng.choices(vocab, weights, k=rng.randint(1, 3))
+        keys.add(' '.join(words).capitalize())
+    return sorted(keys)
+
+
+def add_typo(text: str, rng: random.Random) -> str:
+    position = rng.randrange(len(text))
+    return text[:position] + text[position + 1:]
+
+
+def main():
+    rng = random.Random(1)
+    print(f"{'keys':>8} {'exact us':>9} {'typo us':>9} {'miss us':>9} {'typo hit %':>11}")
+    for size in SIZES:
+        keys = make_keys(size, rng)
+        index = TrigramIndex(keys)
+        samples = rng.sample(keys, min(200, size))
+        typos = [add_typo(key, rng) for key in samples]
+
+        timings = []
+        for queries in (samples, typos, ["xyzzy plugh quux"] * len(samples)):
+            start = time.perf_counter()
+            found = [index.best(query) for query in queries]
+            timings.append((time.perf_counter() - start) * 1e6 / len(queries))
+            if queries is typos:
+                hit_rate = 100 * sum(f == k for f, k in zip(found, samples)) / len(samples)
+
+        print(f"{size:>8} {timings[0]:>9.1f} {timings[1]:>9.1f} {timings[2]:>9.1f} {hit_rate:>10.1f}%")
+
+
+if __name__ == '__main__':
+    main()
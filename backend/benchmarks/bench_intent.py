@@ -0,0 +1,60 @@
+"""Intent classification throughput before and after the combined scanner.
+
+Run from the backend directory:
+    python -m benchmarks.bench_intent
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.nlp_engine import NlpEngine
+from benchmarks.synthetic import SAMPLE_QUERIES
+
+ROUNDS = 5_000
+
+LONG_QUERY = ' '.join(SAMPLE_QUERIES) + ' and the backup job keeps failing after the kernel patch'
+
+
+def original_extract_intent(intent_patterns, text):
+    """NlpEngine.extract_intent before the combined scanner, verbatim"""
+    text_lower = text.lower()
+    scores = {}
+
+    for intent, patterns in intent_patterns.items():
+        score = 0
+        for pattern in patterns:
+            if re.search(pattern, text_lower):
+                score += 1
+        scores[intent] = score
+
+    best_intent = max(scores, key=scores.get)
+    return best_intent if scores[best_intent] > 0 else 'general_query'
+
+
+def queries_per_second(classify, queries):
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        for query in queries:
+            classify(query)
+    return ROUNDS * len(queries) / (time.perf_counter() - started)
+
+
+def main():
+    nlp = NlpEngine()
+    patterns = nlp.intent_patterns
+    workloads = [('sample queries', SAMPLE_QUERIES), ('long query', [LONG_QUERY])]
+
+    print(f"{'workload':>16} {'before qps':>12} {'after qps':>12} {'speedup':>8}")
+    for label, queries in workloads:
+        for query in queries:
+            assert nlp.extract_intent(query) == original_extract_intent(patterns, query)
+        before = queries_per_second(lambda text: original_extract_intent(patterns, text), queries)
+        after = queries_per_second(nlp.extract_intent, queries)
+        print(f"{label:>16} {before:>12,.0f} {after:>12,.0f} {after / before:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
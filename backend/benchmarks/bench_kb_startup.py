@@ -0,0 +1,64 @@
+"""Compare worker KB startup from JSON with mapping a compiled snapshot.
+
+Run from the backend directory:
+    python -m benchmarks.bench_kb_startup
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.kb_snapshot import build_snapshot, file_signature, load_snapshot_file, read_kb_file, write_snapshot_file
+from benchmarks.synthetic import make_kb
+
+SIZES = [1_000, 10_000, 100_000]
+
+
+def measure(load) -> float:
+    """Load in a forked child so each run starts cold; returns milliseconds"""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        start = time.perf_counter()
+        load()
+        elapsed = (time.perf_counter() - start) * 1000
+        os.write(write_fd, f"{elapsed}".encode())
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        elapsed = float(f.read())
+    os.waitpid(pid, 0)
+    return elapsed
+
+
+def main():
+    print(f"{'articles':>10} {'json+build ms':>14} {'mapped ms':>10} {'snapshot MB':>12}")
+    for size in SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            kb_file = os.path.join(tmp, 'kb.json')
+            snapshot_file = os.path.join(tmp, 'kb.kbsnap')
+            with open(kb_file, 'w', encoding='utf-8') as f:
+                json.dump(make_kb(size), f)
+
+            kb_data, version = read_kb_file(kb_file)
+            write_snapshot_file(build_snapshot(kb_data, version, file_signature(kb_file)), snapshot_file, kb_file)
+
+            def from_json():
+                data, data_version = read_kb_file(kb_file)
+                build_snapshot(data, data_version, file_signature(kb_file))
+
+            def from_snapshot():
+                assert load_snapshot_file(snapshot_file, kb_file) is not None
+
+            json_ms = measure(from_json)
+            mapped_ms = measure(from_snapshot)
+            size_mb = os.path.getsize(snapshot_file) / 1e6
+            print(f"{size:>10} {json_ms:>14.1f} {mapped_ms:>10.1f} {size_mb:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
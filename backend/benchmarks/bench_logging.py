@@ -0,0 +1,84 @@
+"""/chat/query latency with synchronous print() versus queued JSON logging.
+
+Log output goes to a sink that takes 200 us per write, standing in for a
+slow container log driver. The print() baseline writes the two lines the
+query route used to print around each request; the queued runs configure
+the app's JSON logging with every query sampled and with the default 1%.
+Run from the backend directory:
+    python -m benchmarks.bench_logging
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QUERY_CACHE_SIZE', '0')
+os.environ.setdefault('KB_WATCH_INTERVAL', '0')
+# Measure the service, not the per-user rate limit
+os.environ.setdefault('USER_QUERY_RATE', '0')
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from app.logging_setup import configure_logging, dropped_records
+from benchmarks.synthetic import SAMPLE_QUERIES
+
+REQUESTS = 2_000
+SINK_DELAY = 0.0002
+
+
+class SlowSink(io.TextIOBase):
+    """Text stream whose writes block like a slow log driver"""
+
+    def __init__(self):
+        self.writes = 0
+
+    def write(self, text):
+        time.sleep(SINK_DELAY)
+        self.writes += 1
+        return len(text)
+
+
+def run(client, headers, print_to=None):
+    latencies = []
+    for i in range(REQUESTS):
+        query = SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)]
+        started = time.perf_counter()
+        if print_to is not None:
+            print(f"Processing query: {query}", file=print_to)
+        response = client.post('/chat/query', json={'query': query}, headers=headers)
+        if print_to is not None:
+            body = response.get_json()
+            print(f"Intent: {body['intent']}, Entities: {body['entities']}, KB matches: {body['kb_matches']}",
+                  file=print_to)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return sum(latencies) / len(latencies) * 1e6, latencies[int(len(latencies) * 0.99)] * 1e6
+
+
+def main():
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_app()
+    client = app.test_client()
+    with app.app_context():
+        headers = {'Authorization': f"Bearer {create_access_token(identity='bench')}"}
+
+    print(f"{REQUESTS} requests, {SINK_DELAY * 1e6:.0f} us per log write")
+    print(f"{'mode':<28}{'mean us':>10}{'p99 us':>10}")
+    scenarios = [
+        ("print() per query", None, SlowSink()),
+        ("queued JSON, all queries", 1.0, None),
+        ("queued JSON, 1% sampled", 0.01, None),
+    ]
+    for label, sample_rate, print_to in scenarios:
+        configure_logging('INFO', sample_rate=sample_rate or 0, stream=SlowSink())
+        dropped = dropped_records()
+        mean, p99 = run(client, headers, print_to)
+        print(f"{label:<28}{mean:>10.0f}{p99:>10.0f}"
+              f"{f'   ({dropped_records() - dropped} records dropped)' if sample_rate else ''}")
+
+
+if __name__ == '__main__':
+    main()
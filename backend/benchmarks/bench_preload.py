@@ -0,0 +1,117 @@
+"""Per-worker memory and boot time of gunicorn with and without preload.
+
+Starts gunicorn with 1, 4 and 16 workers, once with PRELOAD_APP=false
+(every worker imports the app and builds the KB itself) and once with
+the default preload, sends some queries, then reads each worker's
+/proc/<pid>/smaps_rollup. RSS counts shared pages in every worker; USS
+(private pages) is what each extra worker really costs. Linux only.
+Run from the backend directory:
+    python -m benchmarks.bench_preload
+"""
+import contextlib
+import io
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('KB_WATCH_INTERVAL', '0')
+# Measure the service, not the per-user rate limit
+os.environ.setdefault('USER_QUERY_RATE', '0')
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from benchmarks.synthetic import SAMPLE_QUERIES
+
+WORKER_COUNTS = [1, 4, 16]
+QUERIES_PER_WORKER = 50
+PORT = 5057
+_BOOTED = re.compile(r"Worker (\d+) booted in ([0-9.]+) ms")
+
+
+def memory_kb(pid: int) -> dict:
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        "rss": fields['Rss'],
+        "pss": fields['Pss'],
+        "uss": fields['Private_Clean'] + fields['Private_Dirty']
+    }
+
+
+def wait_for_workers(log_path: str, count: int, timeout: float = 120) -> dict:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with open(log_path) as f:
+            booted = {int(pid): float(ms) for pid, ms in _BOOTED.findall(f.read())}
+        if len(booted) >= count:
+            return booted
+        time.sleep(0.1)
+    raise RuntimeError(f"only {len(booted)} of {count} workers booted")
+
+
+def send_queries(count: int, token: str):
+    for i in range(count):
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{PORT}/chat/query",
+            data=json.dumps({"query": SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)]}).encode(),
+            headers={"Content-Type": "application/json", "Authorization": f"Bearer {token}"}
+        )
+        urllib.request.urlopen(request).read()
+
+
+def run(workers: int, preload: bool, token: str) -> dict:
+    env = dict(os.environ, PRELOAD_APP='true' if preload else 'false')
+    with tempfile.NamedTemporaryFile('w+', suffix='.log') as log:
+        started = time.perf_counter()
+        server = subprocess.Popen(
+            ['gunicorn', '--workers', str(workers), '--bind', f"127.0.0.1:{PORT}", 'app:create_app()'],
+            env=env, stdout=subprocess.DEVNULL, stderr=log
+        )
+        try:
+            booted = wait_for_workers(log.name, workers)
+            ready_seconds = time.perf_counter() - started
+            send_queries(QUERIES_PER_WORKER * workers, token)
+            memory = [memory_kb(pid) for pid in booted]
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait()
+    return {
+        "ready_seconds": ready_seconds,
+        "boot_ms": sum(booted.values()) / len(booted),
+        "rss": sum(m["rss"] for m in memory) / len(memory) / 1024,
+        "pss": sum(m["pss"] for m in memory) / len(memory) / 1024,
+        "uss": sum(m["uss"] for m in memory) / len(memory) / 1024,
+        "total_uss": sum(m["uss"] for m in memory) / 1024
+    }
+
+
+def main():
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_app()
+    with app.app_context():
+        token = create_access_token(identity='bench')
+
+    print(f"{'workers':>7} {'mode':<10}{'ready s':>8}{'boot ms':>9}{'RSS MB':>8}{'PSS MB':>8}"
+          f"{'USS MB':>8}{'sum USS':>9}")
+    for workers in WORKER_COUNTS:
+        for preload in (False, True):
+            result = run(workers, preload, token)
+            print(f"{workers:>7} {'preload' if preload else 'per-worker':<10}{result['ready_seconds']:>8.2f}"
+                  f"{result['boot_ms']:>9.1f}{result['rss']:>8.1f}{result['pss']:>8.1f}"
+                  f"{result['uss']:>8.1f}{result['total_uss']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""/chat/query one call at a time versus /chat/query-batch.
+
+Runs the real Flask app in-process against the bundled KB, with the
+response cache and KB watcher disabled so every query does real work.
+Run from the backend directory:
+    python -m benchmarks.bench_query_batch
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QUERY_CACHE_SIZE', '0')
+os.environ.setdefault('KB_WATCH_INTERVAL', '0')
+# Measure the service, not the per-user rate limit
+os.environ.setdefault('USER_QUERY_RATE', '0')
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from benchmarks.synthetic import SAMPLE_QUERIES, WORDS
+
+SINGLE_CALLS = 500
+BATCH_SIZES = [1_000, 10_000, 20_000]
+
+
+def ticket_summaries(count: int, rng: random.Random):
+    """Ticket-like summaries; about half repeat a common phrasing"""
+    summaries = []
+    for _ in range(count):
+        if rng.random() < 0.5:
+            summaries.append(rng.choice(SAMPLE_QUERIES))
+        else:
+            summaries.append(' '.join(rng.choices(WORDS, k=rng.randint(3, 9))))
+    return summaries
+
+
+def main():
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_app()
+    client = app.test_client()
+    with app.app_context():
+        headers = {'Authorization': f"Bearer {create_access_token(identity='admin')}"}
+    rng = random.Random(3)
+
+    queries = ticket_summaries(SINGLE_CALLS, rng)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for query in queries:
+            assert client.post('/chat/query', json={'query': query}, headers=headers).status_code == 200
+    single_qps = SINGLE_CALLS / (time.perf_counter() - started)
+    print(f"/chat/query one call per query: {single_qps:,.0f} queries/s")
+
+    print(f"{'batch':>8} {'queries/s':>10} {'speedup':>8} {'peak MiB':>9}")
+    for size in BATCH_SIZES:
+        queries = ticket_summaries(size, rng)
+        tracemalloc.start()
+        started = time.perf_counter()
+        response = client.post('/chat/query-batch', json={'queries': queries}, headers=headers, buffered=False)
+        # Consume the stream without keeping it, as a client writing
+        # results to disk would
+        received = sum(len(part) for part in response.response)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert response.status_code == 200 and received
+        print(f"{size:>8} {size / elapsed:>10,.0f} {size / elapsed / single_qps:>7.1f}x {peak / 2 ** 20:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Throughput of the query stage on threads versus worker processes.
+
+Threads share one GIL, so they stay at single-core throughput; the worker
+pool should scale with the number of processes up to the core count.
+Run from the backend directory:
+    python -m benchmarks.bench_query_workers
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.automation_service import AutomationService
+from app.services.knowledge_service import KnowledgeService
+from app.services.nlp_engine import NlpEngine
+from app.services.query_pipeline import QueryPipeline
+from app.services.worker_pool import QueryWorkerPool
+from benchmarks.synthetic import SAMPLE_QUERIES, WORDS
+
+KB_FILE = os.path.join(os.path.dirname(__file__), '..', '..', 'knowledge_base', 'ford_kb.json')
+QUERIES_PER_RUN = 4_000
+
+
+def make_queries(rng: random.Random):
+    return [
+        rng.choice(SAMPLE_QUERIES) + ' ' + ' '.join(rng.choices(WORDS, k=rng.randint(2, 6)))
+        for _ in range(QUERIES_PER_RUN)
+    ]
+
+
+def queries_per_second(answer, queries, concurrency: int) -> float:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as clients:
+        list(clients.map(answer, queries))
+    return len(queries) / (time.perf_counter() - started)
+
+
+def main():
+    cores = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, cores} & set(range(1, cores + 1)))
+    queries = make_queries(random.Random(5))
+    print(f"{cores} CPU core(s) available")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        pipeline = QueryPipeline(NlpEngine(), KnowledgeService(KB_FILE), AutomationService())
+    print(f"{'mode':>10} {'parallel':>9} {'queries/s':>10} {'scaling':>8}")
+
+    base = None
+    for count in counts:
+        qps = queries_per_second(pipeline.answer, queries, 2 * count)
+        base = base or qps
+        print(f"{'threads':>10} {count:>9} {qps:>10,.0f} {qps / base:>7.2f}x")
+
+    for count in counts:
+        pool = QueryWorkerPool(count, {"kb_file": KB_FILE})
+        with contextlib.redirect_stdout(io.StringIO()):
+            pool.warm()
+        qps = queries_per_second(pool.answer, queries, 2 * count)
+        pool.shutdown()
+        print(f"{'processes':>10} {count:>9} {qps:>10,.0f} {qps / base:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
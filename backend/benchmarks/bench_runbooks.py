@@ -0,0 +1,100 @@
+"""Automation suggestions: the per-call sequence dict and if-chain vs RunbookIndex.
+
+Analyses the sample queries once, then times suggestion lookup with the
+original generate_command_sequence and with runbook indexes holding the
+KB's runbooks and 1,000 more. Run from the backend directory:
+    python -m benchmarks.bench_runbooks
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.kb_snapshot import read_kb_file
+from app.services.nlp_engine import NlpEngine
+from app.services.runbooks import RunbookIndex
+from benchmarks.synthetic import SAMPLE_QUERIES
+
+ROUNDS = 20_000
+EXTRA_RUNBOOKS = 1_000
+KB_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                       'knowledge_base', 'ford_kb.json')
+
+
+def original_generate_command_sequence(intent, entities):
+    """AutomationService.generate_command_sequence before RunbookIndex, verbatim"""
+    sequences = {
+        'restart_apache': [
+            {"command": "sudo systemctl status apache2", "description": "Check current Apache status"},
+            {"command": "sudo systemctl restart apache2", "description": "Restart Apache service"},
+            {"command": "sudo systemctl status apache2", "description": "Verify Apache is running"}
+        ],
+        'check_disk_usage': [
+            {"command": "df -h", "description": "Check disk space usage"},
+            {"command": "du -sh /var/log/*", "description": "Check log directory sizes"}
+        ],
+        'user_creation': [
+            {"command": "sudo useradd -m username", "description": "Create new user with home directory"},
+            {"command": "sudo passwd username", "description": "Set password for new user"},
+            {"command": "sudo usermod -aG groupname username", "description": "Add user to group (optional)"}
+        ],
+        'troubleshoot_permission': [
+            {"command": "ls -l /path/to/file", "description": "Check current file permissions"},
+            {"command": "chmod 755 /path/to/file", "description": "Set appropriate permissions"},
+            {"command": "chown user:group /path/to/file", "description": "Change ownership if needed"}
+        ]
+    }
+
+    if intent == 'troubleshooting' and 'error_code' in entities:
+        if 'permission' in str(entities.get('error_code', [])).lower():
+            return sequences['troubleshoot_permission']
+
+    if 'software_name' in entities:
+        software = entities['software_name'][0].lower()
+        if software == 'apache':
+            return sequences['restart_apache']
+
+    if intent == 'user_management':
+        return sequences['user_creation']
+
+    if intent == 'status_check':
+        return sequences['check_disk_usage']
+
+    return None
+
+
+def per_call_us(lookup, analysed) -> float:
+    started = time.perf_counter()
+    for _ in range(ROUNDS // len(analysed)):
+        for intent, entities in analysed:
+            lookup(intent, entities)
+    return (time.perf_counter() - started) / (ROUNDS // len(analysed) * len(analysed)) * 1e6
+
+
+def main():
+    nlp = NlpEngine()
+    queries = SAMPLE_QUERIES + ["permission denied on /var/log/app.log", "create user account for bob"]
+    analysed = [(nlp.extract_intent(query), nlp.extract_entities(query)) for query in queries]
+
+    runbooks = read_kb_file(KB_FILE)[0]['runbooks']
+    extra = {
+        f"runbook_{n}": {
+            "triggers": [{"intent": f"intent_{n % 50}", "entity": "software_name", "value": f"app{n}"},
+                         {"entity": "server_name", "value": f"server-app-{n:04d}"}],
+            "steps": [{"command": f"systemctl restart app{n}", "description": "Restart the service"}]
+        }
+        for n in range(EXTRA_RUNBOOKS)
+    }
+    kb_index = RunbookIndex(runbooks)
+    large_index = RunbookIndex({**runbooks, **extra})
+    for intent, entities in analysed:
+        assert kb_index.command_sequence(intent, entities) == large_index.command_sequence(intent, entities)
+
+    print(f"original if-chain:               {per_call_us(original_generate_command_sequence, analysed):6.2f} us")
+    print(f"RunbookIndex, {len(kb_index):>5} runbooks:    {per_call_us(kb_index.command_sequence, analysed):6.2f} us")
+    print(f"RunbookIndex, {len(large_index):>5} runbooks:    {per_call_us(large_index.command_sequence, analysed):6.2f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Time and allocation profile of search_knowledge, before and after the
+KB loader started precomputing normalized article fields.
+
+"before" runs the original keyword scorer, which lowercases every title,
+tag and content string on each query; "after" runs the same scorer over
+the precomputed token sets. Run from the backend directory:
+    python -m benchmarks.bench_search_knowledge
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.knowledge_service import KnowledgeService
+from benchmarks.synthetic import SAMPLE_QUERIES, make_kb
+
+SIZES = [1_000, 10_000]
+ENTITIES = {'software_name': ['apache'], 'error_code': ['permission denied']}
+
+
+def original_keyword_scan(knowledge_base, user_query, entities):
+    """The scorer as it was before normalized fields were precomputed"""
+    query_lower = user_query.lower()
+    matches = {}
+    for article_id, article_data in knowledge_base['articles'].items():
+        score = 0
+        title = article_data.get('title', '').lower()
+        if any(word in title for word in query_lower.split()):
+            score += 2
+        for tag in article_data.get('tags', []):
+            if tag.lower() in query_lower:
+                score += 3
+            if entities and any(tag.lower() in str(entity).lower() for entity_list in entities.values() for entity in entity_list):
+                score += 2
+        content = article_data.get('content', '').lower()
+        if any(keyword in content for keyword in query_lower.split() if len(keyword) > 3):
+            score += 1
+        if score >= 2:
+            matches[article_id] = {'title': article_data.get('title', ''), 'content': article_data.get('content', ''), 'score': score}
+    return dict(sorted(matches.items(), key=lambda x: x[1]['score'], reverse=True)[:3])
+
+
+def profile(service, rounds: int):
+    """Return (ms per call, mean peak KiB allocated per call) for search_knowledge"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for query in SAMPLE_QUERIES:
+            service.search_knowledge('troubleshooting', ENTITIES, query)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / (rounds * len(SAMPLE_QUERIES))
+
+    peaks = []
+    tracemalloc.start()
+    for query in SAMPLE_QUERIES:
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        service.search_knowledge('troubleshooting', ENTITIES, query)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+    return elapsed_ms, sum(peaks) / len(peaks) / 1024
+
+
+def main():
+    print(f"{'articles':>10} {'scorer':>8} {'ms/call':>9} {'peak KiB':>9}")
+    for size in SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            kb_file = os.path.join(tmp, 'kb.json')
+            with open(kb_file, 'w', encoding='utf-8') as f:
+                json.dump(make_kb(size), f)
+            service = KnowledgeService(kb_file)
+            rounds = max(1, 5_000 // size)
+
+            service.search_articles = lambda query, entities, snapshot=None, engine=None: \
+                original_keyword_scan(service.knowledge_base, query, entities)
+            before = profile(service, rounds)
+
+            service.search_articles = lambda query, entities, snapshot=None, engine=None: \
+                service.search_articles_keyword(query, entities, snapshot=snapshot)
+            after = profile(service, rounds)
+
+            del service.search_articles
+            bm25 = profile(service, rounds)
+
+            for label, (ms, kib) in (('before', before), ('after', after), ('bm25', bm25)):
+                print(f"{size:>10} {label:>8} {ms:>9.3f} {kib:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Compare BM25 with the NumPy TF-IDF engine, one query at a time and batched.
+
+Requires numpy. Run from the backend directory:
+    python -m benchmarks.bench_tfidf
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.search_index import ArticleIndex
+from app.services.tfidf_index import TfidfIndex
+from benchmarks.synthetic import SAMPLE_QUERIES, make_articles
+
+SIZES = [1_000, 10_000, 100_000]
+BATCH = SAMPLE_QUERIES * 125
+
+
+def per_query_ms(search, rounds: int = 50) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for query in SAMPLE_QUERIES:
+            search(query)
+    return (time.perf_counter() - start) * 1000 / (rounds * len(SAMPLE_QUERIES))
+
+
+def main():
+    print(f"{'articles':>10} {'tfidf build ms':>15} {'bm25 ms/q':>10} {'tfidf ms/q':>11} {'batch ms/q':>11}")
+    for size in SIZES:
+        articles = make_articles(size)
+        bm25 = ArticleIndex(articles)
+        start = time.perf_counter()
+        tfidf = TfidfIndex(articles)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        bm25_ms = per_query_ms(bm25.search)
+        tfidf_ms = per_query_ms(tfidf.search)
+
+        start = time.perf_counter()
+        tfidf.search_batch(BATCH)
+        batch_ms = (time.perf_counter() - start) * 1000 / len(BATCH)
+
+        print(f"{size:>10} {build_ms:>15.1f} {bm25_ms:>10.3f} {tfidf_ms:>11.3f} {batch_ms:>11.3f}")
+
+
+if __name__ == '__main__':
+    main()
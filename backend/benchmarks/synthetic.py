@@ -0,0 +1,91 @@
+import random
+from typing import Dict
+
+# Vocabulary drawn from the kind of text found in ford_kb.json
+WORDS = [
+    'disk', 'filesystem', 'storage', 'backup', 'tsm', 'incremental', 'ssl',
+    'certificate', 'renewal', 'webserver', 'network', 'utilization', 'host',
+    'monitoring', 'alert', 'process', 'database', 'oracle', 'user', 'account',
+    'creation', 'deletion', 'jenkins', 'job', 'ticket', 'escalation', 'server',
+    'volume', 'slow', 'nas', 'mount', 'memory', 'swap', 'cpu', 'load', 'apache',
+    'nginx', 'restart', 'service', 'permission', 'denied', 'sudo', 'group',
+    'password', 'log', 'rotation', 'cron', 'schedule', 'patch', 'kernel',
+    'reboot', 'firewall', 'port', 'dns', 'latency', 'packet', 'timeout'
+]
+
+# Filler vocabulary; real corpora are Zipf distributed, so domain words are
+# spread across the ranks instead of appearing in every article
+FILLER_SIZE = 20_000
+
+
+def zipf_vocabulary(rng: random.Random):
+    vocab = [f"w{rng.randrange(36 ** 5):x}" for _ in range(FILLER_SIZE)]
+    for position, word in enumerate(WORDS):
+        vocab.insert(50 + position * 300, word)
+    weights = [1.0 / (rank + 1) for rank in range(len(vocab))]
+    return vocab, weights
+
+
+SAMPLE_QUERIES = [
+    'How to check disk space',
+    'backup failed on server',
+    'ssl certificate renewal procedure',
+    'high network utilization on host',
+    'create unix user account',
+    'restart apache service',
+    'permission denied error on log file',
+    'slow disk volume problem'
+]
+
+
+def make_articles(count: int, seed: int = 42) -> Dict[str, Dict]:
+    """Generate count synthetic KB articles shaped like the real ones"""
+    rng = random.Random(seed)
+    vocab, weights = zipf_vocabulary(rng)
+    articles = {}
+    for number in range(count):
+        title = ' '.join(rng.choice(WORDS).title() for _ in range(rng.randint(2, 5)))
+        content = ' '.join(rng.choices(vocab, weights, k=rng.randint(20, 120)))
+        tags = rng.sample(WORDS, rng.randint(2, 5))
+        articles[f"KB{number:06d}"] = {
+            "title": title,
+            "content": f"ITSD - {title} - ITSDUnix: KB{number:07d}\n{content}",
+            "tags": tags
+        }
+    return articles
+
+
+def make_kb(article_count: int, seed: int = 42) -> Dict:
+    """Generate a full KB document with synthetic articles"""
+    return {
+        "intents": {},
+        "commands": {},
+        "troubleshooting": {},
+        "articles": make_articles(article_count, seed),
+        "faq": {}
+    }
+
+
+PS_USERS = ['root', 'oracle', 'www-data', 'postgres', 'jenkins', 'tsm', 'nobody', 'app']
+PS_COMMANDS = [
+    '/usr/sbin/httpd -DFOREGROUND', 'ora_pmon_PROD', 'postgres: writer process',
+    '/usr/bin/java -Xmx4g -jar /opt/jenkins/jenkins.war --httpPort=8080',
+    '/opt/tivoli/tsm/client/ba/bin/dsmc schedule', '[kworker/u16:2-events_unbound]', 'sshd: app@pts/3',
+    '/usr/bin/python3 /opt/app/worker.py --queue default --concurrency 4'
+]
+
+
+def make_ps_listing(count: int, seed: int = 42) -> str:
+    """A `ps aux` listing of count processes on a big host"""
+    rng = random.Random(seed)
+    lines = ["USER         PID %CPU %MEM    VSZ   RSS TTY      STAT START   TIME COMMAND"]
+    for pid in range(1, count + 1):
+        mem = round(rng.paretovariate(3) - 1, 1)
+        lines.append(
+            f"{rng.choice(PS_USERS):<10} {pid:>7} {round(rng.expovariate(2), 1):>4} {mem:>4} "
+            f"{rng.randint(0, 8_000_000):>7} {rng.randint(0, 2_000_000):>6} "
+            f"{rng.choice(['?', 'pts/0', 'pts/3']):<8} {rng.choice(['S', 'Sl', 'R', 'Ss', 'I<']):<4} "
+            f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d} {rng.randint(0, 300):>3}:{rng.randint(0, 59):02d} "
+            f"{rng.choice(PS_COMMANDS)} {rng.randrange(10 ** 6)}"
+        )
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,34 @@
+"""Gunicorn settings, read from the working directory on startup.
+
+With PRELOAD_APP (the default) the master imports the app once, so the KB
+snapshot, search indexes and compiled NLP patterns are built before any
+worker forks. The master's heap is frozen right before each fork: the
+collector then never walks (and writes to) those objects, and workers
+keep sharing their pages copy-on-write instead of each holding a copy.
+Set PRELOAD_APP=false to have every worker import the app itself.
+"""
+import gc
+import os
+import time
+
+preload_app = (os.environ.get('PRELOAD_APP') or 'true').lower() in ('1', 'true', 'yes')
+
+if preload_app:
+    # A collection in the master would only dirty pages the workers share
+    gc.disable()
+
+
+def pre_fork(server, worker):
+    if server.cfg.preload_app:
+        gc.freeze()
+    worker.forked_at = time.perf_counter()
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        gc.enable()
+
+
+def post_worker_init(worker):
+    # Fork to ready to serve; includes importing the app unless preloaded
+    worker.log.info("Worker %s booted in %.1f ms", worker.pid, (time.perf_counter() - worker.forked_at) * 1000)
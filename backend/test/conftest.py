@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def kb_file(tmp_path):
+    kb = {
+        "intents": {"troubleshooting": "Helps troubleshoot issues"},
+        "commands": {"df": "df -h - Check disk space"},
+        "troubleshooting": {"Permission denied": "Check file permissions"},
+        "articles": {
+            "KB001": {
+                "title": "SSL Certificate Renewal",
+                "content": "Renew certificates hosted on IHS webservers",
+                "tags": ["ssl", "certificate", "renewal"]
+            },
+            "KB002": {
+                "title": "Filesystem Disk Usage Check",
+                "content": "Check filesystem usage through the Jenkins job",
+                "tags": ["disk", "storage", "filesystem"]
+            },
+            "KB003": {
+                "title": "Slow Disk Resolution",
+                "content": "Volume problem resolution for slow disks",
+                "tags": ["slow", "disk", "volume"]
+            },
+            "KB004": {
+                "title": "Backup Failure Resolution",
+                "content": "Restart the TSM client, check disk usage in the logs",
+                "tags": ["backup", "tsm"]
+            }
+        },
+        "faq": {
+            "hi": {"question": "Greeting", "answer": "How can I help you?", "variations": ["hi", "hello"]}
+        },
+        "runbooks": {
+            "restart_apache": {
+                "triggers": [{"entity": "software_name", "value": "apache"}],
+                "steps": [{"command": "sudo systemctl restart apache2", "description": "Restart Apache service"}]
+            },
+            "check_disk_usage": {
+                "triggers": [{"intent": "status_check"}],
+                "steps": [{"command": "df -h", "description": "Check disk space usage"}]
+            }
+        }
+    }
+    path = tmp_path / "kb.json"
+    path.write_text(json.dumps(kb), encoding="utf-8")
+    return str(path)
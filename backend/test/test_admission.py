@@ -0,0 +1,55 @@
+from app.services.admission import AdmissionController, TokenBuckets
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_buckets_refill_and_idle_ones_are_dropped():
+    clock = FakeClock()
+    buckets = TokenBuckets(rate=2, burst=3, clock=clock)
+
+    assert [buckets.take("alice") for _ in range(3)] == [0, 0, 0]
+    assert buckets.take("alice") == 0.5
+    clock.now = 0.5
+    assert buckets.take("alice") == 0
+    assert buckets.take("bob") == 0
+    assert len(buckets) == 2
+
+    # Refilled completely after 2 * burst / rate idle seconds, so forgotten
+    clock.now = 3.5
+    assert buckets.take("carol") == 0
+    assert len(buckets) == 1
+
+    # A request larger than the burst needs a full bucket and leaves it in
+    # debt, but never more than one burst deep
+    clock.now = 3.75
+    assert buckets.take("carol", 20) == 0.25
+    clock.now = 4.0
+    assert buckets.take("carol", 20) == 0
+    clock.now = 5.0
+    assert buckets.take("carol") == 1.0
+
+    clock.now = 8.0
+    assert buckets.take("dave") == 0 and len(buckets) == 1
+    assert buckets.take("carol") == 0
+
+
+def test_controller_sheds_and_rate_limits():
+    clock = FakeClock()
+    admission = AdmissionController(user_rate=1, user_burst=2, max_concurrent=2, clock=clock)
+
+    assert admission.try_admit("alice") is None
+    assert admission.try_admit("bob") is None
+    assert admission.try_admit("carol") == (503, 1)
+    admission.release()
+    assert admission.try_admit("alice") is None
+    admission.release()
+    assert admission.try_admit("alice") == (429, 1)
+
+    assert admission.stats() == {"in_flight": 1, "max_concurrent": 2, "active_users": 2,
+                                 "admitted": 3, "rate_limited": 1, "shed": 1}
@@ -0,0 +1,93 @@
+import pytest
+
+from app.services.command_parsers import FreeParser, PsParser, WhoParser, create_parser
+from app.services.command_runner import CommandRunner
+
+PS_HEADER = "USER       PID %CPU %MEM    VSZ   RSS TTY      STAT START   TIME COMMAND"
+
+
+def ps_line(user, pid, cpu, mem, command):
+    return f"{user:<8} {pid:>6} {cpu:>4} {mem:>4} 123456  7890 ?        Ss   10:00   0:01 {command}"
+
+
+def test_ps_filters_and_ranks_by_column():
+    lines = [PS_HEADER,
+             ps_line("root", 1, 0.0, 0.1, "/sbin/init splash"),
+             ps_line("oracle", 200, 35.5, 20.0, "ora_pmon_PROD -x"),
+             ps_line("oracle", 201, 1.0, 40.5, "ora_smon_PROD"),
+             ps_line("www", 300, 80.0, 2.0, "/usr/sbin/apache2 -k start"),
+             "garbage line"]
+
+    top = PsParser(top=2, sort="mem")
+    top.feed(lines)
+    result = top.result()
+    assert [row[1] for row in result["rows"]] == [201, 200]
+    assert result["total"] == 4 and result["matched"] == 4
+    assert result["rows"][1][result["columns"].index("command")] == "ora_pmon_PROD -x"
+
+    busy = PsParser(user="oracle", min_cpu=10)
+    busy.feed(lines[:3])
+    busy.feed(lines[3:])
+    assert [row[1] for row in busy.result()["rows"]] == [200]
+
+
+def test_df_free_and_who_records():
+    df = create_parser("disk_space", {"min_use": 90})
+    df.feed(["Filesystem     1024-blocks      Used Available Capacity Mounted on",
+             "/dev/sda1         20000000  18500000   1500000      93% /",
+             "/dev/sdb1         10000000   1000000   9000000      10% /data",
+             "nas:/export       10000000   9500000    500000      95% /mnt/team share",
+             "proc                     0         0         0       -  /proc"])
+    assert [(fs["mounted_on"], fs["use_percent"]) for fs in df.result()["filesystems"]] == \
+        [("/", 93), ("/mnt/team share", 95)]
+    assert df.result()["filesystems"][0]["size"] == 20000000 * 1024
+
+    free = FreeParser()
+    free.feed(["              total        used        free      shared  buff/cache   available",
+               "Mem:      8000000000  2000000000  3000000000   100000000  3000000000  5500000000",
+               "Swap:     2000000000           0  2000000000"])
+    assert free.result()["mem"]["available"] == 5500000000
+    assert free.result()["swap"] == {"total": 2000000000, "used": 0, "free": 2000000000, "shared": None,
+                                     "buff_cache": None, "available": None}
+
+    who = WhoParser()
+    who.feed(["alice    pts/0        2024-01-31 09:30 (192.168.1.100)", "bob      tty7         Jan 31 08:05"])
+    assert [session["login_time"] for session in who.result()["sessions"]] == ["2024-01-31 09:30", "Jan 31 08:05"]
+    assert [session["host"] for session in who.result()["sessions"]] == ["192.168.1.100", None]
+
+
+def test_output_is_parsed_as_it_streams(tmp_path):
+    listing = tmp_path / "ps.txt"
+    listing.write_text("\n".join([PS_HEADER] + [ps_line("app", pid, 1.0, pid / 1000, f"worker --id {pid}")
+                                                 for pid in range(1, 20001)]) + "\n")
+    # Far more output than the runner keeps as text
+    runner = CommandRunner(max_output=4096)
+
+    result = runner.execute("ps-listing", ["cat", str(listing)], PsParser(top=3, sort="mem"))
+
+    assert result["truncated"] is False
+    assert result["output_bytes"] == listing.stat().st_size
+    assert result["parsed"]["total"] == 20000
+    assert [row[1] for row in result["parsed"]["rows"]] == [20000, 19999, 19998]
+
+
+def test_options_of_the_wrong_type_are_refused():
+    for options in ({"user": ["root"]}, {"command": 5}, {"top": True}, {"top": "3"}, {"min_cpu": "high"}):
+        with pytest.raises(ValueError):
+            create_parser("process_list", options)
+    with pytest.raises(ValueError):
+        create_parser("logged_in_users", {"user": {"name": "alice"}})
+    with pytest.raises(ValueError):
+        create_parser("disk_space", {"min_use": False})
+
+
+def test_an_overlong_line_is_dropped_whole(tmp_path):
+    listing = tmp_path / "ps.txt"
+    listing.write_text("\n".join([PS_HEADER, ps_line("app", 1, 1.0, 1.0, "x" * 200000),
+                                  ps_line("app", 2, 1.0, 2.0, "short")]) + "\n")
+    runner = CommandRunner(max_output=4096)
+
+    result = runner.execute("ps-long-line", ["cat", str(listing)], PsParser())
+
+    assert result["truncated"] is True
+    assert [(row[1], row[-1]) for row in result["parsed"]["rows"]] == [(2, "short")]
@@ -0,0 +1,82 @@
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.automation_service import AutomationService
+from app.services.command_runner import CommandRunner
+
+
+def test_safe_commands_really_run():
+    service = AutomationService(CommandRunner())
+
+    result = service.execute_safe_command('system_uptime')
+    assert result['exit_code'] == 0
+    assert 'load average' in result['output']
+    assert result['command'] == 'uptime'
+
+    disk = service.execute_safe_command('disk_space')
+    assert disk['output'].startswith('Filesystem')
+    assert 'error' in service.execute_safe_command('rm_everything')
+
+
+
+def test_every_safe_command_is_installed(monkeypatch):
+    service = AutomationService(CommandRunner())
+    for command in service.safe_commands.values():
+        if shutil.which(command.split()[0]) is None:
+            pytest.skip(f"{command} is not installed here")
+    assert service.missing_commands() == []
+
+    monkeypatch.setenv("PATH", "")
+    assert service.missing_commands() == sorted(service.safe_commands)
+
+def test_concurrent_callers_share_one_run(tmp_path):
+    runner = CommandRunner(cache_ttl=0.5)
+    counter = tmp_path / 'runs'
+    argv = ['sh', '-c', f'echo run >> {counter}; sleep 0.2; echo done']
+
+    with ThreadPoolExecutor(50) as pool:
+        results = list(pool.map(lambda _: runner.execute('count', argv), range(50)))
+
+    assert all(result['output'] == 'done\n' for result in results)
+    assert counter.read_text() == 'run\n'
+    assert runner.execute('count', argv)['cached'] is True
+
+    time.sleep(0.6)
+    runner.execute('count', argv)
+    assert counter.read_text() == 'run\nrun\n'
+    assert runner.stats()['runs'] == 2
+
+
+def test_timeouts_output_limit_and_concurrency_cap():
+    runner = CommandRunner(max_concurrent=2, timeout=1.0, max_output=1000)
+
+    started = time.monotonic()
+    result = runner.execute('sleep', ['sleep', '5'])
+    assert result['timed_out'] is True
+    assert time.monotonic() - started < 2
+
+    chatty = runner.execute('chatty', [sys.executable, '-c', 'print("x" * 100000)'])
+    assert chatty['truncated'] is True
+    assert len(chatty['output']) == 1000
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(lambda n: runner.execute(f'nap{n}', ['sleep', '0.2']), range(4)))
+    assert time.monotonic() - started >= 0.4
+
+
+def test_execute_gives_up_when_the_loop_is_stuck():
+    runner = CommandRunner(timeout=0.1)
+
+    async def block():
+        time.sleep(1.5)
+    runner.background.submit(block())
+
+    started = time.monotonic()
+    result = runner.execute('uptime', ['uptime'])
+    assert result['timed_out'] is True
+    assert time.monotonic() - started < 1.5
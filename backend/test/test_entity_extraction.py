@@ -0,0 +1,46 @@
+import time
+
+from app.services.nlp_engine import MAX_ENTITY_VALUES, NlpEngine
+
+
+def test_entities_from_typical_queries():
+    nlp = NlpEngine()
+
+    assert nlp.extract_entities("Fix permission denied error on server-web-01") == {
+        'error_code': ['error', 'permission denied'],
+        'server_name': ['server-web-01']
+    }
+    assert nlp.extract_entities("How to restart Apache service on prod-web-02.") == {
+        'software_name': ['Apache'],
+        'server_name': ['prod-web-02']
+    }
+    assert nlp.extract_entities("Create a new user named john with sudo permissions") == {'username': ['john']}
+    assert nlp.extract_entities("df shows /var/log and ~/backups full") == {
+        'command_name': ['df'],
+        'file_path': ['/var/log', '~/backups']
+    }
+
+
+def test_entities_are_whole_tokens():
+    nlp = NlpEngine()
+
+    # "w" in "How", "ps" in "perhaps" and "java" in "javascript" are not entities
+    assert nlp.extract_entities("How would perhaps javascript help") == {}
+    assert nlp.extract_entities("python3 and sshd crash with ERR42")['software_name'] == ['python', 'ssh']
+    assert nlp.extract_entities("command not found: ERR42")['error_code'] == ['ERR42', 'command not found']
+
+
+def test_pasted_logs_stay_bounded():
+    nlp = NlpEngine()
+    trace = '\n'.join(
+        f'  File "/srv/app/module_{i}.py", line {i}, in handler_{i}\nerror{i}: user{i} on server-{i}'
+        for i in range(2000)
+    )
+
+    started = time.perf_counter()
+    entities = nlp.extract_entities(trace)
+    elapsed = time.perf_counter() - started
+
+    assert all(len(values) <= MAX_ENTITY_VALUES for values in entities.values())
+    assert entities['file_path'][0] == '/srv/app/module_0.py'
+    assert elapsed < 1.0
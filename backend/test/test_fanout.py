@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services import fanout
+from app.services.automation_service import AutomationService
+from app.services.fanout import FanOut, LocalTransport, SshTransport, read_inventory, resolve_hosts
+from app.services.nlp_engine import NlpEngine
+
+
+class FakeTransport:
+    """Answers after a per-host delay; 'bad' hosts raise"""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.running = 0
+        self.most_running = 0
+        self.cancelled = 0
+
+    async def run(self, host, argv, timeout, max_output):
+        self.running += 1
+        self.most_running = max(self.most_running, self.running)
+        try:
+            await asyncio.sleep(self.delays[host])
+            if host.startswith('bad'):
+                raise ConnectionError(f"{host} refused")
+            return {"output": host, "exit_code": 0}
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.running -= 1
+
+
+def test_resolve_hosts_expands_prefixes_and_patterns():
+    inventory = ['prod-db-01', 'prod-web-01', 'server-web-01', 'server-web-02', 'server-db-01']
+
+    assert resolve_hosts(['prod-'], inventory) == ['prod-db-01', 'prod-web-01']
+    assert resolve_hosts(['server-web-*', 'server-web-01', 'server-db-01'], inventory) == \
+        ['server-web-01', 'server-web-02', 'server-db-01']
+
+    # Only inventory hosts, so nothing reaches ssh's command line unchecked
+    with pytest.raises(ValueError, match='other-host'):
+        resolve_hosts(['server-web-*', 'other-host'], inventory)
+    with pytest.raises(ValueError):
+        resolve_hosts(['-oProxyCommand=touch /tmp/pwned'], inventory)
+
+
+def test_ssh_never_reads_a_host_as_an_option(tmp_path, monkeypatch):
+    inventory = tmp_path / "hosts"
+    inventory.write_text("web-01\n-oProxyCommand=touch\nweb 02  # two words\n")
+    assert read_inventory(str(inventory)) == ['web-01']
+
+    with pytest.raises(ValueError, match='Invalid host name'):
+        asyncio.run(SshTransport().run('-oProxyCommand=touch', ['uptime'], 1, 1000))
+
+    commands = []
+
+    async def run_process(argv, timeout, max_output):
+        commands.append(argv)
+        return {"output": "", "exit_code": 0}
+
+    monkeypatch.setattr(fanout, "run_process", run_process)
+    asyncio.run(SshTransport().run('web-01', ['uptime'], 1, 1000))
+    assert commands[0][-3:] == ['--', 'web-01', 'uptime']
+
+
+def test_results_stream_in_completion_order_with_partial_failures():
+    transport = FakeTransport({'slow': 0.7, 'fast': 0.05, 'bad': 0.1, 'hung': 5.0,
+                               **{f'h{n}': 0.1 for n in range(8)}})
+    fan_out = FanOut(transport, max_concurrent=4, timeout=1.0)
+
+    started = time.monotonic()
+    results = list(fan_out.run(['slow', 'hung', 'fast', 'bad'] + [f'h{n}' for n in range(8)], ['true']))
+
+    assert [result['host'] for result in results][0] == 'fast'
+    assert [result['host'] for result in results][-2:] == ['slow', 'hung']
+    by_host = {result['host']: result for result in results}
+    assert by_host['bad']['error'] == 'bad refused'
+    assert by_host['hung']['timed_out'] is True
+    assert sum('error' not in result for result in results) == 10
+    assert transport.most_running == 4
+    assert time.monotonic() - started < 2
+
+    # Stopping early cancels the hosts still running
+    transport = FakeTransport({'fast': 0.01, 'slow': 5.0, 'slower': 5.0})
+    fan_out = FanOut(transport, timeout=10.0)
+    results = fan_out.run(['fast', 'slow', 'slower'], ['true'])
+    assert next(results)['host'] == 'fast'
+    results.close()
+    time.sleep(0.1)
+    assert transport.cancelled == 2
+
+
+def test_server_name_entities_select_hosts():
+    service = AutomationService(fan_out=FanOut(LocalTransport()),
+                                inventory=['prod-web-01', 'prod-web-02', 'dev-web-01'])
+    entities = NlpEngine().extract_entities("check uptime on prod- servers")
+
+    hosts = service.target_hosts(entities['server_name'])
+    results = list(service.execute_on_hosts('system_uptime', hosts))
+
+    assert sorted(result['host'] for result in results) == ['prod-web-01', 'prod-web-02']
+    assert all(result['exit_code'] == 0 and 'load average' in result['output'] for result in results)
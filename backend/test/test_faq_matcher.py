@@ -0,0 +1,60 @@
+import random
+
+from app.services.faq_matcher import FaqMatcher
+
+FAQ = {
+    "hi": {"question": "Greeting", "answer": "How can I help you?", "variations": ["hi", "hello", "hey"]},
+    "disk_space": {
+        "question": "How to check disk space",
+        "answer": "Use command: df -h",
+        "variations": ["check disk usage", "disk"]
+    },
+    "memory_usage": {"question": "How to check memory usage", "answer": "Use command: free -m", "variations": ["memory", "ram"]},
+    "processes": {"question": "", "answer": "Use command: ps aux", "variations": ["process", "processes", "running processes"]}
+}
+
+
+def substring_scan(faq, query):
+    """The original nested-loop FAQ search"""
+    query_lower = query.lower()
+    matches = []
+    for faq_id, faq_data in faq.items():
+        patterns = [faq_data.get('question', '')] + faq_data.get('variations', [])
+        if any(p and p.lower() in query_lower for p in patterns):
+            matches.append(faq_id)
+    return matches
+
+
+def test_substring_mode_matches_original_scan():
+    matcher = FaqMatcher(FAQ, word_boundary=False)
+    rng = random.Random(7)
+    words = ["hi", "this", "disk", "diskspace", "check", "usage", "memory", "ram", "program",
+             "running", "processes", "hey", "thelloo", "HOW", "to", "space"]
+
+    for _ in range(500):
+        query = " ".join(rng.choice(words) for _ in range(rng.randint(1, 8)))
+        assert matcher.match(query) == substring_scan(FAQ, query), query
+
+
+def test_word_boundary_skips_embedded_matches():
+    matcher = FaqMatcher(FAQ, word_boundary=True)
+
+    assert matcher.match("this program") == []
+    assert matcher.match("Hi, check disk usage!") == ["hi", "disk_space"]
+    assert matcher.match("list running processes") == ["processes"]
+
+
+def test_overlapping_patterns_found_in_one_pass():
+    faq = {
+        "a": {"question": "she", "variations": []},
+        "b": {"question": "he", "variations": ["hers"]},
+        "c": {"question": "his", "variations": []}
+    }
+    matcher = FaqMatcher(faq, word_boundary=False)
+
+    assert matcher.match("ushers") == ["a", "b"]
+    assert matcher.match("this") == ["c"]
+
+
+def test_empty_faq():
+    assert FaqMatcher({}).match("anything") == []
@@ -0,0 +1,114 @@
+import json
+import os
+
+import pytest
+
+from app.services import feedback_analytics
+from app.services.feedback_analytics import FeedbackAnalytics
+from app.services.feedback_log import FeedbackLog
+from app.services.knowledge_service import KnowledgeService
+
+
+def vote(analytics, helpful, article_ids=("KB001",), intent="troubleshooting", query="Disk full?"):
+    analytics.record({"query": query, "intent": intent, "article_ids": list(article_ids), "was_helpful": helpful})
+
+
+def test_aggregates_and_prior_weights():
+    analytics = FeedbackAnalytics(prior_weight=0.2, prior_votes=5, max_queries=2)
+    for helpful in (True, True, True, False):
+        vote(analytics, helpful)
+    vote(analytics, False, article_ids=["KB002"], intent="disk_space", query="disk  FULL")
+    vote(analytics, True, article_ids=[], intent=None, query="vpn down")
+    vote(analytics, True, article_ids=[], intent=None, query="printer jam")
+
+    summary = analytics.summary()
+    assert (summary["total"], summary["helpful"]) == (7, 5)
+    assert summary["articles"][0] == {"article_id": "KB001", "helpful": 3, "total": 4, "helpful_rate": 0.75}
+    assert [row["intent"] for row in summary["intents"]] == ["troubleshooting", "disk_space"]
+    # Only the two most recent queries are tracked; "disk full" was evicted
+    assert sorted(row["query"] for row in summary["queries"]) == ["printer jam", "vpn down"]
+
+    # (2 * helpful + prior_votes) / (total + prior_votes) - 1, scaled by the weight
+    assert analytics.article_weights["KB001"] == 1 + 0.2 * (11 / 9 - 1)
+    assert analytics.article_weights["KB002"] == 1 + 0.2 * (5 / 6 - 1)
+
+
+def test_follows_log_across_rotation_and_settings(tmp_path):
+    path = str(tmp_path / "feedback.jsonl")
+    log = FeedbackLog(path, batch_size=1, flush_interval=60, max_bytes=300, backups=3)
+    analytics = FeedbackAnalytics(path)
+    for i in range(4):
+        log.append({"query": f"q{i}", "article_ids": ["KB001"], "was_helpful": True})
+    assert log.flush()
+    assert analytics.poll() == 4
+
+    for i in range(4, 10):
+        log.append({"query": f"q{i}", "article_ids": ["KB001"], "was_helpful": i % 2 == 0})
+    log.close()
+    assert log.status()["rotations"] > 0
+    assert analytics.poll() == 6
+    assert analytics.articles["KB001"] == [7, 10]
+
+    # A fresh reader catches up from the rotated backups too
+    assert FeedbackAnalytics(path).poll() == 10
+
+    FeedbackAnalytics(path).set_ranking_prior(False)
+    analytics.poll()
+    assert analytics.ranking_prior is False
+
+
+
+def test_rotation_keeps_late_lines_and_failed_applies_retry(tmp_path, monkeypatch):
+    path = str(tmp_path / "feedback.jsonl")
+    line = (json.dumps({"query": "q", "article_ids": ["KB001"], "was_helpful": True}) + "\n").encode()
+    with open(path, 'wb') as f:
+        f.write(line)
+    analytics = FeedbackAnalytics(path)
+    assert analytics.poll() == 1
+
+    # The writer appends to the old file, then rotates it, between the
+    # reader's last read and its rotation check
+    stat = os.stat
+
+    def late_write_then_rotate(target, *args, **kwargs):
+        if target == path and not os.path.exists(path + ".1"):
+            with open(path, 'ab') as f:
+                f.write(line)
+            os.rename(path, path + ".1")
+            with open(path, 'wb') as f:
+                f.write(line)
+        return stat(target, *args, **kwargs)
+
+    monkeypatch.setattr(feedback_analytics.os, "stat", late_write_then_rotate)
+    assert analytics.poll() == 2
+    monkeypatch.undo()
+
+    with open(path, 'ab') as f:
+        f.write(line)
+    record = analytics.record
+    monkeypatch.setattr(analytics, "record", lambda entry: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        analytics.poll()
+    monkeypatch.setattr(analytics, "record", record)
+    assert analytics.poll() == 1
+    assert analytics.total == 4
+
+def test_prior_reorders_article_results(kb_file):
+    service = KnowledgeService(kb_file)
+    assert list(service.search_articles("slow disk volume", {}))[:2] == ["KB003", "KB002"]
+
+    service.feedback_analytics = FeedbackAnalytics(prior_weight=0.9, prior_votes=1)
+    for _ in range(20):
+        vote(service.feedback_analytics, False, article_ids=["KB003"])
+        vote(service.feedback_analytics, True, article_ids=["KB002"])
+
+    for engine in ("bm25", "keyword"):
+        assert list(service.search_articles("slow disk volume", {}, engine=engine))[0] == "KB002"
+
+    prior_version = service.cache_version()
+    assert prior_version != service.version
+
+    service.feedback_analytics.set_ranking_prior(False)
+    assert list(service.search_articles("slow disk volume", {}))[:2] == ["KB003", "KB002"]
+    # Cached responses ranked with the prior are not served once it is off
+    assert service.cache_version() == service.version
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from app.services.feedback_log import FeedbackBacklogFull, FeedbackLog
+
+
+def read_entries(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_close_writes_every_accepted_entry(tmp_path):
+    path = str(tmp_path / "feedback.jsonl")
+    log = FeedbackLog(path, batch_size=100, flush_interval=60, fsync='always')
+
+    for i in range(250):
+        log.append({"query": f"q{i}", "was_helpful": i % 2 == 0})
+    log.close()
+
+    assert [entry["query"] for entry in read_entries(path)] == [f"q{i}" for i in range(250)]
+    assert log.status()["written"] == 250
+    with pytest.raises(FeedbackBacklogFull):
+        log.append({"query": "late"})
+
+
+def test_rotates_past_max_bytes(tmp_path):
+    path = str(tmp_path / "feedback.jsonl")
+    log = FeedbackLog(path, batch_size=1, flush_interval=60, max_bytes=200, backups=2)
+
+    for i in range(12):
+        log.append({"query": "x" * 40, "index": i})
+        assert log.flush()
+    log.close()
+
+    files = [path, f"{path}.1", f"{path}.2"]
+    assert not (tmp_path / "feedback.jsonl.3").exists()
+    kept = [entry["index"] for name in reversed(files) for entry in read_entries(name)]
+    assert kept == list(range(12 - len(kept), 12))
+    assert all((tmp_path / name).stat().st_size <= 200 for name in files)
+
+
+def test_rejects_entries_past_max_pending(tmp_path):
+    log = FeedbackLog(str(tmp_path / "feedback.jsonl"), batch_size=10, flush_interval=60, max_pending=3)
+    with log._condition:
+        # Hold the writer off so the backlog cannot drain
+        for i in range(3):
+            log.append({"index": i})
+        with pytest.raises(FeedbackBacklogFull):
+            log.append({"index": 3})
+    log.close()
+
+    assert len(read_entries(log.path)) == 3
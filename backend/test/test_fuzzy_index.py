@@ -0,0 +1,36 @@
+from app.services.fuzzy_index import TrigramIndex, trigrams
+
+KEYS = ["Permission denied", "Command not found", "Disk full", "Low disk", "Slow disk"]
+
+
+def test_trigrams_are_padded_and_lowercased():
+    assert trigrams("Df") == {"  d", " df", "df "}
+
+
+def test_exact_match_ignores_case_and_spacing():
+    index = TrigramIndex(KEYS)
+
+    assert index.lookup("permission   DENIED") == [("Permission denied", 1.0)]
+
+
+def test_typos_are_tolerated():
+    index = TrigramIndex(KEYS)
+
+    assert index.best("permision denied") == "Permission denied"
+    assert index.best("comand not found") == "Command not found"
+    assert index.best("disk ful") == "Disk full"
+
+
+def test_cutoff_rejects_unrelated_text():
+    index = TrigramIndex(KEYS)
+
+    assert index.best("ssl certificate") is None
+    assert index.best("") is None
+
+
+def test_lookup_ranks_candidates():
+    index = TrigramIndex(KEYS, cutoff=0.2)
+    ranked = [key for key, _ in index.lookup("slow disks", limit=3)]
+
+    assert ranked[0] == "Slow disk"
+    assert "Low disk" in ranked
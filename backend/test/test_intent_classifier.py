@@ -0,0 +1,68 @@
+import json
+import os
+import random
+import re
+
+from app.services.nlp_engine import NlpEngine
+
+KB_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'knowledge_base')
+
+
+def reference_intent(nlp, text):
+    """The original one-re.search-per-pattern classifier"""
+    text_lower = text.lower()
+    scores = {}
+    for intent, patterns in nlp.intent_patterns.items():
+        scores[intent] = sum(1 for pattern in patterns if re.search(pattern, text_lower))
+    best_intent = max(scores, key=scores.get)
+    return best_intent if scores[best_intent] > 0 else 'general_query'
+
+
+def regression_corpus():
+    queries = [
+        "How do I check disk space using df command?",
+        "Permission denied error when accessing /var/log",
+        "How to restart apache service on server-web-01",
+        "Create a new user named john with sudo permissions",
+        "What does the chmod command do",
+        "nginx won't start and I can't see why",
+        "is the database up\nor is it down",
+        "how\ncommand",
+        "find the config\nfile",
+        "KILLALL stopped processes",
+        "",
+        "hello there",
+    ]
+    for name in ('ford_kb.json', 'unix_kb.json'):
+        with open(os.path.join(KB_DIR, name), encoding='utf-8') as f:
+            kb = json.load(f)
+        for entry in kb.get('faq', {}).values():
+            queries.append(entry.get('question', ''))
+            queries.extend(entry.get('variations', []))
+        queries.extend(article.get('title', '') for article in kb.get('articles', {}).values())
+        queries.extend(kb.get('troubleshooting', {}))
+
+    # Random mixes of pattern keywords, filler words and line breaks
+    rng = random.Random(7)
+    pieces = [piece for patterns in NlpEngine().intent_patterns.values()
+              for pattern in patterns for piece in pattern.replace("\\'", "'").split('.*') if piece]
+    pieces += ['the', 'a', 'on', 'server', 'disk', '\n', 'this', 'users', 'processing', 'usage of']
+    for _ in range(3000):
+        words = rng.choices(pieces, k=rng.randint(1, 8))
+        queries.append(rng.choice([' ', '', '-']).join(words))
+    return queries
+
+
+def test_combined_classifier_matches_per_pattern_search():
+    nlp = NlpEngine()
+    for query in regression_corpus():
+        assert nlp.extract_intent(query) == reference_intent(nlp, query), query
+
+
+def test_non_literal_patterns_fall_back_to_regex():
+    nlp = NlpEngine()
+    nlp.intent_patterns['status_check'].append(r'\bup\b')
+    nlp._compile_intent_patterns()
+
+    for query in ("is it up", "backup failed", "database is down", "setup"):
+        assert nlp.extract_intent(query) == reference_intent(nlp, query)
@@ -0,0 +1,163 @@
+import pytest
+
+from app.services.kb_snapshot import read_kb_file
+from app.services.kb_store import MongoKnowledgeStore
+from app.services.knowledge_service import KnowledgeService
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction=1):
+        self.docs = sorted(self.docs, key=lambda doc: doc.get(field, ''), reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        self.docs = self.docs[:count]
+        return self
+
+    def __iter__(self):
+        return iter(self.docs)
+
+
+class FakeCollection:
+    """Just enough of a pymongo collection for MongoKnowledgeStore"""
+
+    def __init__(self, database=None, name=None):
+        self.database = database
+        self.name = name
+        self.docs = {}
+        self.finds = []
+
+    @staticmethod
+    def _matches(doc, query):
+        for field, condition in query.items():
+            value = doc.get(field)
+            if isinstance(condition, dict) and '$in' in condition:
+                if value not in condition['$in']:
+                    return False
+            elif isinstance(value, list):
+                if condition not in value:
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    @staticmethod
+    def _project(doc, projection):
+        if not projection:
+            return dict(doc)
+        return {field: value for field, value in doc.items() if field == '_id' or field in projection}
+
+    def find(self, query=None, projection=None, batch_size=0):
+        self.finds.append((query, projection))
+        return FakeCursor([
+            self._project(doc, projection) for doc in self.docs.values() if self._matches(doc, query or {})
+        ])
+
+    def find_one(self, query, projection=None):
+        return next(iter(self.find(query, projection)), None)
+
+    def create_index(self, keys, name=None):
+        return name
+
+    def delete_many(self, query):
+        self.docs = {key: doc for key, doc in self.docs.items() if not self._matches(doc, query)}
+
+    def insert_many(self, documents, ordered=True):
+        # Like MongoDB, writing to a dropped collection creates it again
+        self.database.collections.setdefault(self.name, self)
+        for doc in documents:
+            if self.database.fail_inserts:
+                raise RuntimeError("insert failed")
+            self.docs[doc['_id']] = dict(doc)
+
+    def drop(self):
+        self.docs = {}
+        self.database.collections.pop(self.name, None)
+
+    def rename(self, new_name, dropTarget=False):
+        assert dropTarget or new_name not in self.database.collections
+        self.database.collections[new_name] = self.database.collections.pop(self.name)
+        self.name = new_name
+
+    def replace_one(self, query, document, upsert=False):
+        self.docs[document['_id']] = dict(document)
+
+
+class FakeDatabase:
+    name = 'itsd_test'
+
+    def __init__(self):
+        self.collections = {}
+        self.fail_inserts = False
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(self, name)
+        return self.collections[name]
+
+    __getattr__ = __getitem__
+
+
+def make_store(kb_file):
+    store = MongoKnowledgeStore(FakeDatabase())
+    store.import_knowledge_base(*read_kb_file(kb_file))
+    return store
+
+
+def test_store_round_trips_the_kb(kb_file):
+    store = make_store(kb_file)
+    kb_data, version = store.load_knowledge_base()
+    expected, expected_version = read_kb_file(kb_file)
+
+    assert kb_data == expected
+    assert version == expected_version == store.version()
+
+
+def test_store_backed_service_fetches_bodies_lazily(kb_file):
+    store = make_store(kb_file)
+    service = KnowledgeService(None, store=store)
+
+    assert all('content' not in article for article in service.knowledge_base['articles'].values())
+
+    for engine in ('bm25', 'keyword'):
+        matches = service.search_articles("ssl certificate renewal", {}, engine=engine)
+        assert list(matches) == ["KB001"]
+        assert matches["KB001"]["content"] == "Renew certificates hosted on IHS webservers"
+
+    # Only the returned article's body is fetched
+    assert store.db.articles.finds[-1] == ({'_id': {'$in': ['KB001']}}, {'content': 1})
+
+
+def test_store_backed_service_reloads_on_new_version(kb_file):
+    store = make_store(kb_file)
+    service = KnowledgeService(None, store=store)
+    assert service.reload_knowledge_base() is False
+
+    kb_data, _ = read_kb_file(kb_file)
+    kb_data['articles']['KB005'] = {"title": "Kernel Panic Recovery", "content": "Boot the previous kernel",
+                                    "tags": ["kernel", "panic"]}
+    store.import_knowledge_base(kb_data, 'v2')
+
+    assert service.reload_knowledge_base() is True
+    assert service.version == 'v2'
+    assert list(service.search_articles("kernel panic", {})) == ["KB005"]
+
+    # A failed import leaves the live KB whole
+    store.db.fail_inserts = True
+    with pytest.raises(RuntimeError):
+        store.import_knowledge_base(read_kb_file(kb_file)[0], 'v3')
+    assert store.load_knowledge_base() == (kb_data, 'v2')
+
+
+def test_list_articles_skips_bodies(kb_file):
+    store = make_store(kb_file)
+    service = KnowledgeService(None, store=store)
+
+    listing = service.list_articles(tag='disk')
+    assert [article['id'] for article in listing] == ["KB002", "KB003"]
+    assert store.db.articles.finds[-1] == ({'tags': 'disk'}, {'title': 1, 'tags': 1})
+
+    assert service.list_articles(tag='disk') == KnowledgeService(kb_file).list_articles(tag='disk')
@@ -0,0 +1,211 @@
+import json
+import os
+import time
+from array import array
+
+from app.services.kb_snapshot import build_snapshot, load_snapshot_file, read_kb_file, write_snapshot_file
+from app.services.knowledge_service import KnowledgeService
+from app.services.search_index import ArticleIndex
+
+
+def test_search_articles_keeps_result_shape(kb_file):
+    service = KnowledgeService(kb_file)
+    matches = service.search_articles("ssl certificate renewal", {})
+
+    assert list(matches) == ["KB001"]
+    assert set(matches["KB001"]) == {"title", "content", "score"}
+    assert matches["KB001"]["title"] == "SSL Certificate Renewal"
+
+
+def test_search_articles_ranks_best_match_first(kb_file):
+    service = KnowledgeService(kb_file)
+    matches = service.search_articles("slow disk volume", {})
+
+    assert list(matches)[0] == "KB003"
+    assert "KB002" in matches
+
+
+def test_content_only_hits_do_not_qualify(kb_file):
+    service = KnowledgeService(kb_file)
+    matches = service.search_articles("tsm client logs", {})
+
+    # "tsm" is a tag of KB004; "logs" alone appears only in content
+    assert list(matches) == ["KB004"]
+    assert service.search_articles("jenkins", {}) == {}
+
+
+def test_entities_match_tags(kb_file):
+    service = KnowledgeService(kb_file)
+    matches = service.search_articles("help me please", {"software_name": ["ssl"]})
+
+    assert list(matches) == ["KB001"]
+
+
+def test_top_k_limits_results():
+    articles = {f"KB{n}": {"title": f"Disk article {n}", "content": "", "tags": []} for n in range(10)}
+    index = ArticleIndex(articles)
+
+    assert len(index.search("disk", top_k=3)) == 3
+    assert index.search("nothing") == []
+
+
+def test_search_faq_uses_word_boundaries(kb_file):
+    service = KnowledgeService(kb_file)
+
+    assert list(service.search_faq("Hello there")) == ["hi"]
+    assert service.search_faq("this is nothing") == {}
+
+
+def test_reload_rebuilds_faq_matcher(kb_file):
+    service = KnowledgeService(kb_file)
+    with open(kb_file, encoding="utf-8") as f:
+        kb = json.load(f)
+    kb["faq"]["uptime"] = {"question": "Uptime", "answer": "Use command: uptime", "variations": ["uptime"]}
+    with open(kb_file, "w", encoding="utf-8") as f:
+        json.dump(kb, f)
+
+    assert service.search_faq("show uptime") == {}
+    service.reload_knowledge_base()
+    assert list(service.search_faq("show uptime")) == ["uptime"]
+
+
+def rewrite_kb(kb_file, update):
+    with open(kb_file, encoding="utf-8") as f:
+        kb = json.load(f)
+    update(kb)
+    with open(kb_file, "w", encoding="utf-8") as f:
+        json.dump(kb, f)
+
+
+def test_reload_swaps_snapshot_and_version(kb_file):
+    service = KnowledgeService(kb_file)
+    old_snapshot = service.snapshot
+
+    assert service.reload_knowledge_base() is False
+
+    rewrite_kb(kb_file, lambda kb: kb["articles"].pop("KB001"))
+    assert service.reload_knowledge_base() is True
+
+    assert service.version != old_snapshot.version
+    assert service.search_articles("ssl certificate", {}) == {}
+    # A reader holding the old snapshot still sees a complete, consistent view
+    assert list(service.search_articles("ssl certificate", {}, snapshot=old_snapshot)) == ["KB001"]
+    assert service.status()["build_ms"] >= 0
+
+
+def test_reload_keeps_snapshot_when_file_is_broken(kb_file):
+    service = KnowledgeService(kb_file)
+    version = service.version
+
+    with open(kb_file, "w", encoding="utf-8") as f:
+        f.write("{ not json")
+
+    assert service.reload_knowledge_base() is False
+    assert service.version == version
+    assert service.status()["last_reload_error"]
+    assert list(service.search_articles("ssl certificate", {})) == ["KB001"]
+
+
+def test_background_reload(kb_file):
+    service = KnowledgeService(kb_file)
+    version = service.version
+    rewrite_kb(kb_file, lambda kb: kb["faq"].pop("hi"))
+
+    assert service.reload_in_background() is True
+    service._reload_thread.join(timeout=5)
+
+    assert service.version != version
+    assert service.search_faq("hello") == {}
+
+
+def test_forked_child_restarts_watcher(kb_file):
+    service = KnowledgeService(kb_file)
+    service.start_watcher(0.05)
+    version = service.version
+    try:
+        pid = os.fork()
+        if pid == 0:
+            # Only the child's own watcher thread can pick up the edit
+            rewrite_kb(kb_file, lambda kb: kb["faq"].pop("hi"))
+            deadline = time.time() + 5
+            while service.version == version and time.time() < deadline:
+                time.sleep(0.02)
+            os._exit(0 if service.version != version else 1)
+        _, status = os.waitpid(pid, 0)
+    finally:
+        service.stop_watcher()
+
+    assert os.WEXITSTATUS(status) == 0
+
+
+def compile_snapshot(kb_file):
+    snapshot_file = kb_file.replace(".json", ".kbsnap")
+    kb_data, version = read_kb_file(kb_file)
+    write_snapshot_file(build_snapshot(kb_data, version), snapshot_file, kb_file)
+    return snapshot_file
+
+
+def test_compiled_snapshot_is_mapped_and_searchable(kb_file):
+    snapshot_file = compile_snapshot(kb_file)
+    service = KnowledgeService(kb_file, snapshot_file=snapshot_file)
+
+    assert isinstance(service.article_index.posting_docs, memoryview)
+    assert service.version == KnowledgeService(kb_file).version
+    assert list(service.search_articles("slow disk volume", {})) == \
+        list(KnowledgeService(kb_file).search_articles("slow disk volume", {}))
+    assert list(service.search_faq("hello")) == ["hi"]
+    # The mapped snapshot describes the current JSON file, so no reload is due
+    assert service.reload_knowledge_base() is False
+
+
+def test_stale_compiled_snapshot_falls_back_to_json(kb_file):
+    snapshot_file = compile_snapshot(kb_file)
+    rewrite_kb(kb_file, lambda kb: kb["articles"].pop("KB001"))
+
+    assert load_snapshot_file(snapshot_file, kb_file) is None
+    service = KnowledgeService(kb_file, snapshot_file=snapshot_file)
+    assert isinstance(service.article_index.posting_docs, array)
+    assert service.search_articles("ssl certificate", {}) == {}
+
+    # Without its JSON source nothing shows the snapshot is current
+    snapshot_file = compile_snapshot(kb_file)
+    os.remove(kb_file)
+    assert load_snapshot_file(snapshot_file, kb_file) is None
+
+
+def test_unknown_snapshot_format_is_ignored(kb_file, tmp_path):
+    bogus = tmp_path / "bogus.kbsnap"
+    bogus.write_bytes(b"not a snapshot at all")
+
+    assert load_snapshot_file(str(bogus), kb_file) is None
+    assert load_snapshot_file(str(tmp_path / "missing.kbsnap"), kb_file) is None
+
+
+def test_keyword_scorer_uses_precomputed_fields(kb_file):
+    service = KnowledgeService(kb_file)
+    article = service.snapshot.articles[0]
+
+    assert article.title_tokens == {"ssl", "certificate", "renewal"}
+    assert article.tags == ("ssl", "certificate", "renewal")
+
+    matches = service.search_articles_keyword("Slow disk volume?", {})
+    # title (+2), tags slow/disk/volume (+9), content "volume" (+1)
+    assert matches["KB003"]["score"] == 12
+    assert list(matches)[0] == "KB003"
+
+    by_entity = service.search_articles_keyword("help", {"software_name": ["SSL"]})
+    assert by_entity == {"KB001": {"title": "SSL Certificate Renewal",
+                                   "content": "Renew certificates hosted on IHS webservers", "score": 2}}
+
+
+def test_command_and_troubleshooting_lookups_tolerate_case_and_typos(kb_file):
+    service = KnowledgeService(kb_file)
+    results = service.search_knowledge(
+        "troubleshooting", {"error_code": ["permission denied"], "command_name": ["DF"]}, "")
+
+    assert results["troubleshooting_matches"] == {"Permission denied": "Check file permissions"}
+    assert results["command_matches"] == {"df": "df -h - Check disk space"}
+
+    typo = service.search_knowledge("troubleshooting", {"error_code": ["permision denid"]}, "")
+    assert list(typo["troubleshooting_matches"]) == ["Permission denied"]
+    assert service.status()["fuzzy_lookup"]["lookups"] == 3
@@ -0,0 +1,58 @@
+import io
+import json
+import logging
+import queue
+
+from app.logging_setup import DroppingQueueHandler, configure_logging, log_query
+
+
+def read_lines(stream):
+    # Reconfiguring stops the writer thread after it has drained the queue
+    configure_logging(stream=io.StringIO())
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_records_are_written_as_json_lines():
+    stream = io.StringIO()
+    configure_logging('INFO', sample_rate=0, stream=stream)
+    logger = logging.getLogger('app.test')
+
+    logger.info("KB loaded", extra={"articles": 3})
+    logger.debug("not written")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Query failed")
+
+    lines = read_lines(stream)
+    assert [line["msg"] for line in lines] == ["KB loaded", "Query failed"]
+    assert lines[0]["level"] == "INFO" and lines[0]["logger"] == "app.test" and lines[0]["articles"] == 3
+    assert "ValueError: boom" in lines[1]["exc"]
+
+
+def test_query_records_are_sampled_regardless_of_level():
+    logger = logging.getLogger('app.test')
+
+    stream = io.StringIO()
+    configure_logging('WARNING', sample_rate=1, stream=stream)
+    log_query(logger, "Answered query", query="disk full", kb_matches=["faq_matches"])
+    lines = read_lines(stream)
+    assert lines == [dict(lines[0], level="QUERY", msg="Answered query", query="disk full",
+                          kb_matches=["faq_matches"])]
+
+    stream = io.StringIO()
+    configure_logging('DEBUG', sample_rate=0, stream=stream)
+    log_query(logger, "Answered query", query="disk full")
+    assert read_lines(stream) == []
+
+
+def test_full_queue_drops_records_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(1))
+    logger = logging.Logger('app.dropping')
+    logger.addHandler(handler)
+
+    for i in range(3):
+        logger.warning("record %d", i)
+
+    assert handler.queue.get_nowait().getMessage() == "record 0"
+    assert handler.dropped == 2
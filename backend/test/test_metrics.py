@@ -0,0 +1,55 @@
+import os
+
+from app.services.metrics import BUCKETS, StageHistograms
+
+
+def test_histograms_render_cumulative_buckets():
+    histograms = StageHistograms(stages=('intent', 'format'))
+    histograms.observe('intent', 0.0002)
+    histograms.observe('intent', 0.003)
+    histograms.observe('intent', 60.0)
+    histograms.observe('unknown', 1.0)
+
+    row = histograms.snapshot()['intent']
+    assert row['count'] == 3
+    assert abs(row['sum'] - 60.0032) < 1e-9
+    assert row['buckets'][-1] == 3
+    assert row['buckets'][BUCKETS.index(0.00025)] == 1
+    assert row['buckets'][BUCKETS.index(0.005)] == 2
+
+    text = histograms.render()
+    assert 'itsd_stage_duration_seconds_bucket{stage="intent",le="0.00025"} 1' in text
+    assert 'itsd_stage_duration_seconds_bucket{stage="intent",le="+Inf"} 3' in text
+    assert 'itsd_stage_duration_seconds_count{stage="format"} 0' in text
+
+
+def test_histograms_add_up_across_processes(tmp_path):
+    histograms = StageHistograms(stages=('intent',))
+    histograms.configure(str(tmp_path))
+    histograms.observe('intent', 0.001)
+
+    pid = os.fork()
+    if pid == 0:
+        # The child starts from zero in its own file
+        histograms.observe('intent', 0.002)
+        histograms.observe('intent', 0.002)
+        os._exit(0 if histograms.snapshot()['intent']['count'] == 3 else 1)
+    _, status = os.waitpid(pid, 0)
+
+    assert os.WEXITSTATUS(status) == 0
+    assert len(os.listdir(tmp_path)) == 2
+    assert histograms.snapshot()['intent']['count'] == 3
+
+
+def test_a_recycled_pid_keeps_the_earlier_counts(tmp_path):
+    first = StageHistograms(stages=('intent',))
+    first.configure(str(tmp_path))
+    first.observe('intent', 0.001)
+
+    # Another process start with the same pid, such as a respawned worker
+    second = StageHistograms(stages=('intent',))
+    second.configure(str(tmp_path))
+    second.observe('intent', 0.001)
+
+    assert len(os.listdir(tmp_path)) == 2
+    assert second.snapshot()['intent']['count'] == 2
@@ -0,0 +1,70 @@
+from app.services.query_cache import QueryCache, normalize_query
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_query():
+    assert normalize_query("  Check   DISK space?! ") == "check disk space"
+    assert normalize_query("restart apache, please.") == "restart apache please"
+    # Punctuation inside words is meaningful and kept
+    assert normalize_query("ls /var/log on server-web-01?") == "ls /var/log on server-web-01"
+    assert normalize_query("df -h ~/logs") == "df -h ~/logs"
+    assert normalize_query("?!") == ""
+
+
+def test_hit_and_miss_counters():
+    cache = QueryCache(max_entries=4)
+
+    assert cache.get("check disk space", "v1") is None
+    cache.put("check disk space", "v1", {"response": "df -h"})
+    assert cache.get("check disk space", "v1") == {"response": "df -h"}
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+
+def test_lru_eviction():
+    cache = QueryCache(max_entries=2)
+    cache.put("a", "v1", {"n": 1})
+    cache.put("b", "v1", {"n": 2})
+    cache.get("a", "v1")
+    cache.put("c", "v1", {"n": 3})
+
+    assert cache.get("b", "v1") is None
+    assert cache.get("a", "v1") == {"n": 1}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry():
+    clock = FakeClock()
+    cache = QueryCache(max_entries=4, ttl=10, clock=clock)
+    cache.put("a", "v1", {"n": 1})
+
+    clock.now = 9.9
+    assert cache.get("a", "v1") == {"n": 1}
+    clock.now = 10.0
+    assert cache.get("a", "v1") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_kb_version_change_invalidates():
+    cache = QueryCache(max_entries=4)
+    cache.put("a", "v1", {"n": 1})
+
+    assert cache.get("a", "v2") is None
+    assert cache.stats()["invalidations"] == 1
+    assert cache.stats()["size"] == 0
+
+
+def test_disabled_cache():
+    cache = QueryCache(max_entries=0)
+    cache.put("a", "v1", {"n": 1})
+
+    assert cache.get("a", "v1") is None
+    assert cache.stats()["enabled"] is False
@@ -0,0 +1,95 @@
+import pytest
+
+from app.services.automation_service import AutomationService
+from app.services.knowledge_service import KnowledgeService
+from app.services.nlp_engine import NlpEngine
+from app.services.query_cache import QueryCache
+from app.services.query_pipeline import QueryPipeline, query_cache_key
+
+
+def make_pipeline(kb_file, cache=None, chunk_size=2, enable_tfidf=False):
+    service = KnowledgeService(kb_file, enable_tfidf=enable_tfidf)
+    return QueryPipeline(NlpEngine(), service, AutomationService(), cache, chunk_size=chunk_size)
+
+
+def test_batch_matches_single_answers_in_order(kb_file):
+    pipeline = make_pipeline(kb_file)
+    queries = ["ssl certificate renewal", "slow disk volume", "hi", "restart apache", "SSL certificate renewal!"]
+
+    results = list(pipeline.answer_batch(queries))
+
+    assert [result['index'] for result in results] == list(range(len(queries)))
+    for query, result in zip(queries, results):
+        assert {key: value for key, value in result.items() if key != 'index'} == pipeline.answer(query)
+
+
+def test_bad_items_do_not_fail_the_batch(kb_file):
+    pipeline = make_pipeline(kb_file)
+    original = pipeline.nlp_engine.extract_entities
+
+    def extract_entities(text):
+        if 'explode' in text:
+            raise RuntimeError("boom")
+        return original(text)
+
+    pipeline.nlp_engine.extract_entities = extract_entities
+    results = list(pipeline.answer_batch(["slow disk volume", "", 42, "please explode", "hi"]))
+
+    assert [result['index'] for result in results] == [0, 1, 2, 3, 4]
+    assert [('error' in result) for result in results] == [False, True, True, True, False]
+    assert results[3]['error'] == "Failed to process query"
+
+
+def test_batch_reuses_cached_responses(kb_file):
+    cache = QueryCache()
+    pipeline = make_pipeline(kb_file, cache)
+    cached = {"intent": "cached", "entities": {}, "response": "", "automation_suggestions": None, "kb_matches": []}
+    cache.put(query_cache_key("slow disk volume"), pipeline.knowledge_service.version, cached)
+
+    results = list(pipeline.answer_batch(["Slow disk volume", "hi"]))
+
+    assert results[0]['intent'] == "cached"
+    assert results[1]['intent'] != "cached"
+
+
+def test_tfidf_batch_matches_single_answers(kb_file):
+    pytest.importorskip("numpy")
+    pipeline = make_pipeline(kb_file, enable_tfidf=True)
+    queries = ["ssl certificate renewal", "slow disk volume", "backup failure"]
+
+    results = list(pipeline.answer_batch(queries, engine='tfidf'))
+
+    for query, result in zip(queries, results):
+        assert result['kb_matches'] == pipeline.answer(query, engine='tfidf')['kb_matches']
+
+
+
+def test_failed_tfidf_search_fails_only_its_chunk(kb_file):
+    pytest.importorskip("numpy")
+    pipeline = make_pipeline(kb_file, enable_tfidf=True)
+    original = pipeline.knowledge_service.search_articles_batch
+
+    def search_articles_batch(queries, entities, snapshot=None):
+        if "backup failure" in queries:
+            raise MemoryError()
+        return original(queries, entities, snapshot=snapshot)
+
+    pipeline.knowledge_service.search_articles_batch = search_articles_batch
+    results = list(pipeline.answer_batch(["ssl certificate renewal", "slow disk volume", "backup failure", "hi"],
+                                         engine='tfidf'))
+
+    assert [result['index'] for result in results] == [0, 1, 2, 3]
+    assert [('error' in result) for result in results] == [False, False, True, True]
+
+def test_stream_yields_stages_then_the_full_answer(kb_file):
+    pipeline = make_pipeline(kb_file)
+
+    for query in ["ssl certificate renewal", "hi", "df permission denied error", "nothing relevant"]:
+        events = list(pipeline.answer_stream(query))
+        names = [event for event, _ in events]
+
+        assert names[0] == 'analysis' and names[-1] == 'done'
+        assert events[-1][1] == pipeline.answer(query)
+        texts = [data['text'] for event, data in events[1:-1] if data['text']]
+        if texts:
+            assert "\n".join(texts) == events[-1][1]['response']
@@ -0,0 +1,69 @@
+import json
+
+from app.services.automation_service import AutomationService
+from app.services.kb_snapshot import load_snapshot_file, write_snapshot_file
+from app.services.knowledge_service import KnowledgeService
+from app.services.nlp_engine import NlpEngine
+from app.services.query_pipeline import QueryPipeline
+from app.services.runbooks import RunbookIndex
+
+
+def runbook(*triggers):
+    return {"triggers": list(triggers), "steps": [{"command": "true", "description": "step"}]}
+
+
+def test_most_specific_trigger_wins():
+    index = RunbookIndex({
+        "disk": runbook({"intent": "status_check"}),
+        "apache": runbook({"entity": "software_name", "value": "Apache"}),
+        "permission": runbook({"intent": "troubleshooting", "entity": "error_code", "value": "permission denied"}),
+        "any_server": runbook({"entity": "server_name"}),
+        "also_disk": runbook({"intent": "status_check"}),
+        "broken": {"triggers": [{"value": "x"}], "steps": []},
+        "no_steps": {"triggers": [{"intent": "general_query"}]}
+    })
+
+    assert len(index) == 5 and index.skipped == 2
+    assert index.match("status_check", {}) == "disk"
+    assert index.match("status_check", {"software_name": ["nginx", "apache"]}) == "apache"
+    assert index.match("troubleshooting", {"software_name": ["apache"], "error_code": ["Permission Denied"]}) == \
+        "permission"
+    assert index.match("general_query", {"server_name": ["prod-"]}) == "any_server"
+    assert index.match("general_query", {"error_code": ["permission denied"]}) is None
+    assert index.command_sequence("general_query", {}) is None
+
+    steps = index.command_sequence("status_check", {})
+    steps[0]["command"] = "changed"
+    assert index.command_sequence("status_check", {})[0]["command"] == "true"
+
+
+def test_runbooks_reload_with_the_kb(kb_file, tmp_path):
+    service = KnowledgeService(kb_file)
+    pipeline = QueryPipeline(NlpEngine(), service, AutomationService())
+    assert pipeline.answer("restart apache")["automation_suggestions"][0]["command"] == \
+        "sudo systemctl restart apache2"
+
+    with open(kb_file) as f:
+        kb = json.load(f)
+    kb["runbooks"]["restart_apache"]["steps"] = [{"command": "apachectl graceful", "description": "Reload"}]
+    with open(kb_file, "w") as f:
+        json.dump(kb, f)
+    assert service.reload_knowledge_base() is True
+    assert pipeline.answer("restart apache")["automation_suggestions"] == \
+        [{"command": "apachectl graceful", "description": "Reload"}]
+
+    # Compiled snapshots carry the runbook index too
+    snapshot_file = str(tmp_path / "kb.kbsnap")
+    write_snapshot_file(service.snapshot, snapshot_file, kb_file)
+    loaded = load_snapshot_file(snapshot_file, kb_file)
+    assert loaded.runbook_index.match("process_management", {"software_name": ["apache"]}) == "restart_apache"
+
+
+def test_default_kb_and_callers_without_an_index_keep_suggestions(tmp_path):
+    service = KnowledgeService(str(tmp_path / "kb" / "missing.json"))
+    automation = AutomationService()
+    entities = {"software_name": ["apache"]}
+
+    from_kb = automation.generate_command_sequence("general_query", entities, service.snapshot.runbook_index)
+    assert from_kb[1]["command"] == "sudo systemctl restart apache2"
+    assert automation.generate_command_sequence("general_query", entities) == from_kb
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.services.knowledge_service import KnowledgeService
+from app.services.tfidf_index import TfidfIndex
+
+ARTICLES = {
+    "KB001": {"title": "SSL Certificate Renewal", "content": "Renew certificates on IHS webservers", "tags": ["ssl", "certificate"]},
+    "KB002": {"title": "Filesystem Disk Usage Check", "content": "Check filesystem usage via Jenkins", "tags": ["disk", "filesystem"]},
+    "KB003": {"title": "Slow Disk Resolution", "content": "Volume problem resolution for slow disks", "tags": ["slow", "disk", "volume"]},
+    "KB004": {"title": "Backup Failure Resolution", "content": "Restart the TSM client", "tags": ["backup", "tsm"]}
+}
+
+
+def test_search_ranks_by_cosine_similarity():
+    index = TfidfIndex(ARTICLES)
+    results = index.search("slow disk volume")
+
+    assert results[0][0] == "KB003"
+    assert [article_id for article_id, _ in results] == ["KB003", "KB002"]
+    assert 0 < results[0][1] <= 1
+
+
+def test_article_vectors_are_unit_length():
+    index = TfidfIndex(ARTICLES)
+    norms = np.bincount(index.docs, weights=index.values.astype(np.float64) ** 2, minlength=len(ARTICLES))
+
+    assert np.allclose(norms, 1.0, atol=1e-5)
+
+
+def test_batch_matches_single_queries():
+    index = TfidfIndex(ARTICLES)
+    queries = ["slow disk volume", "ssl renewal", "nothing relevant", "tsm backup failed", "disk"]
+
+    assert index.search_batch(queries) == [index.search(query) for query in queries]
+
+
+def test_batch_chunks_large_batches(monkeypatch):
+    monkeypatch.setattr("app.services.tfidf_index.BATCH_CELLS", len(ARTICLES) * 2)
+    index = TfidfIndex(ARTICLES)
+    queries = ["slow disk", "ssl", "backup", "disk usage", "tsm"]
+
+    assert index.search_batch(queries) == [index.search(query) for query in queries]
+
+
+def test_engine_is_selectable_per_request(tmp_path):
+    kb_file = tmp_path / "kb.json"
+    kb_file.write_text(json.dumps({"articles": ARTICLES, "faq": {}}), encoding="utf-8")
+    service = KnowledgeService(str(kb_file), enable_tfidf=True)
+
+    tfidf = service.search_articles("slow disk volume", {}, engine="tfidf")
+    bm25 = service.search_articles("slow disk volume", {})
+    assert list(tfidf)[0] == list(bm25)[0] == "KB003"
+    assert set(tfidf["KB003"]) == {"title", "content", "score"}
+
+    batch = service.search_articles_batch(["slow disk volume", "ssl renewal"])
+    assert list(batch[1]) == ["KB001"]
+
+    with pytest.raises(ValueError):
+        service.search_articles("disk", {}, engine="nope")
+
+
+def test_tfidf_disabled_by_default(tmp_path):
+    kb_file = tmp_path / "kb.json"
+    kb_file.write_text(json.dumps({"articles": ARTICLES, "faq": {}}), encoding="utf-8")
+    service = KnowledgeService(str(kb_file))
+
+    with pytest.raises(ValueError):
+        service.search_articles("disk", {}, engine="tfidf")
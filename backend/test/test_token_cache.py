@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+
+from flask import Flask, jsonify
+from flask_jwt_extended import JWTManager
+
+from app.routes import auth
+from app.services import token_cache
+from app.services.token_cache import RevocationList, TokenCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_with_the_token():
+    clock = FakeClock()
+    cache = TokenCache(max_entries=2, clock=clock)
+    cache.put("short", {}, {"sub": "a", "exp": 1010})
+    cache.put("long", {}, {"sub": "b", "exp": 5000})
+
+    assert cache.get("short") == ({}, {"sub": "a", "exp": 1010})
+    clock.now = 1010
+    assert cache.get("short") is None
+
+    # Expired entries go first, then the least recently used
+    cache.put("short", {}, {"sub": "a", "exp": 1020})
+    clock.now = 1030
+    cache.put("third", {}, {"sub": "c", "exp": 5000})
+    assert cache.get("long") is not None and cache.get("third") is not None
+    cache.put("fourth", {}, {"sub": "d", "exp": 5000})
+    assert cache.get("long") is None
+    assert cache.stats()["expirations"] == 2 and cache.stats()["evictions"] == 1
+
+
+def test_revocations_are_shared_through_the_file(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "revoked.jsonl")
+    worker_a = RevocationList(path, poll_interval=1, clock=clock)
+    worker_b = RevocationList(path, poll_interval=1, clock=clock)
+    assert not worker_b.is_revoked({"jti": "t1", "sub": "alice", "iat": 900})
+
+    worker_a.revoke_token("t1", 2000)
+    worker_a.revoke_user("bob", 3600)
+    assert not worker_b.is_revoked({"jti": "t1", "sub": "alice", "iat": 900})
+    clock.now += 1
+    assert worker_b.is_revoked({"jti": "t1", "sub": "alice", "iat": 900})
+    assert worker_b.is_revoked({"jti": "t2", "sub": "bob", "iat": 999})
+    assert not worker_b.is_revoked({"jti": "t3", "sub": "bob", "iat": 1001})
+
+    # Entries are dropped once the tokens they cover have expired
+    clock.now = 2500
+    worker_b.refresh(force=True)
+    assert "t1" not in worker_b.tokens and "bob" in worker_b.users
+
+
+
+def test_concurrent_refreshes_apply_every_entry_once(tmp_path, monkeypatch):
+    path = str(tmp_path / "revoked.jsonl")
+    writer = RevocationList(path)
+    reader = RevocationList(path, poll_interval=0)
+    for n in range(3):
+        writer.revoke_token(f"t{n}", time.time() + 3600)
+
+    class SlowFile:
+        """Holds every poll between reading the file and moving the offset"""
+
+        def __init__(self, *args):
+            self.file = open(*args)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self.file.close()
+
+        def fileno(self):
+            return self.file.fileno()
+
+        def seek(self, offset):
+            self.file.seek(offset)
+
+        def read(self):
+            data = self.file.read()
+            time.sleep(0.05)
+            return data
+
+    monkeypatch.setattr(token_cache, "open", SlowFile, raising=False)
+    threads = [threading.Thread(target=reader.refresh) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert reader._offset == os.path.getsize(path) and reader._partial == b''
+
+    writer.revoke_token("t3", time.time() + 3600)
+    reader.refresh()
+    assert sorted(reader.tokens) == ["t0", "t1", "t2", "t3"]
+
+
+def test_cached_claims_and_logout(tmp_path, monkeypatch):
+    monkeypatch.setattr(auth, "token_cache", TokenCache())
+    monkeypatch.setattr(auth, "revocations", RevocationList(str(tmp_path / "revoked.jsonl"), poll_interval=0))
+    app = Flask(__name__)
+    app.config["JWT_SECRET_KEY"] = "test-secret-key-for-the-token-cache-tests"
+    JWTManager(app)
+    app.register_blueprint(auth.auth_bp, url_prefix="/auth")
+
+    @app.route("/whoami")
+    @auth.token_required
+    def whoami():
+        claims = auth.current_claims()
+        return jsonify({"user": claims["sub"], "role": claims["role"]})
+
+    client = app.test_client()
+    token = client.post("/auth/login", json={"username": "agent1", "password": "agent123"}).get_json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.get("/whoami", headers=headers).get_json() == {"user": "agent1", "role": "agent"}
+    assert client.get("/whoami", headers=headers).get_json() == {"user": "agent1", "role": "agent"}
+    assert auth.token_cache.stats()["hits"] == 1
+    assert client.get("/auth/token-cache", headers=headers).status_code == 403
+
+    assert client.post("/auth/logout", headers=headers).status_code == 200
+    assert client.get("/whoami", headers=headers).status_code == 401
+
+    admin_token = client.post("/auth/login", json={"username": "admin", "password": "admin123"}).get_json()["access_token"]
+    admin = {"Authorization": f"Bearer {admin_token}"}
+    assert client.post("/auth/revoke", json={"jti": "t1", "exp": "soon"}, headers=admin).status_code == 400
+    assert client.post("/auth/revoke", json={"jti": ["t1"]}, headers=admin).status_code == 400
+
+    # Revocation times are whole seconds like iat: a token issued later in
+    # the same second is still accepted
+    assert client.post("/auth/revoke", json={"username": "agent1"}, headers=admin).status_code == 200
+    before = auth.revocations.users["agent1"][0]
+    assert before == int(before)
+    assert not auth.revocations.is_revoked({"jti": "t2", "sub": "agent1", "iat": before})
+    assert auth.revocations.is_revoked({"jti": "t3", "sub": "agent1", "iat": before - 1})
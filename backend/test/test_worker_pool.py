@@ -0,0 +1,42 @@
+import os
+import signal
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.services.automation_service import AutomationService
+from app.services.knowledge_service import KnowledgeService
+from app.services.nlp_engine import NlpEngine
+from app.services.query_pipeline import QueryPipeline
+from app.services.worker_pool import QueryWorkerPool
+
+
+@pytest.fixture
+def pool(kb_file):
+    pool = QueryWorkerPool(1, {"kb_file": kb_file}, timeout=60, chunk_size=2)
+    yield pool
+    pool.shutdown()
+
+
+def test_workers_answer_like_the_web_process(kb_file, pool):
+    pipeline = QueryPipeline(NlpEngine(), KnowledgeService(kb_file), AutomationService())
+    queries = ["ssl certificate renewal", "slow disk volume", "", "restart apache", "hi"]
+
+    response, version = pool.answer("ssl certificate renewal")
+    assert response == pipeline.answer("ssl certificate renewal")
+    assert version == pipeline.knowledge_service.version
+
+    assert list(pool.answer_batch(queries)) == list(pipeline.answer_batch(queries))
+
+
+def test_pool_restarts_after_a_worker_dies(pool):
+    (pid,) = pool.warm()
+    os.kill(pid, signal.SIGKILL)
+
+    with pytest.raises(BrokenProcessPool):
+        for _ in range(50):
+            pool.answer("slow disk volume")
+
+    response, _ = pool.answer("slow disk volume")
+    assert response["kb_matches"] == ["article_matches"]
+    assert pool.status()["restarts"] == 1
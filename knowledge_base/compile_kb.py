@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+
+# The snapshot holds backend index classes, so make the backend importable
+# both from the repo checkout and from the backend container (/app)
+HERE = os.path.dirname(os.path.abspath(__file__))
+for candidate in (os.path.join(HERE, '..', 'backend'), os.path.join(HERE, '..')):
+    if os.path.isdir(os.path.join(candidate, 'app', 'services')):
+        sys.path.insert(0, os.path.abspath(candidate))
+        break
+
+from app.services.kb_snapshot import build_snapshot, file_signature, load_snapshot_file, read_kb_file, write_snapshot_file
+
+
+def compile_kb_file(kb_file='ford_kb.json', output=None, faq_word_boundary=True, build_tfidf=False):
+    output = output or os.path.splitext(kb_file)[0] + '.kbsnap'
+
+    print(f"🔧 Compiling {kb_file} -> {output}...")
+
+    if not os.path.exists(kb_file):
+        print(f"❌ File {kb_file} does not exist!")
+        return False
+
+    try:
+        started = time.perf_counter()
+        kb_data, version = read_kb_file(kb_file)
+        snapshot = build_snapshot(kb_data, version, file_signature(kb_file), faq_word_boundary, started, build_tfidf)
+        print(f"✅ Built indexes for {len(snapshot.article_index)} articles in {snapshot.build_seconds * 1000:.1f} ms")
+
+        write_snapshot_file(snapshot, output, kb_file)
+        print(f"📁 Snapshot size: {os.path.getsize(output)} bytes (version {version})")
+
+        # Make sure workers will accept what we just wrote
+        loaded = load_snapshot_file(output, kb_file, faq_word_boundary, build_tfidf)
+        if loaded is None or loaded.version != version:
+            print("❌ Written snapshot could not be loaded back!")
+            return False
+        print(f"✅ Snapshot maps back in {loaded.build_seconds * 1000:.1f} ms")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    kb_file = args[0] if args else 'ford_kb.json'
+    output = args[1] if len(args) > 1 else None
+    # Pass --tfidf when the backend runs with TFIDF_ENABLED
+    if compile_kb_file(kb_file, output, build_tfidf='--tfidf' in sys.argv):
+        print("\n🎉 KB snapshot is ready to use!")
+    else:
+        print("\n⚠️ Please fix the KB snapshot issues above.")
+        sys.exit(1)
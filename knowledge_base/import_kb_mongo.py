@@ -0,0 +1,48 @@
+import os
+import sys
+
+# Make the backend importable both from the repo checkout and from the
+# backend container (/app)
+HERE = os.path.dirname(os.path.abspath(__file__))
+for candidate in (os.path.join(HERE, '..', 'backend'), os.path.join(HERE, '..')):
+    if os.path.isdir(os.path.join(candidate, 'app', 'services')):
+        sys.path.insert(0, os.path.abspath(candidate))
+        break
+
+from app.services.kb_snapshot import read_kb_file
+from app.services.kb_store import MongoKnowledgeStore, get_mongo_client
+
+
+def import_kb_file(kb_file='ford_kb.json', uri=None):
+    uri = uri or os.environ.get('MONGODB_URI') or 'mongodb://localhost:27017/itsd_copilot'
+
+    print(f"📥 Importing {kb_file} into {uri}...")
+
+    if not os.path.exists(kb_file):
+        print(f"❌ File {kb_file} does not exist!")
+        return False
+
+    try:
+        kb_data, version = read_kb_file(kb_file)
+        store = MongoKnowledgeStore(get_mongo_client(uri).get_default_database())
+        store.import_knowledge_base(kb_data, version)
+
+        for section in ('intents', 'commands', 'troubleshooting', 'articles', 'faq', 'runbooks'):
+            print(f"✅ {section}: {len(kb_data.get(section, {}))} entries")
+        print(f"📁 Store version is now {store.version()}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    kb_file = sys.argv[1] if len(sys.argv) > 1 else 'ford_kb.json'
+    uri = sys.argv[2] if len(sys.argv) > 2 else None
+    # Running backends pick the new version up on their next watcher poll
+    if import_kb_file(kb_file, uri):
+        print("\n🎉 KB imported into MongoDB!")
+    else:
+        print("\n⚠️ Please fix the KB import issues above.")
+        sys.exit(1)
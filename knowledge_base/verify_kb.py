@@ -27,7 +27,7 @@ def verify_kb_file():
         print("✅ JSON is valid!")
         
         # Check structure
-        required_sections = ['intents', 'commands', 'troubleshooting', 'articles', 'faq']
+        required_sections = ['intents', 'commands', 'troubleshooting', 'articles', 'faq', 'runbooks']
         for section in required_sections:
             if section in data:
                 print(f"✅ Section '{section}' found")